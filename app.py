@@ -3,9 +3,10 @@ Aplicació Flask amb Sistema de Recomanacions d'Animes
 Inclou scheduler automàtic per entrenar el model cada dia a les 2:30 AM
 """
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, g, Response, stream_with_context
 from flask_cors import CORS
 from pathlib import Path
+import json
 import threading
 import sys
 import os
@@ -15,6 +16,24 @@ import time
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.recommendation_system import RecommendationSystem
+from src.single_flight import SingleFlight
+from src.admission import AdmissionController, Overloaded
+from src.metrics import (
+    REGISTRY,
+    HTTP_REQUESTS,
+    HTTP_REQUEST_DURATION,
+    ADMISSION_WAIT_DURATION,
+    RECOMMENDATION_DEADLINE_EXCEEDED,
+    MODEL_WARMUP_DURATION,
+    SCHEDULER_JOB_RUNS,
+)
+from src.profiling import (
+    SlowRequestLog,
+    begin_trace,
+    current_trace,
+    end_trace,
+    profile_call,
+)
 
 # APScheduler per tasques automàtiques
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -28,11 +47,32 @@ app = Flask(__name__,
 CORS(app)
 app.config["DEBUG"] = False  # Canviat a False per producció
 app.config["PORT"] = 5000
+# Compressió dels models nous: 'zlib', 'lzma', 'bz2' o buit per no comprimir
+app.config["MODEL_COMPRESSION"] = os.environ.get('MODEL_COMPRESSION') or None
+app.config["MODEL_COMPRESSION_LEVEL"] = os.environ.get('MODEL_COMPRESSION_LEVEL') or None
+# Perfilat per petició (capçalera X-Debug-Profile: 1 o ?profile=1). Desactivat per defecte
+app.config["PROFILING_ENABLED"] = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+app.config["PROFILE_TOP_N"] = int(os.environ.get('PROFILE_TOP_N', 25))
+# Les peticions més lentes que aquest llindar es desen al registre de peticions lentes
+app.config["SLOW_REQUEST_THRESHOLD_MS"] = float(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 1000))
+# Nombre d'animes populars amb què s'escalfa el model després de carregar-lo (0 = no escalfar)
+app.config["WARMUP_TITLES"] = int(os.environ.get('WARMUP_TITLES', 20))
+# Control d'admissió dels endpoints de recomanacions
+app.config["ADMISSION_LIMIT"] = int(os.environ.get('ADMISSION_LIMIT', 4))  # Càlculs simultanis
+app.config["ADMISSION_QUEUE"] = int(os.environ.get('ADMISSION_QUEUE', 32))  # Peticions en espera
+app.config["ADMISSION_TIMEOUT_MS"] = float(os.environ.get('ADMISSION_TIMEOUT_MS', 2000))  # Espera màxima
+app.config["ADMISSION_TRAINING_LIMIT"] = int(os.environ.get('ADMISSION_TRAINING_LIMIT', 1))  # Mentre s'entrena
+app.config["ADMISSION_RETRY_AFTER"] = int(os.environ.get('ADMISSION_RETRY_AFTER', 2))  # Segons (Retry-After)
+app.config["RECOMMENDATION_DEADLINE_MS"] = float(os.environ.get('RECOMMENDATION_DEADLINE_MS', 0))  # 0 = sense termini per defecte
+# Segons entre comprovacions de models nous del vigilant
+app.config["MODEL_CHECK_INTERVAL"] = int(os.environ.get('MODEL_CHECK_INTERVAL', 30))
 
 # Configuració de rutes
+# (ANIME_CSV, RATING_CSV i MODEL_DIR permeten servir un altre dataset, p. ex. un de sintètic)
 DATA_DIR = Path(__file__).resolve().parent / 'data'
-ANIME_CSV = DATA_DIR / 'anime.csv'
-RATING_CSV = DATA_DIR / 'cleaned_data.csv'
+ANIME_CSV = Path(os.environ.get('ANIME_CSV', DATA_DIR / 'anime.csv'))
+RATING_CSV = Path(os.environ.get('RATING_CSV', DATA_DIR / 'cleaned_data.csv'))
+MODEL_DIR = Path(os.environ.get('MODEL_DIR', 'model'))
 
 print("="*70)
 print("🚀 INICIALITZANT SISTEMA DE RECOMANACIONS")
@@ -45,6 +85,35 @@ print(f"  - {RATING_CSV}")
 rec_system = None
 training_in_progress = False  # Flag per saber si s'està entrenant
 last_model_check = None  # Per al model watcher
+system_ready = False  # True quan el model està carregat i escalfat (/readyz)
+
+# Mode pre-fork (serve.py): l'entrenament el coordina el procés pare
+shared_training_state = None  # multiprocessing.Value compartit entre processos
+training_launcher = None  # Funció que inicia l'entrenament fora d'aquest procés
+
+# Agrupació de peticions de recomanacions idèntiques concurrents
+recommendation_flights = SingleFlight()
+
+# Límit de càlculs simultanis amb cua acotada (503 + Retry-After si se supera)
+admission = AdmissionController(
+    limit=app.config["ADMISSION_LIMIT"],
+    max_queue=app.config["ADMISSION_QUEUE"],
+    queue_timeout=app.config["ADMISSION_TIMEOUT_MS"] / 1000,
+    retry_after=app.config["ADMISSION_RETRY_AFTER"]
+)
+
+# Registre de les últimes peticions lentes amb el desglossament per etapes
+slow_requests = SlowRequestLog(threshold_ms=app.config["SLOW_REQUEST_THRESHOLD_MS"])
+
+
+def is_training_in_progress():
+    """
+    Indica si hi ha un entrenament en curs (en aquest procés o, en mode
+    pre-fork, en qualsevol procés)
+    """
+    if shared_training_state is not None:
+        return bool(shared_training_state.value)
+    return training_in_progress
 
 
 def initialize_system():
@@ -55,7 +124,10 @@ def initialize_system():
     try:
         rec_system = RecommendationSystem(
             anime_csv_path=ANIME_CSV,
-            rating_csv_path=RATING_CSV
+            rating_csv_path=RATING_CSV,
+            model_dir=MODEL_DIR,
+            compression=app.config["MODEL_COMPRESSION"],
+            compression_level=app.config["MODEL_COMPRESSION_LEVEL"]
         )
         print("\n✅ Sistema carregat correctament!")
         return True
@@ -71,37 +143,171 @@ def initialize_system():
         return False
 
 
+def warmup_system():
+    """
+    Escalfa el model recorrent els camins més usats amb els animes més populars,
+    perquè les primeres peticions reals no paguin els camins freds de pandas
+    (índexs, caches internes...). Marca el sistema com a preparat en acabar.
+    """
+    global system_ready
+    
+    num_titles = app.config["WARMUP_TITLES"]
+    if rec_system is None:
+        return False
+    if num_titles <= 0:
+        system_ready = True
+        return True
+    
+    print(f"\n🔥 Escalfant el model amb els {num_titles} animes més populars...")
+    start = time.perf_counter()
+    
+    try:
+        titles = rec_system.get_popular_anime_ids(num_titles)
+        for title in titles:
+            rec_system.search_anime_exact(rec_system.anime_name(title))
+            # Les tres branques de valoració
+            for rating in (5, 3, 1):
+                rec_system.get_recommendations_adjusted(title, user_rating=rating, num_recommendations=6)
+        if titles:
+            user_ratings = {title: 5 for title in titles[:5]}
+            rec_system.get_recommendations_for_user(user_ratings, num_recommendations=10)
+            # Els nivells de degradació també, perquè els terminis tinguin estimacions
+            for title in titles[:3]:
+                rec_system.get_recommendations_adjusted(title, num_recommendations=6, tier='precomputed')
+            rec_system.get_recommendations_adjusted(titles[0], num_recommendations=6, tier='popularity')
+            rec_system.get_recommendations_for_user(user_ratings, num_recommendations=10, tier='popularity')
+            # Recomanacions per user_id (construeix les columnes alineades)
+            first_user = rec_system.userRatings_pivot.index[0]
+            rec_system.get_recommendations_for_known_user(first_user)
+            if rec_system.userNeighbors is not None:
+                rec_system.get_recommendations_for_known_user(first_user, mode='user')
+            # Cold start per contingut (construeix la cerca sobre anime.csv)
+            if rec_system.contentNeighbors is not None:
+                rec_system.get_content_recommendations(titles[0], num_recommendations=6)
+            if 'cosine' in rec_system.available_similarities():
+                rec_system.get_recommendations_adjusted(titles[0], num_recommendations=6, similarity='cosine')
+                rec_system.get_recommendations_for_user(user_ratings, num_recommendations=10, similarity='cosine')
+            rec_system.search_anime(rec_system.anime_name(titles[0])[:3])
+        rec_system.get_all_animes()
+    except Exception as e:
+        MODEL_WARMUP_DURATION.observe(time.perf_counter() - start, 'error')
+        print(f"⚠️  Error escalfant el model: {str(e)}")
+        # El model funciona igualment: millor servir en fred que no servir
+        system_ready = True
+        return False
+    
+    elapsed = time.perf_counter() - start
+    MODEL_WARMUP_DURATION.observe(elapsed, 'success')
+    system_ready = True
+    print(f"✅ Model escalfat en {elapsed:.1f} s")
+    return True
+
+
+def _collect_app_metrics():
+    """
+    Mètriques que es calculen en el moment de llegir /metrics
+    """
+    flights = recommendation_flights.get_stats()
+    samples = [
+        ('recommendation_singleflight_executed_total', 'counter',
+         "Càlculs de recomanacions executats realment",
+         {(): flights['executed']}),
+        ('recommendation_singleflight_coalesced_total', 'counter',
+         "Peticions que han compartit un càlcul en curs",
+         {(): flights['coalesced']}),
+        ('recommendation_singleflight_in_flight', 'gauge',
+         "Càlculs de recomanacions en curs",
+         {(): flights['in_flight']}),
+        ('model_training_in_progress', 'gauge',
+         "1 si hi ha un entrenament en curs",
+         {(): int(is_training_in_progress())}),
+        ('system_ready', 'gauge',
+         "1 si el model està carregat i escalfat",
+         {(): int(system_ready)}),
+    ]
+    
+    admission_stats = admission.get_stats()
+    samples.extend([
+        ('admission_limit', 'gauge',
+         "Càlculs de recomanacions simultanis permesos",
+         {(): admission_stats['limit']}),
+        ('admission_active', 'gauge',
+         "Càlculs de recomanacions en curs",
+         {(): admission_stats['active']}),
+        ('admission_queue_depth', 'gauge',
+         "Peticions esperant a la cua d'admissió",
+         {(): admission_stats['queued']}),
+        ('admission_admitted_total', 'counter',
+         "Peticions admeses",
+         {(): admission_stats['admitted']}),
+        ('admission_rejected_total', 'counter',
+         "Peticions rebutjades amb 503",
+         {(('reason', reason),): count for reason, count in admission_stats['rejected'].items()}),
+    ])
+    if rec_system is not None:
+        samples.append(('model_version', 'gauge',
+                        "Versió del model carregat",
+                        {(): rec_system.current_model_version or 0}))
+    return samples
+
+
+REGISTRY.register_collector(_collect_app_metrics)
+
+
+def run_scheduler_job(job_name, func):
+    """
+    Executa un job del scheduler registrant-ne el resultat a les mètriques
+    """
+    try:
+        outcome = func()
+    except Exception as e:
+        SCHEDULER_JOB_RUNS.inc(job_name, 'error')
+        print(f"❌ Error al job '{job_name}': {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return
+    SCHEDULER_JOB_RUNS.inc(job_name, outcome or 'success')
+
+
 def check_for_new_models():
     """
     Comprova si hi ha models nous disponibles i els carrega automàticament
     S'executa cada 30 segons per detectar models entrenats manualment
+    
+    Returns:
+        str: Resultat ('reloaded', 'unchanged', 'skipped' o 'error')
     """
     global rec_system, last_model_check
     
-    if rec_system is None or training_in_progress:
-        return
+    if rec_system is None or is_training_in_progress():
+        return 'skipped'
     
-    try:
-        latest_version = rec_system._get_latest_version()
+    latest_version = rec_system._get_latest_version()
+    
+    if latest_version > rec_system.current_model_version:
+        print(f"\n🔔 NOU MODEL DETECTAT: v{latest_version}")
+        print(f"   Model actual: v{rec_system.current_model_version}")
+        print(f"   Recarregant automàticament...")
         
-        if latest_version > rec_system.current_model_version:
-            print(f"\n🔔 NOU MODEL DETECTAT: v{latest_version}")
-            print(f"   Model actual: v{rec_system.current_model_version}")
-            print(f"   Recarregant automàticament...")
-            
-            if rec_system.reload_model():
-                print(f"✅ Model v{latest_version} carregat amb èxit!")
-                last_model_check = time.time()
-            else:
-                print(f"⚠️  No s'ha pogut carregar el model v{latest_version}")
-    except Exception as e:
-        pass  # Silenciosament ignorar errors en el watcher
+        if rec_system.reload_model():
+            print(f"✅ Model v{latest_version} carregat amb èxit!")
+            last_model_check = time.time()
+            warmup_system()
+            return 'reloaded'
+        else:
+            print(f"⚠️  No s'ha pogut carregar el model v{latest_version}")
+            return 'error'
+    
+    return 'unchanged'
 
 
 def check_and_retrain():
     """
     Comprova si les dades han canviat i reentrena el model si cal
     Aquesta funció s'executa cada dia a les 2:30 AM
+    
+    Returns:
+        str: Resultat ('training_started', 'unchanged' o 'skipped')
     """
     global rec_system, training_in_progress
     
@@ -111,26 +317,31 @@ def check_and_retrain():
     
     if rec_system is None:
         print("⚠️  Sistema no inicialitzat. Saltant comprovació.")
-        return
+        return 'skipped'
     
-    if training_in_progress:
+    if is_training_in_progress():
         print("⚠️  Ja hi ha un entrenament en curs. Saltant comprovació.")
-        return
+        return 'skipped'
     
     # Comprovar si les dades han canviat
     if not rec_system.has_data_changed():
         print("✅ Les dades no han canviat. No cal reentrenar.")
         print("="*70)
-        return
+        return 'unchanged'
     
     print("🔔 DADES NOVES DETECTADES!")
     print("🚀 Iniciant entrenament del model en background...")
     print("="*70)
     
+    if training_launcher is not None:
+        training_launcher()
+        return 'training_started'
+    
     # Entrenar en un thread separat per no bloquejar l'app
     training_thread = threading.Thread(target=train_model_background)
     training_thread.daemon = True
     training_thread.start()
+    return 'training_started'
 
 
 def train_model_background():
@@ -142,12 +353,17 @@ def train_model_background():
     
     training_in_progress = True
     
+    # L'entrenament competeix pel GIL: admetre menys càlculs simultanis mentre dura
+    admission.set_limit(app.config["ADMISSION_TRAINING_LIMIT"])
+    
     try:
         print("\n🎓 ENTRENAMENT EN BACKGROUND INICIAT")
         print("⏱️  Això pot trigar uns minuts...")
         
-        # Entrenar el model (això triga)
-        rec_system.train_model(save=True)
+        # Entrenar el model (això triga). Aquí hi ha altres threads vius (Flask i
+        # scheduler): les valoracions es llegeixen sense pool de processos, perquè
+        # un fork() d'un procés multithread es pot bloquejar amb un lock heretat
+        rec_system.train_model(save=True, csv_workers=1)
         
         print("\n🔄 Model entrenat! Recarregant...")
         
@@ -155,6 +371,7 @@ def train_model_background():
         if rec_system.reload_model():
             print("✅ Model nou carregat correctament!")
             print(f"📦 Ara s'està usant la versió v{rec_system.current_model_version}")
+            warmup_system()
         else:
             print("⚠️  No s'ha pogut recarregar el model nou")
         
@@ -165,6 +382,7 @@ def train_model_background():
     
     finally:
         training_in_progress = False
+        admission.set_limit(app.config["ADMISSION_LIMIT"])
         print("="*70)
 
 
@@ -180,18 +398,20 @@ def setup_scheduler():
     trigger_daily = CronTrigger(hour=2, minute=30)
     
     scheduler.add_job(
-        func=check_and_retrain,
+        func=run_scheduler_job,
+        args=('daily_model_check', check_and_retrain),
         trigger=trigger_daily,
         id='daily_model_check',
         name='Comprovació diària del model',
         replace_existing=True
     )
     
-    # Trigger 2: Comprovar nous models cada 30 segons (per detectar entrenaments manuals)
+    # Trigger 2: Comprovar nous models cada MODEL_CHECK_INTERVAL segons (per detectar entrenaments manuals)
     scheduler.add_job(
-        func=check_for_new_models,
+        func=run_scheduler_job,
+        args=('model_watcher', check_for_new_models),
         trigger='interval',
-        seconds=30,
+        seconds=app.config["MODEL_CHECK_INTERVAL"],
         id='model_watcher',
         name='Vigilant de models nous',
         replace_existing=True
@@ -201,12 +421,348 @@ def setup_scheduler():
     
     print("\n⏰ SCHEDULER CONFIGURAT")
     print(f"   📅 Comprovació automàtica: cada dia a les 2:30 AM")
-    print(f"   🔍 Vigilant de models: cada 30 segons")
+    print(f"   🔍 Vigilant de models: cada {app.config['MODEL_CHECK_INTERVAL']} segons")
     print(f"   🤖 Recarregarà automàticament models nous")
     
     return scheduler
 
 
+# ============================================================================
+# CÀLCUL DE RECOMANACIONS (compartit entre peticions idèntiques)
+# ============================================================================
+
+def remaining_ms(deadline):
+    """Mil·lisegons que queden fins al termini absolut (None = sense termini)"""
+    if deadline is None:
+        return None
+    return (deadline - time.perf_counter()) * 1000
+
+
+def deadline_exceeded(deadline, method):
+    """
+    Indica si la resposta acaba després del termini (i ho compta a /metrics)
+
+    El termini és orientatiu: el nivell de càlcul es tria amb la latència
+    prevista, però un càlcul ja començat no s'interromp ni es descarta
+    """
+    if deadline is None or time.perf_counter() <= deadline:
+        return False
+    RECOMMENDATION_DEADLINE_EXCEEDED.inc(method)
+    return True
+
+
+def parse_deadline(data):
+    """
+    Llegeix 'deadline_ms' del cos de la petició (o RECOMMENDATION_DEADLINE_MS)
+    i el converteix en un termini absolut comptat des de l'inici de la petició
+
+    Returns:
+        tuple: (deadline_ms o None, termini absolut en perf_counter o None)
+
+    Raises:
+        ValueError: Si deadline_ms no és un número positiu
+    """
+    deadline_ms = data.get('deadline_ms', app.config["RECOMMENDATION_DEADLINE_MS"] or None)
+    if deadline_ms is None:
+        return None, None
+    if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0:
+        raise ValueError("El paràmetre 'deadline_ms' ha de ser un número positiu")
+    return deadline_ms, g.request_start + deadline_ms / 1000
+
+
+def parse_similarity(data):
+    """
+    Llegeix 'similarity' del cos de la petició ('pearson' per defecte)
+
+    Raises:
+        ValueError: Si la similitud no existeix o el model carregat no la té
+    """
+    similarity = data.get('similarity', 'pearson')
+    available = rec_system.available_similarities()
+    if similarity not in available:
+        raise ValueError(
+            f"El paràmetre 'similarity' ha de ser un de {available} "
+            "(els models antics només tenen 'pearson': reentrena per tenir 'cosine')"
+        )
+    return similarity
+
+
+def parse_genre_filters(data):
+    """
+    Llegeix 'include_genres' i 'exclude_genres' (llista o text separat per comes)
+
+    Returns:
+        tuple: (gèneres a incloure, gèneres a excloure), normalitzats i ordenats
+
+    Raises:
+        ValueError: Si el format no és vàlid o algun gènere no existeix
+    """
+    filters = []
+    for field in ('include_genres', 'exclude_genres'):
+        value = data.get(field) or []
+        if isinstance(value, str):
+            value = value.split(',')
+        if not isinstance(value, list):
+            raise ValueError(f"El paràmetre '{field}' ha de ser una llista de gèneres")
+        filters.append(rec_system.normalize_genres(name for name in value if str(name).strip()))
+    return tuple(filters)
+
+
+def parse_anime_id(value):
+    """
+    Valida un anime_id de la petició (enter o text numèric)
+
+    Raises:
+        ValueError: Si no és un enter
+    """
+    if isinstance(value, bool) or isinstance(value, float):
+        raise ValueError("L'anime_id ha de ser un enter")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"L'anime_id ha de ser un enter (rebut: {value!r})")
+
+
+def parse_user_ratings(data):
+    """
+    Llegeix les valoracions de /api/recommendations-multiple i resol els noms a
+    anime_id (l'únic punt on es resolen noms):
+    - 'ratings': { "Death Note": 5, ... } per nom
+    - 'ratings_by_id': { "1535": 5, ... } per anime_id
+
+    Returns:
+        dict: {anime_id: valoració} (els noms desconeguts s'ometen)
+
+    Raises:
+        ValueError: Si el format no és vàlid
+    """
+    by_name = data.get('ratings') or {}
+    by_id = data.get('ratings_by_id') or {}
+    if not isinstance(by_name, dict) or not isinstance(by_id, dict):
+        raise ValueError("Els paràmetres 'ratings' i 'ratings_by_id' han de ser diccionaris")
+    if not by_name and not by_id:
+        raise ValueError("Cal el paràmetre 'ratings' (per nom) o 'ratings_by_id' (per anime_id)")
+
+    resolved = {}
+    for name, rating in by_name.items():
+        anime_id = rec_system.find_anime_id(name)
+        if anime_id is None:
+            print(f"Anime '{name}' no trobat")
+            continue
+        resolved[anime_id] = rating
+    for anime_id, rating in by_id.items():
+        resolved[parse_anime_id(anime_id)] = rating
+    return resolved
+
+
+def _compute_recommendations(anime, rating, deadline=None, similarity='pearson', genres=((), ())):
+    """
+    Resol l'anime i calcula les recomanacions ajustades
+    Amb termini, el nivell de càlcul es tria amb el temps que queda
+    després de l'espera a la cua i de resoldre el nom
+
+    Si l'anime no és a la pivot (sense valoracions suficients) es busca a
+    anime.csv i es recomana per contingut (nivell 'content')
+
+    Args:
+        anime: anime_id (int) o nom (es resol aquí: exacte, parcial o anime.csv)
+
+    Returns:
+        dict: {'matches': [...]} si hi ha múltiples coincidències, o
+              {'anime': nom, 'anime_id': id, 'recommendations': [...] o None, 'tier': nivell}
+    """
+    if isinstance(anime, int):
+        anime_id = anime
+        anime_name = rec_system.anime_name(anime_id)
+    else:
+        # Cercar animes coincidents
+        matching_animes = rec_system.search_anime_exact(anime)
+        
+        # Si hi ha múltiples coincidències, retornar-les per escollir
+        if len(matching_animes) > 1:
+            return {'matches': matching_animes}
+        
+        # Si només hi ha una coincidència o cap
+        if len(matching_animes) == 1:
+            anime_id = matching_animes[0]['anime_id']
+            anime_name = matching_animes[0]['name']
+        else:
+            anime_id = None
+            anime_name = rec_system.resolve_content_anime(anime) or anime
+    
+    # Obtenir recomanacions ajustades segons la valoració
+    recommendations, tier = rec_system.get_recommendations_within(
+        anime=anime_id if anime_id is not None else anime_name,
+        user_rating=rating,
+        num_recommendations=6,
+        deadline_ms=remaining_ms(deadline),
+        similarity=similarity,
+        include_genres=genres[0],
+        exclude_genres=genres[1]
+    )
+    
+    return {'anime': anime_name, 'anime_id': anime_id, 'recommendations': recommendations, 'tier': tier}
+
+
+def _compute_user_recommendations(ratings, deadline=None, similarity='pearson', genres=((), ())):
+    """
+    Recomanacions per múltiples valoracions dins del termini
+
+    Args:
+        ratings (dict): {anime_id: valoració}
+
+    Returns:
+        dict: {'recommendations': [...], 'tier': nivell}
+    """
+    recommendations, tier = rec_system.get_recommendations_for_user_within(
+        user_ratings_dict=ratings,
+        num_recommendations=10,
+        deadline_ms=remaining_ms(deadline),
+        similarity=similarity,
+        include_genres=genres[0],
+        exclude_genres=genres[1]
+    )
+    return {'recommendations': recommendations, 'tier': tier}
+
+
+def run_admitted(fn, *args, **kwargs):
+    """
+    Executa fn dins d'una plaça del control d'admissió
+
+    Raises:
+        Overloaded: Si la petició no pot ser admesa a temps
+    """
+    with admission.slot() as waited:
+        ADMISSION_WAIT_DURATION.observe(waited)
+        return fn(*args, **kwargs)
+
+
+def recommend_for_anime(anime, rating, deadline_ms=None, deadline=None, similarity='pearson',
+                        genres=((), ())):
+    """
+    Com _compute_recommendations, però les peticions idèntiques concurrents
+    (mateix anime_id o nom normalitzat, valoració, termini, similitud, filtres
+    de gènere i versió del model) comparteixen un sol càlcul. Només el càlcul
+    compartit ocupa plaça al control d'admissió.
+    """
+    if not isinstance(anime, int):
+        anime = anime.strip()
+    key = (
+        'recommendations',
+        rec_system.current_model_version,
+        anime if isinstance(anime, int) else anime.lower(),
+        rating,
+        deadline_ms,
+        similarity,
+        genres
+    )
+    result, _ = recommendation_flights.do(
+        key, run_admitted, _compute_recommendations, anime, rating, deadline, similarity, genres
+    )
+    return result
+
+
+def recommend_for_ratings(ratings, deadline_ms=None, deadline=None, similarity='pearson', genres=((), ())):
+    """
+    Recomanacions per múltiples valoracions ({anime_id: valoració}), agrupant
+    peticions idèntiques concurrents
+    """
+    key = (
+        'recommendations-multiple',
+        rec_system.current_model_version,
+        frozenset(ratings.items()),
+        deadline_ms,
+        similarity,
+        genres
+    )
+    result, _ = recommendation_flights.do(
+        key, run_admitted, _compute_user_recommendations, ratings, deadline, similarity, genres
+    )
+    return result
+
+
+# ============================================================================
+# MÈTRIQUES PER PETICIÓ
+# ============================================================================
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    begin_trace()
+
+
+@app.after_request
+def record_request_metrics(response):
+    trace = end_trace()
+    start = g.pop('request_start', None)
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUEST_DURATION.observe(elapsed, route, request.method)
+        HTTP_REQUESTS.inc(route, request.method, str(response.status_code))
+        
+        if slow_requests.maybe_record(route, request.method, elapsed * 1000, trace,
+                                      context=g.get('slow_log_context')):
+            print(f"🐢 Petició lenta: {request.method} {route} {elapsed * 1000:.0f} ms "
+                  f"{trace.as_ms() if trace is not None else {}}")
+    return response
+
+
+def profiling_requested():
+    """
+    Indica si la petició actual demana el desglossament de temps
+    (només si PROFILING_ENABLED està activat)
+    """
+    if not app.config["PROFILING_ENABLED"]:
+        return False
+    flag = request.headers.get('X-Debug-Profile') or request.args.get('profile') or ''
+    return flag.lower() in ('1', 'true', 'yes')
+
+
+def overloaded_response(error):
+    """Resposta 503 ràpida quan el control d'admissió rebutja la petició"""
+    response = jsonify({
+        "error": "El servidor està saturat. Torna-ho a provar d'aquí a uns segons.",
+        "reason": error.reason
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def wants_ndjson():
+    """
+    Indica si el client demana la resposta en streaming (NDJSON), amb
+    ?stream=1 o amb la capçalera Accept: application/x-ndjson
+    """
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    accept = request.headers.get('Accept', '')
+    return 'application/x-ndjson' in accept or 'application/jsonl' in accept
+
+
+def ndjson_response(records):
+    """
+    Resposta en streaming: un objecte JSON per línia, generat a mesura que s'envia
+    (el temps fins al primer byte i la memòria no depenen de la mida del resultat)
+    """
+    def generate():
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def build_debug_info(top_functions):
+    """Desglossament de temps que s'afegeix a la resposta en mode perfilat"""
+    trace = current_trace()
+    return {
+        "elapsed_ms": round((time.perf_counter() - g.request_start) * 1000, 3),
+        "stages_ms": trace.as_ms() if trace is not None else {},
+        "profile": top_functions
+    }
+
+
 # ============================================================================
 # ENDPOINTS DE L'API
 # ============================================================================
@@ -217,11 +773,40 @@ def home():
     return render_template('index.html')
 
 
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: el procés està viu i respon"""
+    return jsonify({"status": "ok"})
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    Readiness: el model està carregat i escalfat
+    El balancejador només hauria d'enviar trànsit quan retorna 200
+    """
+    if rec_system is None:
+        return jsonify({"status": "not_ready", "reason": "model_not_loaded"}), 503
+    if not system_ready:
+        return jsonify({"status": "not_ready", "reason": "warming_up"}), 503
+    return jsonify({
+        "status": "ready",
+        "version": int(rec_system.current_model_version or 0)
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Mètriques en format de text de Prometheus"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/api/model-info', methods=['GET'])
 def get_model_info():
     """
     Endpoint per obtenir informació sobre el model actual
     GET /api/model-info
+    GET /api/model-info?detail=memory (afegeix la mida de cada component)
     
     Returns:
         {
@@ -241,7 +826,10 @@ def get_model_info():
     
     try:
         model_info = rec_system.get_model_info()
-        model_info['training_in_progress'] = training_in_progress
+        model_info['training_in_progress'] = is_training_in_progress()
+        model_info['tier_latency_estimates_ms'] = rec_system.latency_estimator.get_estimates()
+        if request.args.get('detail') == 'memory':
+            model_info['memory'] = rec_system.get_memory_report()
         return jsonify(model_info)
     except Exception as e:
         return jsonify({
@@ -253,7 +841,13 @@ def get_model_info():
 def get_recommendations():
     """
     Endpoint per obtenir recomanacions basades en un anime
-    POST: { "anime": "Death Note", "rating": 4.5 }
+    POST: { "anime": "Death Note", "rating": 4.5, "deadline_ms": 200, "similarity": "pearson" }
+    POST: { "anime_id": 1535, "rating": 4.5 }  (sense resoldre cap nom)
+    
+    Amb deadline_ms (opcional), si el càlcul complet no hi cap es degrada a la
+    matriu precalculada o al rànquing per popularitat ("tier" a la resposta).
+    similarity (opcional): 'pearson' (per defecte) o 'cosine' (cosinus ajustat)
+    include_genres / exclude_genres (opcionals): p. ex. ["Mecha", "Comedy"] / ["Hentai"]
     """
     if rec_system is None:
         return jsonify({
@@ -266,16 +860,35 @@ def get_recommendations():
         anime_name = data.get('anime')
         rating = data.get('rating', 5)  # Default 5 si no s'especifica
         
-        if not anime_name:
+        if not anime_name and data.get('anime_id') is None:
             return jsonify({
-                "error": "El paràmetre 'anime' és obligatori"
+                "error": "El paràmetre 'anime' o 'anime_id' és obligatori"
             }), 400
         
-        # Cercar animes coincidents
-        matching_animes = rec_system.search_anime_exact(anime_name)
+        try:
+            anime = parse_anime_id(data['anime_id']) if data.get('anime_id') is not None else anime_name
+            deadline_ms, deadline = parse_deadline(data)
+            similarity = parse_similarity(data)
+            genres = parse_genre_filters(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        g.slow_log_context = {"anime": anime, "rating": rating, "deadline_ms": deadline_ms,
+                              "similarity": similarity, "genres": genres}
+        
+        profiling = profiling_requested()
+        if profiling:
+            # Sense agrupar: el perfil ha de correspondre a aquesta petició
+            result, top_functions = profile_call(
+                app.config["PROFILE_TOP_N"], run_admitted, _compute_recommendations,
+                anime if isinstance(anime, int) else anime.strip(), rating, deadline, similarity, genres
+            )
+        else:
+            result = recommend_for_anime(anime, rating, deadline_ms, deadline, similarity, genres)
         
         # Si hi ha múltiples coincidències, retornar-les per escollir
-        if len(matching_animes) > 1:
+        if 'matches' in result:
+            matching_animes = result['matches']
             return jsonify({
                 "status": "multiple_matches",
                 "message": f"S'han trobat {len(matching_animes)} animes amb aquest nom",
@@ -283,29 +896,34 @@ def get_recommendations():
                 "query": anime_name
             }), 300  # HTTP 300 Multiple Choices
         
-        # Si només hi ha una coincidència o cap
-        if len(matching_animes) == 1:
-            anime_name = matching_animes[0]['name']
-        
-        # Obtenir recomanacions ajustades segons la valoració
-        recommendations = rec_system.get_recommendations_adjusted(
-            anime_name=anime_name,
-            user_rating=rating,
-            num_recommendations=6
-        )
+        anime_name = result['anime']
+        recommendations = result['recommendations']
         
         if recommendations is None:
             return jsonify({
-                "error": f"No s'ha trobat l'anime '{anime_name}'. "
+                "error": f"No s'ha trobat l'anime '{anime_name or anime}'. "
                          "Prova amb una cerca més específica."
             }), 404
         
-        return jsonify({
+        response = {
             "anime": anime_name,
+            "anime_id": result['anime_id'],
             "user_rating": rating,
-            "recommendations": recommendations
-        })
+            "recommendations": recommendations,
+            "tier": result['tier'],
+            "source": "content" if result['tier'] == 'content' else "collaborative",
+            "deadline_exceeded": deadline_exceeded(deadline, 'adjusted'),
+            "similarity": similarity,
+            "include_genres": list(genres[0]),
+            "exclude_genres": list(genres[1])
+        }
+        if profiling:
+            response["debug"] = build_debug_info(top_functions)
         
+        return jsonify(response)
+        
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         import traceback
@@ -319,7 +937,8 @@ def get_recommendations():
 def get_recommendations_multiple():
     """
     Endpoint per obtenir recomanacions basades en múltiples animes
-    POST: { "ratings": { "Death Note": 5, "Code Geass": 4.5 } }
+    POST: { "ratings": { "Death Note": 5, "Code Geass": 4.5 }, "deadline_ms": 200, "similarity": "cosine" }
+    POST: { "ratings_by_id": { "1535": 5, "1575": 4.5 } }  (sense resoldre cap nom)
     """
     if rec_system is None:
         return jsonify({
@@ -328,23 +947,121 @@ def get_recommendations_multiple():
     
     try:
         data = request.get_json()
-        ratings = data.get('ratings')
         
-        if not ratings or not isinstance(ratings, dict):
+        try:
+            ratings = parse_user_ratings(data)
+            deadline_ms, deadline = parse_deadline(data)
+            similarity = parse_similarity(data)
+            genres = parse_genre_filters(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if not ratings:
             return jsonify({
-                "error": "El paràmetre 'ratings' és obligatori i ha de ser un diccionari"
-            }), 400
+                "error": "No s'ha trobat cap dels animes valorats"
+            }), 404
+        
+        g.slow_log_context = {"ratings": ratings, "deadline_ms": deadline_ms, "similarity": similarity,
+                              "genres": genres}
         
-        recommendations = rec_system.get_recommendations_for_user(
-            user_ratings_dict=ratings,
-            num_recommendations=10
+        profiling = profiling_requested()
+        if profiling:
+            result, top_functions = profile_call(
+                app.config["PROFILE_TOP_N"],
+                run_admitted,
+                _compute_user_recommendations,
+                ratings,
+                deadline,
+                similarity,
+                genres
+            )
+        else:
+            result = recommend_for_ratings(ratings, deadline_ms, deadline, similarity, genres)
+        
+        response = {
+            "user_ratings": data.get('ratings') or data.get('ratings_by_id'),
+            "resolved_ratings": {str(anime_id): rating for anime_id, rating in ratings.items()},
+            "recommendations": result['recommendations'],
+            "tier": result['tier'],
+            "deadline_exceeded": deadline_exceeded(deadline, 'user'),
+            "similarity": similarity,
+            "include_genres": list(genres[0]),
+            "exclude_genres": list(genres[1])
+        }
+        if profiling:
+            response["debug"] = build_debug_info(top_functions)
+        
+        return jsonify(response)
+        
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            "error": f"Error intern: {str(e)}"
+        }), 500
+
+
+@app.route('/api/users/<int:user_id>/recommendations', methods=['GET'])
+def get_user_recommendations(user_id):
+    """
+    Recomanacions per un usuari del dataset a partir de les seves valoracions
+    GET /api/users/42/recommendations?mode=item&similarity=pearson&limit=10&exclude_genres=Hentai
+    
+    mode: 'item' (similitud entre animes, per defecte) o 'user' (top-K veïns
+    d'usuari precalculats a l'entrenament; no depèn de similarity)
+    """
+    if rec_system is None:
+        return jsonify({"error": "Sistema no inicialitzat"}), 503
+    
+    mode = request.args.get('mode', 'item')
+    similarity = request.args.get('similarity', 'pearson')
+    limit = request.args.get('limit', 10, type=int)
+    
+    if mode not in ('item', 'user'):
+        return jsonify({"error": "El paràmetre 'mode' ha de ser 'item' o 'user'"}), 400
+    if mode == 'item' and similarity not in rec_system.available_similarities():
+        return jsonify({
+            "error": f"El paràmetre 'similarity' ha de ser un de {rec_system.available_similarities()}"
+        }), 400
+    if mode == 'user' and rec_system.userNeighbors is None:
+        return jsonify({
+            "error": "El model carregat no té l'índex de veïns d'usuari. Reentrena el model."
+        }), 400
+    if limit is None or not 1 <= limit <= 100:
+        return jsonify({"error": "El paràmetre 'limit' ha de ser entre 1 i 100"}), 400
+    try:
+        genres = parse_genre_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        recommendations = run_admitted(
+            rec_system.get_recommendations_for_known_user,
+            user_id,
+            num_recommendations=limit,
+            mode=mode,
+            similarity=similarity,
+            include_genres=genres[0],
+            exclude_genres=genres[1]
         )
         
+        if recommendations is None:
+            return jsonify({"error": f"No s'ha trobat l'usuari {user_id}"}), 404
+        
         return jsonify({
-            "user_ratings": ratings,
+            "user_id": user_id,
+            "mode": mode,
+            "similarity": similarity if mode == 'item' else None,
+            "include_genres": list(genres[0]),
+            "exclude_genres": list(genres[1]),
             "recommendations": recommendations
         })
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         import traceback
@@ -354,13 +1071,37 @@ def get_recommendations_multiple():
         }), 500
 
 
+@app.route('/api/debug/slow-requests', methods=['GET'])
+def get_slow_requests():
+    """
+    Últimes peticions que han superat SLOW_REQUEST_THRESHOLD_MS
+    amb el temps de cada etapa (només si PROFILING_ENABLED està activat:
+    inclou els cossos de les peticions)
+    """
+    if not app.config["PROFILING_ENABLED"]:
+        return jsonify({"error": "No trobat"}), 404
+    
+    entries = slow_requests.entries()
+    return jsonify({
+        "threshold_ms": slow_requests.threshold_ms,
+        "requests": entries,
+        "count": len(entries)
+    })
+
+
 @app.route('/api/animes', methods=['GET'])
 def get_animes():
-    """Retorna la llista de tots els animes disponibles"""
+    """
+    Retorna la llista de tots els animes disponibles
+    Amb ?stream=1 o Accept: application/x-ndjson, retorna un anime per línia en streaming
+    """
     if rec_system is None:
         return jsonify({"error": "Sistema no inicialitzat"}), 503
     
     try:
+        if wants_ndjson():
+            return ndjson_response(rec_system.iter_all_animes())
+        
         animes = rec_system.get_all_animes()
         return jsonify({
             "animes": animes,
@@ -370,6 +1111,22 @@ def get_animes():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/genres', methods=['GET'])
+def get_genres():
+    """Gèneres disponibles per als filtres include_genres / exclude_genres"""
+    if rec_system is None:
+        return jsonify({"error": "Sistema no inicialitzat"}), 503
+    
+    try:
+        genres = rec_system.get_genres()
+        return jsonify({
+            "genres": genres,
+            "count": len(genres)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/search', methods=['GET'])
 def search_anime():
     """Cerca animes pel nom"""
@@ -392,6 +1149,28 @@ def search_anime():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/suggest', methods=['GET'])
+def suggest_animes():
+    """
+    Suggeriments de l'autocompletat mentre l'usuari escriu
+    GET /api/suggest?q=death&limit=8
+    """
+    if rec_system is None:
+        return jsonify({"error": "Sistema no inicialitzat"}), 503
+    
+    try:
+        query = request.args.get('q', '')
+        limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+        suggestions = rec_system.suggest_animes(query, limit)
+        return jsonify({
+            "query": query,
+            "suggestions": suggestions,
+            "version": int(rec_system.current_model_version or 0)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/models', methods=['GET'])
 def list_models():
     """Llista tots els models disponibles"""
@@ -414,16 +1193,21 @@ def manual_train():
     Endpoint per forçar un entrenament manual del model
     POST /api/train
     """
-    global training_in_progress
-    
     if rec_system is None:
         return jsonify({"error": "Sistema no inicialitzat"}), 503
     
-    if training_in_progress:
+    if is_training_in_progress():
         return jsonify({
             "error": "Ja hi ha un entrenament en curs. Espera que acabi."
         }), 409
     
+    if training_launcher is not None:
+        training_launcher()
+        return jsonify({
+            "message": "Entrenament iniciat en un procés separat",
+            "training_in_progress": True
+        })
+    
     # Iniciar entrenament en background
     training_thread = threading.Thread(target=train_model_background)
     training_thread.daemon = True
@@ -450,6 +1234,12 @@ if __name__ == '__main__':
         print(f"  - {len(rec_system.users_dict)} usuaris")
         print(f"  - Model v{rec_system.current_model_version}")
         
+        # Escalfar el model en background: /healthz respon de seguida,
+        # /readyz no retorna 200 fins que s'ha acabat d'escalfar
+        warmup_thread = threading.Thread(target=warmup_system)
+        warmup_thread.daemon = True
+        warmup_thread.start()
+        
         # Configurar scheduler automàtic
         scheduler = setup_scheduler()
         
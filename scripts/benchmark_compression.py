@@ -0,0 +1,168 @@
+"""
+Benchmark de compressió dels models entrenats
+
+Desa el model més recent (o el que s'indiqui) amb cada còdec i nivell,
+i mesura la mida del fitxer, el temps de desar i el temps de carregar.
+Serveix per triar entre espai a disc i latència de recàrrega.
+
+Ús:
+    python scripts/benchmark_compression.py
+    python scripts/benchmark_compression.py --codecs zlib,lzma --levels 1,6,9
+    python scripts/benchmark_compression.py --model model/corr_matrix_v3.pkl --json resultats.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Afegir el directori arrel al path
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.model_storage import (
+    CODECS,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_LEVELS,
+    load_model_data,
+    save_model_data,
+)
+
+
+def find_latest_model(model_dir):
+    """Retorna la ruta del model amb la versió més alta"""
+    versions = []
+    for file in model_dir.glob('corr_matrix_v*.pkl'):
+        try:
+            versions.append((int(file.stem.split('_v')[1]), file))
+        except (IndexError, ValueError):
+            continue
+    return max(versions)[1] if versions else None
+
+
+def benchmark_codec(model_data, codec, level, repeat, chunk_size, workers, tmp_dir):
+    """
+    Desa i carrega el model amb un còdec i retorna les mesures
+
+    Returns:
+        dict: codec, level, size_mb, save_s, load_s
+    """
+    path = Path(tmp_dir) / f"model_{codec or 'none'}_{level}.pkl"
+
+    save_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        save_model_data(path, model_data, codec=codec, level=level,
+                        chunk_size=chunk_size, workers=workers)
+        save_times.append(time.perf_counter() - start)
+
+    size_mb = path.stat().st_size / (1024 * 1024)
+
+    load_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_model_data(path, workers=workers)
+        load_times.append(time.perf_counter() - start)
+
+    path.unlink()
+
+    return {
+        'codec': codec or 'none',
+        'level': level,
+        'size_mb': round(size_mb, 2),
+        'save_s': round(min(save_times), 3),
+        'load_s': round(min(load_times), 3),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de compressió dels models")
+    parser.add_argument('--model', type=Path, default=None,
+                        help="Fitxer de model a provar (per defecte el més recent de model/)")
+    parser.add_argument('--codecs', default=','.join(CODECS),
+                        help="Còdecs separats per comes (per defecte: tots)")
+    parser.add_argument('--levels', default=None,
+                        help="Nivells separats per comes (per defecte el de cada còdec)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Repeticions per mesura (es guarda el mínim)")
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_SIZE // (1024 * 1024),
+                        help="Mida de cada bloc comprimit en MB")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Threads per comprimir/descomprimir (per defecte: CPUs)")
+    parser.add_argument('--json', type=Path, default=None,
+                        help="Desa els resultats en aquest fitxer JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    model_path = args.model or find_latest_model(root_dir / 'model')
+    if model_path is None or not Path(model_path).exists():
+        print("❌ ERROR: No s'ha trobat cap model. Executa primer scripts/train_model.py")
+        return False
+
+    codecs = [c.strip().lower() for c in args.codecs.split(',') if c.strip()]
+    for codec in codecs:
+        if codec not in CODECS:
+            print(f"❌ ERROR: Còdec desconegut '{codec}'. Opcions: {', '.join(CODECS)}")
+            return False
+
+    print("=" * 70)
+    print("📦 BENCHMARK DE COMPRESSIÓ DEL MODEL")
+    print("=" * 70)
+    print(f"\n📂 Model: {model_path}")
+
+    start = time.perf_counter()
+    model_data = load_model_data(model_path, workers=args.workers)
+    print(f"   Carregat en {time.perf_counter() - start:.2f} s")
+
+    configs = [(None, None)]
+    for codec in codecs:
+        if args.levels:
+            levels = [int(level) for level in args.levels.split(',')]
+        else:
+            levels = [DEFAULT_LEVELS[codec]]
+        configs.extend((codec, level) for level in levels)
+
+    chunk_size = args.chunk_mb * 1024 * 1024
+    results = []
+
+    print(f"\n{'Còdec':<8}{'Nivell':>8}{'Mida (MB)':>12}{'Desar (s)':>12}{'Carregar (s)':>14}")
+    print("-" * 54)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for codec, level in configs:
+            try:
+                result = benchmark_codec(model_data, codec, level, args.repeat,
+                                         chunk_size, args.workers, tmp_dir)
+            except ValueError as e:
+                print(f"⚠️  {codec} nivell {level}: {e}")
+                continue
+            results.append(result)
+            level_str = '-' if result['level'] is None else str(result['level'])
+            print(f"{result['codec']:<8}{level_str:>8}{result['size_mb']:>12.2f}"
+                  f"{result['save_s']:>12.3f}{result['load_s']:>14.3f}")
+
+    print("=" * 70)
+
+    if args.json:
+        report = {
+            'model': str(model_path),
+            'repeat': args.repeat,
+            'chunk_mb': args.chunk_mb,
+            'workers': args.workers,
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Resultats guardats a {args.json}")
+
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,134 @@
+"""
+Benchmark de la lectura del CSV de valoracions: pd.read_csv vs lector paral·lel
+
+Compara pd.read_csv (per defecte i amb dtype compacte) amb read_ratings_csv
+(trams de bytes parsejats en un pool de processos) amb diferents nombres de
+workers, i comprova que el resultat és idèntic.
+
+Ús:
+    python scripts/benchmark_csv_reader.py --ratings data/rating.csv --workers 1,2,4,8
+    python scripts/benchmark_csv_reader.py --rows 5000000 --json lectura.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Afegir el directori arrel al path
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.csv_reader import RATING_DTYPES, read_ratings_csv
+
+
+def write_synthetic(path, rows, seed):
+    """CSV de valoracions aleatòries amb els rangs d'ids del dataset original"""
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        'user_id': rng.integers(1, 73517, rows),
+        'anime_id': rng.integers(1, 34520, rows),
+        'rating': rng.integers(-1, 11, rows),
+    }).to_csv(path, index=False)
+
+
+def measure(fn, repeat):
+    """
+    Returns:
+        tuple: (resultat de l'última execució, mediana en segons, mínim en segons)
+    """
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples), min(samples)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de lectura del CSV de valoracions")
+    parser.add_argument('--ratings', type=Path, default=None,
+                        help="Fitxer de valoracions (per defecte se'n genera un de sintètic)")
+    parser.add_argument('--rows', type=int, default=3_000_000,
+                        help="Files del fitxer sintètic")
+    parser.add_argument('--workers', default='1,2,4,8',
+                        help="Nombres de workers a provar, separats per comes")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticions per mesura")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', type=Path, default=None, help="Desa els resultats en aquest JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workers_list = [int(value) for value in args.workers.split(',') if value.strip()]
+
+    print("=" * 70)
+    print("📖 BENCHMARK DE LECTURA DEL CSV DE VALORACIONS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.ratings
+        if path is None:
+            path = Path(tmp_dir) / 'rating.csv'
+            print(f"\n🎲 Generant {args.rows:,} valoracions sintètiques...")
+            write_synthetic(path, args.rows, args.seed)
+        elif not path.exists():
+            print(f"❌ ERROR: No s'ha trobat {path}")
+            return False
+
+        size_mb = path.stat().st_size / (1024 * 1024)
+        print(f"\n📄 {path.name}: {size_mb:.1f} MB, {os.cpu_count()} CPUs\n")
+
+        results = []
+        compact = dict(RATING_DTYPES)
+
+        reference, median, best = measure(lambda: pd.read_csv(path), args.repeat)
+        results.append({'reader': 'pd.read_csv', 'workers': 1, 'median_s': median, 'min_s': best,
+                        'memory_mb': reference.memory_usage(deep=True).sum() / (1024 * 1024)})
+
+        _, median, best = measure(lambda: pd.read_csv(path, usecols=list(compact), dtype=compact), args.repeat)
+        results.append({'reader': 'pd.read_csv(dtype)', 'workers': 1, 'median_s': median, 'min_s': best,
+                        'memory_mb': None})
+
+        expected = reference[list(RATING_DTYPES)].to_numpy()
+        for workers in workers_list:
+            df, median, best = measure(
+                lambda: read_ratings_csv(path, workers=workers, min_parallel_bytes=0), args.repeat
+            )
+            identical = df.shape == expected.shape and bool((df.to_numpy() == expected).all())
+            results.append({'reader': 'read_ratings_csv', 'workers': workers, 'median_s': median,
+                            'min_s': best, 'memory_mb': df.memory_usage(deep=True).sum() / (1024 * 1024),
+                            'identical': identical})
+
+    baseline = results[0]['median_s']
+    print(f"{'Lector':<22}{'Workers':>8}{'Mediana (s)':>13}{'Speedup':>9}{'Memòria (MB)':>14}")
+    print("-" * 70)
+    for result in results:
+        result['speedup'] = round(baseline / result['median_s'], 2)
+        memory = f"{result['memory_mb']:.1f}" if result['memory_mb'] is not None else '-'
+        flag = '' if result.get('identical', True) else '  ❌ diferent'
+        print(f"{result['reader']:<22}{result['workers']:>8}{result['median_s']:>13.3f}"
+              f"{result['speedup']:>8.2f}x{memory:>14}{flag}")
+    print("=" * 70)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'file': str(path), 'size_mb': size_mb, 'cpus': os.cpu_count(),
+                       'results': results}, f, indent=2)
+        print(f"\n💾 Resultats guardats a {args.json}")
+
+    return all(result.get('identical', True) for result in results)
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
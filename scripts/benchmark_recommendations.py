@@ -0,0 +1,263 @@
+"""
+Microbenchmarks de RecommendationSystem amb dades sintètiques
+
+Genera valoracions sintètiques a l'escala indicada, entrena un model en un
+directori temporal i cronometra cada mètode públic:
+- train_model (total i per etapa: read, objects, pivot, pearson, cosine...)
+- _load_latest_model
+- search_anime i search_anime_exact
+- get_recommendations_adjusted per cada branca de valoració (5, 3 i 1)
+- get_recommendations_for_user amb perfils de diverses mides
+- get_recommendations_for_known_user (modes 'item' i 'user') per a l'usuari amb
+  la mediana de valoracions i per al que en té més
+- get_all_animes
+
+Els resultats es poden desar en JSON i comparar amb una línia base: si alguna
+mediana empitjora més que el llindar, el script acaba amb codi d'error.
+
+Ús:
+    python scripts/benchmark_recommendations.py --scale small --json bench.json
+    python scripts/benchmark_recommendations.py --users 20000 --titles 2000 --density 0.05
+    python scripts/benchmark_recommendations.py --scale small --baseline bench.json --threshold 1.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Afegir el directori arrel al path
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from generate_ratings import DISTRIBUTIONS, generate_ratings
+from train_model import create_training_system
+from src.profiling import begin_trace, end_trace
+
+
+# Escales predefinides: (usuaris, animes, densitat)
+SCALES = {
+    'small': (1000, 300, 0.2),
+    'medium': (5000, 1000, 0.08),
+    'large': (20000, 2000, 0.04),
+}
+
+# Mides de perfil per get_recommendations_for_user
+PROFILE_SIZES = (1, 5, 20, 50)
+
+
+def time_call(fn, repeat, warmup=1):
+    """
+    Executa fn diverses vegades
+
+    Returns:
+        dict: Mínim, mediana, p90 i màxim en mil·lisegons
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'p90_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.9))], 3),
+        'max_ms': round(samples[-1], 3),
+        'repeat': repeat,
+    }
+
+
+def run_benchmarks(args, tmp_dir):
+    """
+    Returns:
+        dict: nom del benchmark -> mesures
+    """
+    results = {}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    ratings_csv = Path(tmp_dir) / 'rating.csv'
+    start = time.perf_counter()
+    ratings = generate_ratings(args.anime, args.users, args.titles, args.density,
+                               args.distribution, seed=args.seed)
+    ratings.to_csv(ratings_csv, index=False)
+    print(f"🎲 {len(ratings)} valoracions generades en {time.perf_counter() - start:.1f} s")
+
+    # Entrenament (una sola vegada: és l'operació llarga)
+    model_dir = Path(tmp_dir) / 'model'
+    rec_system = create_training_system(model_dir, args.anime, ratings_csv)
+    trace = begin_trace()
+    start = time.perf_counter()
+    with quiet:
+        rec_system.train_model(save=True)
+    total = (time.perf_counter() - start) * 1000
+    end_trace()
+
+    results['train_model.total'] = {'median_ms': round(total, 3), 'repeat': 1}
+    for stage, seconds in trace.stages.items():
+        results[stage] = {'median_ms': round(seconds * 1000, 3), 'repeat': 1}
+    print(f"🏋️  Model entrenat en {total / 1000:.1f} s "
+          f"({rec_system.userRatings_pivot.shape[1]} animes a la pivot)")
+
+    with quiet:
+        results['load_latest_model'] = time_call(rec_system._load_latest_model, max(1, args.repeat // 2))
+
+    popular = rec_system.get_popular_animes(60)
+    if not popular:
+        print("⚠️  El model no té animes: augmenta --users o --density")
+        return results
+    title = popular[0]
+
+    results['search_anime'] = time_call(lambda: rec_system.search_anime(title[:4]), args.repeat)
+    results['search_anime_exact'] = time_call(lambda: rec_system.search_anime_exact(title), args.repeat)
+
+    with quiet:
+        for rating in (5, 3, 1):
+            results[f'get_recommendations_adjusted.rating_{rating}'] = time_call(
+                lambda: rec_system.get_recommendations_adjusted(title, user_rating=rating), args.repeat
+            )
+
+        for size in PROFILE_SIZES:
+            if size > len(popular):
+                continue
+            profile = {name: 5 - (i % 5) for i, name in enumerate(popular[:size])}
+            results[f'get_recommendations_for_user.profile_{size}'] = time_call(
+                lambda: rec_system.get_recommendations_for_user(profile), args.repeat
+            )
+
+        # Recomanacions per user_id: el cost del mode 'item' creix amb les valoracions de l'usuari
+        counts = rec_system.userRatings_pivot.notna().sum(axis=1).sort_values(kind='stable')
+        known_users = {'median': counts.index[len(counts) // 2], 'max': counts.index[-1]}
+        modes = ('item', 'user') if rec_system.userNeighbors is not None else ('item',)
+        for label, user_id in known_users.items():
+            for mode in modes:
+                results[f'get_recommendations_for_known_user.{mode}_{label}'] = time_call(
+                    lambda: rec_system.get_recommendations_for_known_user(user_id, mode=mode), args.repeat
+                )
+
+    results['get_all_animes'] = time_call(rec_system.get_all_animes, args.repeat)
+    return results
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    Compara les medianes amb la línia base
+
+    Returns:
+        tuple: (comparació per benchmark, llista de regressions)
+    """
+    comparison = {}
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('median_ms'):
+            continue
+        ratio = current['median_ms'] / previous['median_ms']
+        comparison[name] = {
+            'baseline_ms': previous['median_ms'],
+            'current_ms': current['median_ms'],
+            'ratio': round(ratio, 3),
+        }
+        if ratio > threshold:
+            regressions.append(name)
+    return comparison, regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Microbenchmarks del sistema de recomanacions")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                        help="Escala predefinida (usuaris, animes, densitat)")
+    parser.add_argument('--users', type=int, default=None, help="Usuaris (substitueix l'escala)")
+    parser.add_argument('--titles', type=int, default=None, help="Animes (substitueix l'escala)")
+    parser.add_argument('--density', type=float, default=None, help="Densitat (substitueix l'escala)")
+    parser.add_argument('--distribution', choices=sorted(DISTRIBUTIONS), default='normal',
+                        help="Distribució de les valoracions sintètiques")
+    parser.add_argument('--anime', type=Path, default=root_dir / 'data' / 'anime.csv',
+                        help="Fitxer anime.csv")
+    parser.add_argument('--repeat', type=int, default=10, help="Repeticions per mesura")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', type=Path, default=None, help="Desa els resultats en aquest JSON")
+    parser.add_argument('--baseline', type=Path, default=None,
+                        help="JSON d'una execució anterior per comparar")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="Ràtio de mediana a partir de la qual es considera regressió")
+    args = parser.parse_args()
+
+    users, titles, density = SCALES[args.scale]
+    args.users = args.users or users
+    args.titles = args.titles or titles
+    args.density = args.density or density
+    return args
+
+
+def main():
+    args = parse_args()
+
+    if not args.anime.exists():
+        print(f"❌ ERROR: No s'ha trobat {args.anime}")
+        return False
+
+    print("=" * 70)
+    print("⏱️  MICROBENCHMARKS DE RecommendationSystem")
+    print("=" * 70)
+    print(f"\n📐 {args.users} usuaris, {args.titles} animes, densitat {args.density}, "
+          f"distribució {args.distribution}\n")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = run_benchmarks(args, tmp_dir)
+
+    report = {
+        'config': {
+            'users': args.users,
+            'titles': args.titles,
+            'density': args.density,
+            'distribution': args.distribution,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != report['config']:
+            print("⚠️  La línia base s'ha fet amb una configuració diferent")
+        report['comparison'], regressions = compare_with_baseline(results, baseline, args.threshold)
+
+    print(f"\n{'Benchmark':<48}{'Mediana (ms)':>14}{'vs base':>10}")
+    print("-" * 72)
+    for name, measure in results.items():
+        ratio = report.get('comparison', {}).get(name, {}).get('ratio')
+        ratio_str = f"{ratio:.2f}x" if ratio is not None else '-'
+        flag = ' ⚠️' if name in regressions else ''
+        print(f"{name:<48}{measure['median_ms']:>14.3f}{ratio_str:>10}{flag}")
+    print("=" * 70)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Resultats guardats a {args.json}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressions per sobre de {args.threshold}x: {', '.join(regressions)}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -6,14 +6,30 @@ Segueix la lògica del notebook Anime.ipynb per netejar les dades
 """
 
 from pathlib import Path
+import json
+import sys
+import numpy as np
 import pandas as pd
 import os
 
+# Afegir el directori arrel al path
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.csv_reader import read_ratings_csv
+
 DATA_DIR = Path(__file__).resolve().parent / '../data'
 ANIME_CSV = DATA_DIR / 'anime.csv'
 RATING_CSV = DATA_DIR / 'rating.csv'
 CLEANED_DATA_CSV = DATA_DIR / 'cleaned_data.csv'
 
+# Mínim de valoracions per usuari i per anime
+MIN_USER_RATINGS = 100
+MIN_ANIME_RATINGS = 50
+
+# Files per bloc en el mode streaming
+CHUNK_SIZE = 1_000_000
+
 def preprocess_ratings(input_file=RATING_CSV, output_file=CLEANED_DATA_CSV):
     """
     Neteja el fitxer de valoracions seguint aquests passos:
@@ -35,8 +51,8 @@ def preprocess_ratings(input_file=RATING_CSV, output_file=CLEANED_DATA_CSV):
     print(f"\n📂 Llegint '{input_file}'...")
     
     try:
-        # Carregar el CSV original
-        df = pd.read_csv(input_file)
+        # Carregar el CSV original (en paral·lel, amb tipus enters compactes)
+        df = read_ratings_csv(input_file)
         print(f"✓ Fitxer carregat correctament")
         print(f"  Forma inicial: {df.shape}")
         print(f"  Columnes: {list(df.columns)}")
@@ -119,6 +135,129 @@ def preprocess_ratings(input_file=RATING_CSV, output_file=CLEANED_DATA_CSV):
         traceback.print_exc()
         return False
 
+def _read_chunks(input_file, chunksize):
+    """Blocs de (user_id, anime_id, rating) sense les valoracions -1"""
+    for chunk in pd.read_csv(input_file, usecols=['user_id', 'anime_id', 'rating'], chunksize=chunksize):
+        yield chunk[chunk['rating'] != -1]
+
+
+def _add_counts(counts, ids):
+    """Suma les aparicions de cada id a l'array de comptatges (el fa créixer si cal)"""
+    new_counts = np.bincount(ids, minlength=len(counts))
+    new_counts[:len(counts)] += counts
+    return new_counts
+
+
+def _count_ratings(input_file, chunksize, alive_users=None, alive_animes=None):
+    """
+    Una passada pel fitxer: valoracions per usuari i per anime, indexades per id
+    Si es donen alive_users / alive_animes, només compten les files amb tots dos vius
+
+    Returns:
+        tuple: (comptatges per user_id, comptatges per anime_id, files llegides)
+    """
+    user_counts = np.zeros(0 if alive_users is None else len(alive_users), dtype=np.int64)
+    anime_counts = np.zeros(0 if alive_animes is None else len(alive_animes), dtype=np.int64)
+    rows = 0
+
+    for chunk in _read_chunks(input_file, chunksize):
+        users = chunk['user_id'].to_numpy(dtype=np.int64)
+        animes = chunk['anime_id'].to_numpy(dtype=np.int64)
+        rows += len(chunk)
+        if alive_users is not None:
+            keep = alive_users[users] & alive_animes[animes]
+            users, animes = users[keep], animes[keep]
+        user_counts = _add_counts(user_counts, users)
+        anime_counts = _add_counts(anime_counts, animes)
+
+    return user_counts, anime_counts, rows
+
+
+def preprocess_ratings_streaming(input_file=RATING_CSV, output_file=CLEANED_DATA_CSV,
+                                 min_user_ratings=MIN_USER_RATINGS, min_anime_ratings=MIN_ANIME_RATINGS,
+                                 chunksize=CHUNK_SIZE):
+    """
+    Neteja el fitxer de valoracions per blocs, sense carregar-lo sencer:
+    1. Primera passada: valoracions per usuari i per anime (sense les -1)
+    2. Filtre iteratiu (k-core): treure animes pot deixar usuaris per sota del
+       mínim i a l'inrevés, així que es repeteix fins que cap usuari ni anime
+       canvia. Cada iteració és una passada que només actualitza els comptatges
+    3. Última passada: s'escriuen les files d'usuaris i animes supervivents
+
+    La memòria màxima depèn dels arrays de comptatges (un enter per id), no de
+    la mida del fitxer. Al contrari que preprocess_ratings (un sol filtre
+    d'usuaris i després un d'animes), el resultat és un 100/50 core exacte.
+    """
+
+    print("=" * 50)
+    print("PREPROCESSAMENT DEL DATASET DE VALORACIONS (STREAMING)")
+    print("=" * 50)
+
+    if not os.path.exists(input_file):
+        print(f"\n✗ ERROR: No s'ha trobat el fitxer '{input_file}'")
+        return False
+
+    try:
+        print(f"\n📂 Passada 1: comptant valoracions de '{input_file}' en blocs de {chunksize:,} files...")
+        user_counts, anime_counts, rated = _count_ratings(input_file, chunksize)
+        before_users = int((user_counts > 0).sum())
+        before_animes = int((anime_counts > 0).sum())
+        print(f"  ✓ {rated:,} valoracions vàlides (sense -1)")
+        print(f"  Usuaris: {before_users:,}  Animes: {before_animes:,}")
+
+        # Filtre iteratiu fins al punt fix
+        alive_users = user_counts >= min_user_ratings
+        alive_animes = anime_counts >= min_anime_ratings
+        iteration = 0
+        while True:
+            iteration += 1
+            print(f"\n🔧 Iteració {iteration}: {int(alive_users.sum()):,} usuaris i "
+                  f"{int(alive_animes.sum()):,} animes candidats...")
+            user_counts, anime_counts, _ = _count_ratings(input_file, chunksize, alive_users, alive_animes)
+            next_users = alive_users & (user_counts >= min_user_ratings)
+            next_animes = alive_animes & (anime_counts >= min_anime_ratings)
+            if np.array_equal(next_users, alive_users) and np.array_equal(next_animes, alive_animes):
+                break
+            alive_users, alive_animes = next_users, next_animes
+
+        after_users = int(alive_users.sum())
+        after_animes = int(alive_animes.sum())
+        kept = int(user_counts[alive_users].sum())
+        print(f"  ✓ Punt fix després de {iteration} iteracions")
+
+        # Última passada: escriure les files supervivents
+        print(f"\n💾 Guardant '{output_file}'...")
+        header = True
+        for chunk in pd.read_csv(input_file, chunksize=chunksize):
+            chunk = chunk[chunk['rating'] != -1]
+            users = chunk['user_id'].to_numpy(dtype=np.int64)
+            animes = chunk['anime_id'].to_numpy(dtype=np.int64)
+            chunk[alive_users[users] & alive_animes[animes]].to_csv(
+                output_file, index=False, header=header, mode='w' if header else 'a'
+            )
+            header = False
+        print(f"  ✓ Fitxer guardat correctament")
+
+        print("\n" + "=" * 70)
+        print("RESUM DEL PREPROCESSAMENT")
+        print("=" * 70)
+        print(f"\n📊 ESTADÍSTIQUES:")
+        if rated:
+            print(f"  Valoracions:  {rated:,} → {kept:,} ({(1 - kept / rated) * 100:.1f}% de reducció)")
+        print(f"  Usuaris:      {before_users:,} → {after_users:,} (mínim {min_user_ratings})")
+        print(f"  Animes:       {before_animes:,} → {after_animes:,} (mínim {min_anime_ratings})")
+        print(f"  Fitxer:       {os.path.getsize(output_file) / (1024 * 1024):.1f} MB")
+        print("=" * 70)
+
+        return True
+
+    except Exception as e:
+        print(f"\n✗ ERROR durant el preprocessament:")
+        print(f"  {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def analyze_dataset(file_path):
     """
     Analitza un dataset de valoracions i mostra estadístiques
@@ -132,7 +271,11 @@ def analyze_dataset(file_path):
         return
     
     try:
-        df = pd.read_csv(file_path)
+        try:
+            df = read_ratings_csv(file_path)
+        except ValueError:
+            # No és un fitxer de valoracions (user_id, anime_id, rating)
+            df = pd.read_csv(file_path)
         
         print(f"\n📊 INFORMACIÓ BÀSICA:")
         print(f"  Files totals:     {len(df):,}")
@@ -179,6 +322,153 @@ def analyze_dataset(file_path):
         print(f"\n✗ ERROR durant l'anàlisi:")
         print(f"  {str(e)}")
 
+def _histogram_median(values, counts):
+    """Mediana a partir d'un histograma (valors ordenats i freqüències)"""
+    total = int(counts.sum())
+    cumulative = np.cumsum(counts)
+    low = values[np.searchsorted(cumulative, (total - 1) // 2 + 1)]
+    high = values[np.searchsorted(cumulative, total // 2 + 1)]
+    return (float(low) + float(high)) / 2
+
+def _count_summary(counts):
+    """Mitjana, mediana, mínim i màxim dels comptatges dels ids presents"""
+    present = counts[counts > 0]
+    if len(present) == 0:
+        return {'unique': 0, 'mean': None, 'median': None, 'min': None, 'max': None}
+    return {
+        'unique': int(len(present)),
+        'mean': float(present.mean()),
+        'median': float(np.median(present)),
+        'min': int(present.min()),
+        'max': int(present.max()),
+    }
+
+def analyze_dataset_streaming(file_path, chunksize=CHUNK_SIZE, json_file=None):
+    """
+    Mateix informe que analyze_dataset en una sola passada per blocs:
+    - Mitjana i variància en línia (Welford, combinant les de cada bloc)
+    - Histograma de valoracions per a la mediana (el domini és d'enters petits)
+    - Comptatges per usuari i per anime amb np.bincount
+
+    Args:
+        json_file (str): Si es dona, hi desa les estadístiques en JSON
+
+    Returns:
+        dict: Estadístiques (None si hi ha hagut un error)
+    """
+    print("\n" + "=" * 70)
+    print(f"ANÀLISI DEL DATASET (STREAMING): {file_path}")
+    print("=" * 70)
+
+    if not os.path.exists(file_path):
+        print(f"\n✗ ERROR: No s'ha trobat el fitxer '{file_path}'")
+        return None
+
+    try:
+        rows = 0
+        columns = None
+        count, mean, m2 = 0, 0.0, 0.0
+        histogram = {}
+        user_counts = np.zeros(0, dtype=np.int64)
+        anime_counts = np.zeros(0, dtype=np.int64)
+
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            if columns is None:
+                columns = list(chunk.columns)
+            rows += len(chunk)
+
+            if 'rating' in chunk.columns:
+                ratings = chunk['rating'].dropna().to_numpy(dtype=np.float64)
+                if len(ratings):
+                    # Combinació de Welford entre l'acumulat i el bloc
+                    chunk_mean = ratings.mean()
+                    chunk_m2 = ((ratings - chunk_mean) ** 2).sum()
+                    total = count + len(ratings)
+                    delta = chunk_mean - mean
+                    mean += delta * len(ratings) / total
+                    m2 += chunk_m2 + delta ** 2 * count * len(ratings) / total
+                    count = total
+
+                    values, frequencies = np.unique(ratings, return_counts=True)
+                    for value, frequency in zip(values.tolist(), frequencies.tolist()):
+                        histogram[value] = histogram.get(value, 0) + frequency
+
+            if 'user_id' in chunk.columns:
+                user_counts = _add_counts(user_counts, chunk['user_id'].to_numpy(dtype=np.int64))
+            if 'anime_id' in chunk.columns:
+                anime_counts = _add_counts(anime_counts, chunk['anime_id'].to_numpy(dtype=np.int64))
+
+        stats = {
+            'file': str(file_path),
+            'rows': rows,
+            'columns': columns or [],
+            'size_mb': os.path.getsize(file_path) / (1024 * 1024),
+        }
+
+        if count:
+            values = np.array(sorted(histogram))
+            frequencies = np.array([histogram[value] for value in values])
+            stats['rating'] = {
+                'unique': len(histogram),
+                'mean': mean,
+                'median': _histogram_median(values, frequencies),
+                'std': float(np.sqrt(m2 / (count - 1))) if count > 1 else None,
+                'min': float(values[0]),
+                'max': float(values[-1]),
+                'minus_ones': int(histogram.get(-1.0, 0)),
+                'histogram': {f'{value:g}': int(frequency) for value, frequency in zip(values, frequencies)},
+            }
+        if 'user_id' in stats['columns']:
+            stats['users'] = _count_summary(user_counts)
+        if 'anime_id' in stats['columns']:
+            stats['animes'] = _count_summary(anime_counts)
+
+        print(f"\n📊 INFORMACIÓ BÀSICA:")
+        print(f"  Files totals:     {rows:,}")
+        print(f"  Columnes:         {stats['columns']}")
+        print(f"  Mida del fitxer:  {stats['size_mb']:.1f} MB")
+
+        if 'rating' in stats:
+            rating = stats['rating']
+            print(f"\n📈 VALORACIONS:")
+            print(f"  Valoracions úniques: {rating['unique']}")
+            print(f"  Mitjana:             {rating['mean']:.2f}")
+            print(f"  Mediana:             {rating['median']:.2f}")
+            if rating['std'] is not None:
+                print(f"  Desviació estàndard: {rating['std']:.2f}")
+            print(f"  Mínim:               {rating['min']:g}")
+            print(f"  Màxim:               {rating['max']:g}")
+            if rating['minus_ones'] > 0:
+                print(f"  ⚠ Valoracions -1:    {rating['minus_ones']:,} ({rating['minus_ones']/rows*100:.1f}%)")
+
+        for key, title, label in (('users', '👥 USUARIS', 'Usuaris únics:      '),
+                                  ('animes', '🎬 ANIMES', 'Animes únics:       ')):
+            if key not in stats or not stats[key]['unique']:
+                continue
+            summary = stats[key]
+            per = 'usuari' if key == 'users' else 'anime'
+            print(f"\n{title}:")
+            print(f"  {label} {summary['unique']:,}")
+            print(f"  Valoracions/{per}:")
+            print(f"    - Mitjana:         {summary['mean']:.1f}")
+            print(f"    - Mediana:         {summary['median']:.1f}")
+            print(f"    - Mínim:           {summary['min']}")
+            print(f"    - Màxim:           {summary['max']}")
+
+        print("=" * 70)
+
+        if json_file:
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=2)
+            print(f"💾 Estadístiques guardades a {json_file}")
+
+        return stats
+
+    except Exception as e:
+        print(f"\n✗ ERROR durant l'anàlisi:")
+        print(f"  {str(e)}")
+        return None
+
 if __name__ == "__main__":
     import sys
     
@@ -186,14 +476,28 @@ if __name__ == "__main__":
     
     # Comprovar arguments
     if len(sys.argv) > 1:
-        if sys.argv[1] == '--analyze':
+        if sys.argv[1] == '--stream':
+            # Mode streaming (filtre k-core exacte amb memòria acotada)
+            input_file = sys.argv[2] if len(sys.argv) > 2 else RATING_CSV
+            output_file = sys.argv[3] if len(sys.argv) > 3 else CLEANED_DATA_CSV
+            if not preprocess_ratings_streaming(input_file, output_file):
+                sys.exit(1)
+        elif sys.argv[1] == '--analyze-stream':
+            # Anàlisi per blocs (una sola passada), opcionalment amb sortida JSON
+            file_to_analyze = sys.argv[2] if len(sys.argv) > 2 else RATING_CSV
+            json_file = sys.argv[3] if len(sys.argv) > 3 else None
+            if analyze_dataset_streaming(file_to_analyze, json_file=json_file) is None:
+                sys.exit(1)
+        elif sys.argv[1] == '--analyze':
             # Mode anàlisi
             file_to_analyze = sys.argv[2] if len(sys.argv) > 2 else 'rating.csv'
             analyze_dataset(file_to_analyze)
         elif sys.argv[1] == '--help':
             print("Ús:")
             print("  python preprocessing_data.py                    # Preprocessar rating.csv")
+            print("  python preprocessing_data.py --stream [in] [out] # Preprocessar per blocs (k-core exacte)")
             print("  python preprocessing_data.py --analyze [file]   # Analitzar un fitxer")
+            print("  python preprocessing_data.py --analyze-stream [file] [json] # Analitzar per blocs")
             print("  python preprocessing_data.py --help             # Mostrar aquesta ajuda")
     else:
         # Mode preprocessament per defecte
@@ -0,0 +1,290 @@
+"""
+Avaluació offline del model: qualitat del rànquing i latència alhora
+
+1. Separa una part de les valoracions de cada usuari (hold-out)
+2. Entrena amb la resta amb el mateix pipeline que scripts/train_model.py
+3. Recomana per a cada usuari a partir de les seves valoracions d'entrenament
+   (get_recommendations_for_user en lot vectoritzat) i compara amb les retingudes
+4. Mesura la latència per consulta del camí de servei i el temps/mida del model
+
+Mètriques: precision@k, recall@k, NDCG@k i cobertura del catàleg.
+Una valoració retinguda és rellevant si és >= --relevant (escala 1-10 del dataset).
+
+Ús:
+    python scripts/evaluate_model.py
+    python scripts/evaluate_model.py --similarities pearson,cosine --dtypes float64,float32
+    python scripts/evaluate_model.py --users 500 --k 10 --json avaluacio.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Afegir el directori arrel al path
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from train_model import create_training_system
+from src.csv_reader import read_ratings_csv
+from src.similarity import SIMILARITIES
+
+
+def split_holdout(ratings_df, holdout, min_ratings, max_users, seed):
+    """
+    Separa una fracció de les valoracions de cada usuari mostrejat
+
+    Returns:
+        tuple: (valoracions d'entrenament, valoracions retingudes)
+    """
+    rng = np.random.default_rng(seed)
+
+    counts = ratings_df['user_id'].value_counts()
+    eligible = counts[counts >= min_ratings].index.to_numpy()
+    if max_users and len(eligible) > max_users:
+        eligible = rng.choice(eligible, size=max_users, replace=False)
+
+    candidates = ratings_df[ratings_df['user_id'].isin(eligible)]
+    # Ordre aleatori dins de cada usuari i es retenen les primeres posicions
+    shuffled = candidates.sample(frac=1.0, random_state=seed)
+    position = shuffled.groupby('user_id').cumcount()
+    sizes = shuffled['user_id'].map(counts)
+    test_mask = position < np.maximum(1, (sizes * holdout).astype(int))
+
+    test_df = shuffled[test_mask]
+    train_df = ratings_df.drop(index=test_df.index)
+    return train_df, test_df
+
+
+def ranking_metrics(recommended, relevant, k):
+    """
+    Returns:
+        tuple: (precision@k, recall@k, NDCG@k) d'una consulta
+    """
+    recommended = recommended[:k]
+    hits = [1.0 if anime_id in relevant else 0.0 for anime_id in recommended]
+    num_hits = sum(hits)
+
+    dcg = sum(hit / np.log2(rank + 2) for rank, hit in enumerate(hits))
+    ideal = sum(1.0 / np.log2(rank + 2) for rank in range(min(len(relevant), k)))
+
+    return num_hits / k, num_hits / len(relevant), dcg / ideal if ideal else 0.0
+
+
+def percentiles_ms(samples):
+    if not samples:
+        return {}
+    values = np.asarray(samples) * 1000
+    return {
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p90': round(float(np.percentile(values, 90)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'max': round(float(values.max()), 3),
+        'mean': round(float(values.mean()), 3),
+    }
+
+
+def evaluate(rec_system, queries, relevant_sets, similarity, dtype, k):
+    """
+    Avalua una combinació de similitud i precisió
+
+    Returns:
+        dict: Mètriques de qualitat, cobertura i temps del lot
+    """
+    start = time.perf_counter()
+    recommendations = rec_system.score_users_batch(
+        [query for _, query in queries], num_recommendations=k, similarity=similarity, dtype=dtype
+    )
+    batch_seconds = time.perf_counter() - start
+
+    precisions, recalls, ndcgs = [], [], []
+    recommended_items = set()
+    for (user_id, _), recommended in zip(queries, recommendations):
+        recommended_items.update(recommended)
+        relevant = relevant_sets.get(user_id)
+        if not relevant:
+            continue
+        precision, recall, ndcg = ranking_metrics(recommended, relevant, k)
+        precisions.append(precision)
+        recalls.append(recall)
+        ndcgs.append(ndcg)
+
+    return {
+        'similarity': similarity,
+        'dtype': np.dtype(dtype).name if dtype else None,
+        'evaluated_users': len(precisions),
+        f'precision@{k}': round(float(np.mean(precisions)), 5) if precisions else None,
+        f'recall@{k}': round(float(np.mean(recalls)), 5) if recalls else None,
+        f'ndcg@{k}': round(float(np.mean(ndcgs)), 5) if ndcgs else None,
+        'catalog_coverage': round(len(recommended_items) / len(rec_system.userRatings_pivot.columns), 5),
+        'batch_seconds': round(batch_seconds, 3),
+        'batch_ms_per_query': round(batch_seconds * 1000 / max(1, len(queries)), 3),
+    }
+
+
+def serving_latency(rec_system, queries, similarity, k, latency_queries):
+    """
+    Latència del camí de servei (una consulta cada vegada). Sempre fa servir la
+    matriu del model tal com està carregada: no depèn de --dtypes.
+
+    Returns:
+        dict: Percentils en mil·lisegons
+    """
+    latencies = []
+    for _, query in queries[:latency_queries]:
+        start = time.perf_counter()
+        rec_system.get_recommendations_for_user(query, num_recommendations=k, similarity=similarity)
+        latencies.append(time.perf_counter() - start)
+    return percentiles_ms(latencies)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Avaluació offline de les recomanacions")
+    parser.add_argument('--ratings', type=Path, default=root_dir / 'data' / 'cleaned_data.csv',
+                        help="Fitxer de valoracions netejat")
+    parser.add_argument('--anime', type=Path, default=root_dir / 'data' / 'anime.csv',
+                        help="Fitxer anime.csv")
+    parser.add_argument('--holdout', type=float, default=0.2,
+                        help="Fracció de valoracions retingudes per usuari")
+    parser.add_argument('--min-ratings', type=int, default=10,
+                        help="Mínim de valoracions perquè un usuari entri a l'avaluació")
+    parser.add_argument('--users', type=int, default=1000,
+                        help="Usuaris mostrejats (0 = tots)")
+    parser.add_argument('--relevant', type=float, default=8,
+                        help="Valoració mínima (1-10) perquè una retinguda sigui rellevant")
+    parser.add_argument('--k', type=int, default=10,
+                        help="Recomanacions per consulta")
+    parser.add_argument('--similarities', default='pearson',
+                        help=f"Similituds separades per comes ({', '.join(SIMILARITIES)})")
+    parser.add_argument('--dtypes', default='float64',
+                        help="Precisions de la matriu separades per comes (float64, float32)")
+    parser.add_argument('--latency-queries', type=int, default=200,
+                        help="Consultes per mesurar la latència del camí de servei")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', type=Path, default=None,
+                        help="Desa l'informe en aquest fitxer JSON (per defecte, per stdout)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    similarities = [name.strip() for name in args.similarities.split(',') if name.strip()]
+    for name in similarities:
+        if name not in SIMILARITIES:
+            print(f"❌ ERROR: Similitud desconeguda '{name}'. Opcions: {', '.join(SIMILARITIES)}",
+                  file=sys.stderr)
+            return False
+    try:
+        dtypes = [np.dtype(name.strip()) for name in args.dtypes.split(',') if name.strip()]
+    except TypeError as e:
+        print(f"❌ ERROR: Precisió desconeguda: {e}", file=sys.stderr)
+        return False
+
+    for path in (args.ratings, args.anime):
+        if not path.exists():
+            print(f"❌ ERROR: No s'ha trobat {path}", file=sys.stderr)
+            return False
+
+    # Tota la sortida informativa va a stderr: stdout queda pel JSON
+    log = sys.stderr
+    print("=" * 70, file=log)
+    print("🧪 AVALUACIÓ OFFLINE DEL MODEL", file=log)
+    print("=" * 70, file=log)
+
+    ratings_df = read_ratings_csv(args.ratings)
+    train_df, test_df = split_holdout(ratings_df, args.holdout, args.min_ratings, args.users, args.seed)
+    print(f"\n✂️  {len(train_df)} valoracions d'entrenament, {len(test_df)} retingudes "
+          f"({test_df['user_id'].nunique()} usuaris)", file=log)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        train_csv = Path(tmp_dir) / 'train_ratings.csv'
+        train_df.to_csv(train_csv, index=False)
+
+        rec_system = create_training_system(Path(tmp_dir) / 'model', args.anime, train_csv)
+
+        # L'entrenament imprimeix el progrés per stdout: es redirigeix a stderr
+        stdout = sys.stdout
+        sys.stdout = log
+        try:
+            start = time.perf_counter()
+            rec_system.train_model(save=True)
+            build_seconds = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+
+        model_files = list((Path(tmp_dir) / 'model').glob('corr_matrix_v*.pkl'))
+        model_size_mb = model_files[0].stat().st_size / (1024 * 1024) if model_files else None
+
+    # Consultes: valoracions d'entrenament de cada usuari avaluat (escala 1-10 -> 1-5)
+    pivot = rec_system.userRatings_pivot
+    evaluated_users = test_df['user_id'].unique()
+    queries = []
+    for user_id in evaluated_users:
+        if user_id not in pivot.index:
+            continue
+        row = pivot.loc[user_id].dropna()
+        if not row.empty:
+            queries.append((user_id, (row / 2).to_dict()))
+
+    # Rellevants: retingudes amb valoració alta d'animes que el model coneix
+    relevant_df = test_df[(test_df['rating'] >= args.relevant) & test_df['anime_id'].isin(pivot.columns)]
+    relevant_sets = relevant_df.groupby('user_id')['anime_id'].agg(lambda ids: set(ids.astype(int))).to_dict()
+
+    results = []
+    latencies = {}
+    for similarity in similarities:
+        if rec_system._similarity_matrix(similarity) is None:
+            print(f"⚠️  El model no té la similitud '{similarity}'", file=log)
+            continue
+        for dtype in dtypes:
+            print(f"\n📏 Avaluant {similarity} ({dtype.name})...", file=log)
+            result = evaluate(rec_system, queries, relevant_sets, similarity, dtype, args.k)
+            results.append(result)
+            print(f"   precision@{args.k}={result[f'precision@{args.k}']} "
+                  f"recall@{args.k}={result[f'recall@{args.k}']} "
+                  f"ndcg@{args.k}={result[f'ndcg@{args.k}']} "
+                  f"cobertura={result['catalog_coverage']}", file=log)
+
+        latencies[similarity] = serving_latency(rec_system, queries, similarity, args.k, args.latency_queries)
+        print(f"⏱️  Latència de servei {similarity}: p50={latencies[similarity].get('p50')} ms "
+              f"p99={latencies[similarity].get('p99')} ms", file=log)
+
+    report = {
+        'ratings': str(args.ratings),
+        'holdout': args.holdout,
+        'min_ratings': args.min_ratings,
+        'relevant_threshold': args.relevant,
+        'k': args.k,
+        'seed': args.seed,
+        'train_ratings': int(len(train_df)),
+        'test_ratings': int(len(test_df)),
+        'queries': len(queries),
+        'model': {
+            'build_seconds': round(build_seconds, 3),
+            'size_mb': round(model_size_mb, 2) if model_size_mb is not None else None,
+            'num_animes': int(len(pivot.columns)),
+            'num_users': int(len(pivot.index)),
+        },
+        'results': results,
+        'serving_latency_ms': latencies,
+    }
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Informe guardat a {args.json}", file=log)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
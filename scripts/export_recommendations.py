@@ -0,0 +1,262 @@
+"""
+Exportació offline de les recomanacions de tots els animes
+
+Calcula el top-N de get_recommendations_adjusted per a cada anime de la pivot i
+cada branca de valoració (per defecte 5, 3 i 1) i ho escriu en un fitxer NDJSON,
+una línia per (anime, valoració), per als sistemes que no consulten l'API
+(resums per correu, pàgines estàtiques...).
+
+- El model es carrega una sola vegada al procés principal i els workers el
+  comparteixen per fork (còpia en escriptura, sense tornar a llegir el PKL)
+- Per defecte es fa servir la matriu de similitud precalculada (nivell
+  'precomputed' de Pearson o 'full' de cosinus), no el corrwith de cada crida
+- Els animes es reparteixen en blocs; cada bloc acabat s'afegeix al fitxer i es
+  registra al checkpoint. Si el procés s'atura, en tornar-lo a llançar continua
+  pels blocs que faltaven (el fitxer es trunca a l'últim bloc complet)
+
+Ús:
+    python scripts/export_recommendations.py --output exportacio.ndjson
+    python scripts/export_recommendations.py --version 3 --similarity cosine --top 10 --workers 8
+    python scripts/export_recommendations.py --output exportacio.ndjson --restart
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Afegir el directori arrel i scripts/ al path (train_model és a scripts/)
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+sys.path.insert(0, str(root_dir / 'scripts'))
+
+from train_model import create_training_system
+from src.deadline import ADJUSTED_TIERS, COSINE_TIERS
+from src.similarity import SIMILARITIES
+
+
+# Branques de valoració de get_recommendations_adjusted (similars, moderats, diferents)
+DEFAULT_RATINGS = (5, 3, 1)
+
+# Animes per bloc (unitat de treball i de checkpoint)
+DEFAULT_CHUNK_SIZE = 100
+
+# Model compartit amb els workers (s'hereta en fer fork)
+_rec_system = None
+
+
+def default_tier(similarity):
+    """Nivell que llegeix la matriu precalculada de cada similitud"""
+    return 'precomputed' if similarity == 'pearson' else 'full'
+
+
+def _load_worker_model(model_dir, version):
+    """Inicialitzador dels workers quan no es pot fer fork (spawn)"""
+    global _rec_system
+    _rec_system = load_model(model_dir, version)
+
+
+def load_model(model_dir, version=None):
+    """
+    Carrega una versió del model (per defecte, la més recent)
+
+    Raises:
+        FileNotFoundError: Si la versió no existeix o no es pot carregar
+    """
+    rec_system = create_training_system(
+        model_dir, root_dir / 'data' / 'anime.csv', root_dir / 'data' / 'cleaned_data.csv'
+    )
+    if not rec_system._load_latest_model(version=version):
+        raise FileNotFoundError(f"No s'ha pogut carregar el model de {model_dir}")
+    return rec_system
+
+
+def export_chunk(chunk_index, anime_ids, ratings, top, tier, similarity):
+    """
+    Recomanacions d'un bloc d'animes
+
+    Returns:
+        tuple: (índex del bloc, línies NDJSON del bloc en bytes)
+    """
+    rec_system = _rec_system
+    lines = []
+    for anime_id in anime_ids:
+        title = rec_system.anime_name(anime_id)
+        for rating in ratings:
+            recommendations = rec_system.get_recommendations_adjusted(
+                anime_id, user_rating=rating, num_recommendations=top, tier=tier, similarity=similarity
+            ) or []
+            lines.append(json.dumps({
+                'anime_id': anime_id,
+                'title': title,
+                'rating': rating,
+                'recommendations': [
+                    {key: rec[key] for key in ('anime_id', 'title', 'score', 'correlation')}
+                    for rec in recommendations
+                ],
+            }, ensure_ascii=False))
+    return chunk_index, ''.join(line + '\n' for line in lines).encode('utf-8')
+
+
+def read_checkpoint(path, params):
+    """
+    Returns:
+        dict: Checkpoint existent amb els mateixos paràmetres, o None
+
+    Raises:
+        ValueError: Si hi ha un checkpoint amb paràmetres diferents
+    """
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('params') != params:
+        raise ValueError(
+            f"El checkpoint {path} és d'una exportació amb altres paràmetres "
+            f"({checkpoint.get('params')}). Usa --restart per començar de nou."
+        )
+    return checkpoint
+
+
+def write_checkpoint(path, checkpoint):
+    """Escriptura atòmica (fitxer temporal + rename)"""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exporta les recomanacions de tots els animes en NDJSON")
+    parser.add_argument('--model-dir', type=Path, default=root_dir / 'model',
+                        help="Directori dels models")
+    parser.add_argument('--version', type=int, default=None,
+                        help="Versió del model (per defecte, la més recent)")
+    parser.add_argument('--output', type=Path, default=root_dir / 'recommendations.ndjson',
+                        help="Fitxer NDJSON de sortida (el checkpoint és <sortida>.checkpoint.json)")
+    parser.add_argument('--similarity', default='pearson', choices=SIMILARITIES)
+    parser.add_argument('--tier', default=None, choices=ADJUSTED_TIERS,
+                        help="Nivell de càlcul (per defecte, la matriu precalculada; "
+                             "amb cosine només full o popularity)")
+    parser.add_argument('--ratings', default=','.join(str(rating) for rating in DEFAULT_RATINGS),
+                        help="Valoracions a exportar, separades per comes")
+    parser.add_argument('--top', type=int, default=6, help="Recomanacions per anime i valoració")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Animes per bloc")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processos del pool")
+    parser.add_argument('--restart', action='store_true',
+                        help="Ignora el checkpoint i torna a començar")
+    args = parser.parse_args()
+
+    # Es valida aquí i no dins dels workers, després del fork
+    if args.similarity == 'cosine' and args.tier is not None and args.tier not in COSINE_TIERS:
+        parser.error(f"--tier {args.tier} no és vàlid amb --similarity cosine "
+                     f"(opcions: {', '.join(COSINE_TIERS)})")
+    return args
+
+
+def main():
+    global _rec_system
+    args = parse_args()
+    ratings = [int(value) for value in args.ratings.split(',') if value.strip()]
+    tier = args.tier or default_tier(args.similarity)
+    checkpoint_path = args.output.with_name(args.output.name + '.checkpoint.json')
+
+    print("=" * 70)
+    print("📤 EXPORTACIÓ DE RECOMANACIONS")
+    print("=" * 70)
+
+    try:
+        _rec_system = load_model(args.model_dir, args.version)
+    except FileNotFoundError as e:
+        print(f"❌ ERROR: {e}")
+        return False
+    if args.similarity not in _rec_system.available_similarities():
+        print(f"❌ ERROR: El model no té la similitud '{args.similarity}'")
+        return False
+
+    # Catàleg alineat construït abans del fork, perquè els workers el comparteixin
+    _rec_system._get_column_info()
+    anime_ids = [int(anime_id) for anime_id in _rec_system.userRatings_pivot.columns]
+    chunks = [anime_ids[start:start + args.chunk_size] for start in range(0, len(anime_ids), args.chunk_size)]
+    params = {
+        'model_version': int(_rec_system.current_model_version),
+        'similarity': args.similarity,
+        'tier': tier,
+        'ratings': ratings,
+        'top': args.top,
+        'chunk_size': args.chunk_size,
+        'num_animes': len(anime_ids),
+    }
+
+    if args.restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    try:
+        checkpoint = read_checkpoint(checkpoint_path, params)
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+        return False
+    if checkpoint is not None and not args.output.exists():
+        print(f"⚠️  Hi ha checkpoint però no {args.output}: es torna a començar")
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = {'params': params, 'done': [], 'bytes': 0, 'completed': False}
+        args.output.write_bytes(b'')
+
+    # Descartar el que s'hagués escrit després de l'últim bloc registrat
+    with open(args.output, 'r+b') as f:
+        f.truncate(checkpoint['bytes'])
+
+    done = set(checkpoint['done'])
+    pending = [index for index in range(len(chunks)) if index not in done]
+    print(f"\n🎬 {len(anime_ids)} animes × {len(ratings)} valoracions en {len(chunks)} blocs "
+          f"(model v{params['model_version']}, {args.similarity}/{tier})")
+    if done:
+        print(f"♻️  Reprenent: {len(done)} blocs ja exportats, en falten {len(pending)}")
+
+    start = time.perf_counter()
+    with open(args.output, 'ab') as output:
+        def save(chunk_index, data):
+            output.write(data)
+            output.flush()
+            os.fsync(output.fileno())
+            done.add(chunk_index)
+            checkpoint['done'] = sorted(done)
+            checkpoint['bytes'] = output.tell()
+            write_checkpoint(checkpoint_path, checkpoint)
+            print(f"   ✓ Bloc {chunk_index + 1}/{len(chunks)} ({len(done)}/{len(chunks)}, "
+                  f"{time.perf_counter() - start:.1f} s)")
+
+        task_args = (ratings, args.top, tier, args.similarity)
+        if args.workers <= 1:
+            for index in pending:
+                save(*export_chunk(index, chunks[index], *task_args))
+        else:
+            # Amb fork els workers hereten _rec_system; amb spawn cadascun el torna a carregar
+            methods = multiprocessing.get_all_start_methods()
+            if 'fork' in methods:
+                pool = ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context('fork'))
+            else:
+                pool = ProcessPoolExecutor(args.workers, initializer=_load_worker_model,
+                                           initargs=(args.model_dir, params['model_version']))
+            with pool:
+                futures = [pool.submit(export_chunk, index, chunks[index], *task_args) for index in pending]
+                for future in as_completed(futures):
+                    save(*future.result())
+
+    checkpoint['completed'] = True
+    write_checkpoint(checkpoint_path, checkpoint)
+
+    size_mb = args.output.stat().st_size / (1024 * 1024)
+    print(f"\n✅ {len(anime_ids) * len(ratings)} llistes exportades a {args.output} "
+          f"({size_mb:.1f} MB) en {time.perf_counter() - start:.1f} s")
+    print("=" * 70)
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -3,117 +3,259 @@
 Script per verificar i corregir l'encoding dels fitxers CSV
 Converteix automàticament a UTF-8 si cal
 
+La detecció mostreja diversos trams repartits per tot el fitxer (no només
+l'inici) i la conversió es fa en streaming per blocs, amb memòria acotada
+encara que el fitxer sigui de diversos GB.
+
 Ús:
-    python scripts/fix_encoding.py
+    python scripts/fix_encoding.py                      # Interactiu (pregunta abans de convertir)
+    python scripts/fix_encoding.py --check              # Només comprova (codi 1 si algun no és UTF-8)
+    python scripts/fix_encoding.py --yes data/rating.csv  # Converteix sense preguntar
 """
 
+import argparse
+import codecs
+import sys
+
 import chardet
 from pathlib import Path
 import shutil
 
-def detect_encoding(file_path):
-    """Detecta l'encoding d'un fitxer"""
+# Trams que es mostregen per detectar l'encoding i mida de cada tram
+SAMPLE_RANGES = 8
+SAMPLE_SIZE = 64 * 1024
+
+# Mida dels blocs de la conversió en streaming (1 MB)
+CHUNK_SIZE = 1024 * 1024
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+DEFAULT_FILES = [
+    DATA_DIR / 'anime.csv',
+    DATA_DIR / 'rating.csv',
+    DATA_DIR / 'cleaned_data.csv',
+]
+
+
+def _read_samples(file_path, ranges=SAMPLE_RANGES, sample_size=SAMPLE_SIZE):
+    """Trams de bytes repartits uniformement pel fitxer (inici i final inclosos)"""
+    size = Path(file_path).stat().st_size
+    if size <= ranges * sample_size:
+        with open(file_path, 'rb') as f:
+            return [f.read()]
+
+    step = (size - sample_size) / (ranges - 1)
+    samples = []
     with open(file_path, 'rb') as f:
-        result = chardet.detect(f.read(100000))  # Llegir primers 100KB
-    return result['encoding'], result['confidence']
+        for i in range(ranges):
+            f.seek(int(i * step))
+            samples.append(f.read(sample_size))
+    return samples
+
 
-def convert_to_utf8(input_file, output_file, source_encoding):
-    """Converteix un fitxer a UTF-8"""
+def _is_utf8(sample, first, last):
+    """
+    Indica si un tram és UTF-8 vàlid, tolerant caràcters tallats als extrems
+    (un tram del mig pot començar o acabar a mitja seqüència multibyte)
+    """
+    if not first:
+        # Saltar bytes de continuació (10xxxxxx) del caràcter anterior
+        skip = 0
+        while skip < min(3, len(sample)) and 0x80 <= sample[skip] < 0xC0:
+            skip += 1
+        sample = sample[skip:]
+    decoder = codecs.getincrementaldecoder('utf-8')('strict')
     try:
-        with open(input_file, 'r', encoding=source_encoding) as source:
-            content = source.read()
-        
-        with open(output_file, 'w', encoding='utf-8') as target:
-            target.write(content)
-        
+        decoder.decode(sample, final=last)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(file_path, ranges=SAMPLE_RANGES, sample_size=SAMPLE_SIZE):
+    """
+    Detecta l'encoding d'un fitxer mostrejant diversos trams
+
+    Returns:
+        tuple: (encoding, confiança, mixed)
+            mixed és True si uns trams són UTF-8 (no ASCII) i d'altres no
+    """
+    samples = _read_samples(file_path, ranges, sample_size)
+    valid = [_is_utf8(sample, i == 0, i == len(samples) - 1) for i, sample in enumerate(samples)]
+
+    if all(valid):
+        if all(sample.isascii() for sample in samples):
+            return 'ascii', 1.0, False
+        return 'utf-8', 1.0, False
+
+    # Detectar l'encoding dels trams que no són UTF-8. Els trams només ASCII
+    # són compatibles amb qualsevol encoding: és barrejat si n'hi ha d'UTF-8 no ASCII
+    result = chardet.detect(b''.join(sample for sample, ok in zip(samples, valid) if not ok))
+    mixed = any(ok and not sample.isascii() for sample, ok in zip(samples, valid))
+    return result['encoding'], result['confidence'], mixed
+
+
+def convert_to_utf8(input_file, output_file, source_encoding, chunk_size=CHUNK_SIZE, mixed=False):
+    """
+    Converteix un fitxer a UTF-8 en streaming (memòria acotada per chunk_size)
+
+    Args:
+        source_encoding (str): Encoding d'origen
+        mixed (bool): Si True, cada línia que ja és UTF-8 vàlid es conserva i
+            només es converteixen les altres des de source_encoding
+    """
+    try:
+        with open(input_file, 'rb') as source, open(output_file, 'wb') as target:
+            if mixed:
+                for line in source:
+                    try:
+                        line.decode('utf-8')
+                        target.write(line)
+                    except UnicodeDecodeError:
+                        target.write(line.decode(source_encoding).encode('utf-8'))
+            else:
+                decoder = codecs.getincrementaldecoder(source_encoding)('strict')
+                encoder = codecs.getincrementalencoder('utf-8')('strict')
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    target.write(encoder.encode(decoder.decode(chunk)))
+                target.write(encoder.encode(decoder.decode(b'', final=True), final=True))
+
         return True
     except Exception as e:
         print(f"❌ Error convertint: {e}")
         return False
 
-def fix_csv_encoding():
-    """Verifica i corregeix l'encoding de tots els CSV"""
-    
-    data_dir = Path(__file__).resolve().parent.parent / 'data'
-    
-    csv_files = [
-        'anime.csv',
-        'rating.csv',
-        'cleaned_data.csv'
-    ]
-    
+
+def fix_file_encoding(file_path, mode='ask', chunk_size=CHUNK_SIZE):
+    """
+    Verifica un fitxer i el converteix a UTF-8 si cal
+
+    Args:
+        mode (str): 'ask' (pregunta), 'yes' (converteix sense preguntar) o 'check' (només informa)
+
+    Returns:
+        bool: True si el fitxer queda en UTF-8 (o ASCII)
+    """
+    print(f"\n📄 Processant: {file_path.name}")
+    print("-" * 40)
+
+    # Detectar encoding actual
+    encoding, confidence, mixed = detect_encoding(file_path)
+    file_size = file_path.stat().st_size / (1024 * 1024)
+
+    print(f"   Mida: {file_size:.1f} MB")
+    print(f"   Encoding detectat: {encoding} (confiança: {(confidence or 0)*100:.1f}%)")
+
+    # Si ja és UTF-8, no cal fer res
+    if encoding and encoding.upper() in ['UTF-8', 'ASCII']:
+        print(f"   ✅ Ja està en {encoding} - No cal conversió")
+        return True
+
+    if encoding is None:
+        print(f"   ❌ No s'ha pogut detectar l'encoding")
+        return False
+
+    if mixed:
+        print(f"   ⚠️  Encoding barrejat: part del fitxer és UTF-8 i part {encoding}")
+    else:
+        print(f"   ⚠️  No és UTF-8!")
+
+    if mode == 'check':
+        return False
+
+    if mode == 'ask':
+        response = input(f"   Vols convertir {file_path.name} a UTF-8? (s/n): ").lower()
+        if response != 's':
+            print(f"   ⏭️  Saltat")
+            return False
+
+    # Crear backup
+    backup_path = file_path.with_suffix(file_path.suffix + '.backup')
+    print(f"   📦 Creant backup: {backup_path.name}")
+    shutil.copy2(file_path, backup_path)
+
+    # Convertir a UTF-8
+    temp_path = file_path.with_suffix(file_path.suffix + '.utf8')
+
+    if convert_to_utf8(file_path, temp_path, encoding, chunk_size, mixed):
+        # Reemplaçar original
+        shutil.move(temp_path, file_path)
+        print(f"   ✅ Convertit correctament a UTF-8!")
+
+        # Verificar
+        new_encoding, _, _ = detect_encoding(file_path)
+        print(f"   📝 Nou encoding: {new_encoding}")
+        return True
+
+    print(f"   ❌ Error en la conversió")
+    if temp_path.exists():
+        temp_path.unlink()
+    return False
+
+
+def fix_csv_encoding(files=None, mode='ask', chunk_size=CHUNK_SIZE):
+    """
+    Verifica i corregeix l'encoding dels CSV
+
+    Returns:
+        bool: True si tots els fitxers existents queden en UTF-8
+    """
     print("="*70)
     print("🔍 VERIFICADOR D'ENCODING DE FITXERS CSV")
     print("="*70)
-    
-    for csv_file in csv_files:
-        file_path = data_dir / csv_file
-        
+
+    all_ok = True
+    for file_path in files or DEFAULT_FILES:
+        file_path = Path(file_path)
+
         if not file_path.exists():
-            print(f"\n⏭️  {csv_file}: No existeix")
-            continue
-        
-        print(f"\n📄 Processant: {csv_file}")
-        print("-" * 40)
-        
-        # Detectar encoding actual
-        encoding, confidence = detect_encoding(file_path)
-        file_size = file_path.stat().st_size / (1024 * 1024)
-        
-        print(f"   Mida: {file_size:.1f} MB")
-        print(f"   Encoding detectat: {encoding} (confiança: {confidence*100:.1f}%)")
-        
-        # Si ja és UTF-8, no cal fer res
-        if encoding and encoding.upper() in ['UTF-8', 'ASCII']:
-            print(f"   ✅ Ja està en {encoding} - No cal conversió")
+            print(f"\n⏭️  {file_path.name}: No existeix")
             continue
-        
-        # Preguntar si vol convertir
-        print(f"   ⚠️  No és UTF-8!")
-        
-        response = input(f"   Vols convertir {csv_file} a UTF-8? (s/n): ").lower()
-        
-        if response == 's':
-            # Crear backup
-            backup_path = file_path.with_suffix('.csv.backup')
-            print(f"   📦 Creant backup: {backup_path.name}")
-            shutil.copy2(file_path, backup_path)
-            
-            # Convertir a UTF-8
-            temp_path = file_path.with_suffix('.csv.utf8')
-            
-            if convert_to_utf8(file_path, temp_path, encoding):
-                # Reemplaçar original
-                shutil.move(temp_path, file_path)
-                print(f"   ✅ Convertit correctament a UTF-8!")
-                
-                # Verificar
-                new_encoding, _ = detect_encoding(file_path)
-                print(f"   📝 Nou encoding: {new_encoding}")
-            else:
-                print(f"   ❌ Error en la conversió")
-                if temp_path.exists():
-                    temp_path.unlink()
-        else:
-            print(f"   ⏭️  Saltat")
-    
+
+        if not fix_file_encoding(file_path, mode, chunk_size):
+            all_ok = False
+
     print("\n" + "="*70)
     print("✅ VERIFICACIÓ COMPLETADA")
     print("="*70)
-    
-    # Consells finals
-    print("\n💡 CONSELLS:")
-    print("   - Si encara tens problemes amb caràcters, prova:")
-    print("     iconv -f ISO-8859-1 -t UTF-8 data/anime.csv > data/anime_utf8.csv")
-    print("   - Recorda re-entrenar el model després de convertir els CSV")
-    print("     python scripts/train_model.py")
+
+    if mode != 'check':
+        # Consells finals
+        print("\n💡 CONSELLS:")
+        print("   - Si encara tens problemes amb caràcters, prova:")
+        print("     iconv -f ISO-8859-1 -t UTF-8 data/anime.csv > data/anime_utf8.csv")
+        print("   - Recorda re-entrenar el model després de convertir els CSV")
+        print("     python scripts/train_model.py")
+
+    return all_ok
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verifica i converteix a UTF-8 els fitxers CSV")
+    parser.add_argument('files', nargs='*', type=Path,
+                        help="Fitxers a processar (per defecte, els CSV de data/)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--yes', '-y', action='store_true',
+                       help="Converteix sense preguntar")
+    group.add_argument('--check', action='store_true',
+                       help="Només comprova; surt amb codi 1 si algun fitxer no és UTF-8")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="Bytes per bloc de la conversió")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
+    args = parse_args()
+    mode = 'check' if args.check else 'yes' if args.yes else 'ask'
     try:
-        fix_csv_encoding()
+        if not fix_csv_encoding(args.files, mode, args.chunk_size) and mode != 'ask':
+            sys.exit(1)
     except KeyboardInterrupt:
         print("\n\n⚠️  Operació cancel·lada per l'usuari")
     except Exception as e:
         print(f"\n❌ Error inesperat: {e}")
         import traceback
         traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,444 @@
+"""
+Prova de càrrega HTTP de l'API amb trànsit realista
+
+Reprodueix trànsit concurrent contra els endpoints de app.py per veure la
+contenció entre peticions, el vigilant de models i l'entrenament en background,
+que els microbenchmarks no mostren:
+- /api/recommendations amb títols triats amb una distribució de Zipf
+  (pocs títols molt demanats i una cua llarga) i una barreja de valoracions
+- /api/recommendations-multiple amb perfils de diversos títols
+- /api/search amb prefixos dels títols
+- /api/animes (catàleg sencer)
+
+Per defecte tot és local: genera un dataset sintètic, entrena un model en un
+directori temporal i arrenca app.py (o serve.py) apuntant-hi. Opcionalment
+llança /api/train o publica una versió nova del model a mitja prova.
+
+Ús:
+    python scripts/load_test.py --duration 60 --concurrency 16
+    python scripts/load_test.py --train-at 20 --reload-at 40 --json carrega.json
+    python scripts/load_test.py --server serve --workers 4
+    python scripts/load_test.py --url http://localhost:5000 --duration 30
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Afegir el directori arrel al path
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from generate_ratings import generate_ratings
+from train_model import create_training_system
+
+
+# Pes de cada endpoint a la barreja de peticions
+DEFAULT_MIX = 'recommendations=0.55,multiple=0.2,search=0.2,animes=0.05'
+
+# Valoracions (escala 1-5 de l'API) i la seva freqüència
+DEFAULT_RATINGS = '5=0.35,4=0.3,3=0.2,2=0.1,1=0.05'
+
+ENDPOINTS = ('recommendations', 'multiple', 'search', 'animes')
+
+# Temps màxim d'espera perquè el servidor estigui preparat (/readyz)
+READY_TIMEOUT = 300
+
+
+def parse_weights(text, cast=str):
+    """
+    Converteix "clau=pes,clau=pes" en (claus, probabilitats)
+
+    Raises:
+        ValueError: Si el format no és vàlid o els pesos no sumen res
+    """
+    keys, weights = [], []
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        key, _, weight = item.partition('=')
+        keys.append(cast(key.strip()))
+        weights.append(float(weight))
+    total = sum(weights)
+    if not keys or total <= 0:
+        raise ValueError(f"Pesos no vàlids: '{text}'")
+    return keys, np.asarray(weights) / total
+
+
+class TrafficGenerator:
+    """Genera peticions amb la barreja d'endpoints, títols i valoracions indicada"""
+
+    def __init__(self, titles, mix, ratings, zipf, profile_size, seed):
+        self.titles = titles
+        self.endpoints, self.endpoint_p = mix
+        self.ratings, self.rating_p = ratings
+        self.profile_size = profile_size
+        self.seed = seed
+
+        popularity = 1 / np.arange(1, len(titles) + 1) ** zipf
+        self.title_p = popularity / popularity.sum()
+
+    def rng(self, worker):
+        return np.random.default_rng(self.seed + worker)
+
+    def _title(self, rng):
+        return self.titles[rng.choice(len(self.titles), p=self.title_p)]
+
+    def next_request(self, rng):
+        """
+        Returns:
+            tuple: (endpoint, mètode, camí, cos JSON o None)
+        """
+        endpoint = self.endpoints[rng.choice(len(self.endpoints), p=self.endpoint_p)]
+
+        if endpoint == 'recommendations':
+            body = {'anime': self._title(rng),
+                    'rating': float(self.ratings[rng.choice(len(self.ratings), p=self.rating_p)])}
+            return endpoint, 'POST', '/api/recommendations', body
+
+        if endpoint == 'multiple':
+            size = int(rng.integers(1, self.profile_size + 1))
+            profile = {self._title(rng): float(self.ratings[rng.choice(len(self.ratings), p=self.rating_p)])
+                       for _ in range(size)}
+            return endpoint, 'POST', '/api/recommendations-multiple', {'ratings': profile}
+
+        if endpoint == 'search':
+            title = self._title(rng)
+            prefix = title[:int(rng.integers(3, 8))]
+            return endpoint, 'GET', '/api/search?' + urllib.parse.urlencode({'q': prefix}), None
+
+        return endpoint, 'GET', '/api/animes', None
+
+
+def send(base_url, method, path, body=None, timeout=60):
+    """
+    Envia una petició i llegeix la resposta sencera
+
+    Returns:
+        int: Codi d'estat HTTP (0 si no s'ha pogut connectar)
+    """
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+def fetch_json(base_url, path, timeout=60):
+    with urllib.request.urlopen(base_url + path, timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def wait_until_ready(base_url, process=None, timeout=READY_TIMEOUT):
+    """Espera que /readyz retorni 200"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        if send(base_url, 'GET', '/readyz', timeout=5) == 200:
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def publish_next_model(model_dir):
+    """
+    Copia el model més recent com a versió nova perquè el vigilant el recarregui
+    (equival a un entrenament manual acabat, sense el cost d'entrenar)
+
+    Returns:
+        int: Versió publicada (None si no hi ha cap model)
+    """
+    versions = sorted(
+        (int(path.stem.split('_v')[1]), path) for path in Path(model_dir).glob('corr_matrix_v*.pkl')
+    )
+    if not versions:
+        return None
+    version, latest = versions[-1]
+    target = latest.with_name(f'corr_matrix_v{version + 1}.pkl')
+    partial = target.with_suffix('.tmp')
+    shutil.copyfile(latest, partial)
+    partial.replace(target)  # Atòmic: el vigilant mai veu un fitxer a mitges
+    return version + 1
+
+
+def prepare_synthetic(args, tmp_dir):
+    """
+    Genera les valoracions i entrena el model sintètic
+
+    Returns:
+        tuple: (rating.csv, directori del model, títols ordenats per popularitat)
+    """
+    ratings_csv = Path(tmp_dir) / 'rating.csv'
+    ratings = generate_ratings(args.anime, args.users, args.titles, args.density, seed=args.seed)
+    ratings.to_csv(ratings_csv, index=False)
+    print(f"🎲 {len(ratings)} valoracions sintètiques ({args.users} usuaris, {args.titles} animes)")
+
+    model_dir = Path(tmp_dir) / 'model'
+    rec_system = create_training_system(model_dir, args.anime, ratings_csv)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rec_system.train_model(save=True)
+    print(f"🏋️  Model sintètic entrenat en {time.perf_counter() - start:.1f} s")
+
+    # Popularitat real del dataset sintètic per ordenar la distribució de Zipf
+    popular = rec_system.get_popular_animes(len(rec_system.userRatings_pivot.columns))
+    return ratings_csv, model_dir, popular
+
+
+def start_server(args, ratings_csv, model_dir, log_file):
+    """Arrenca app.py o serve.py contra el model sintètic"""
+    env = dict(os.environ)
+    env.update({
+        'ANIME_CSV': str(args.anime),
+        'RATING_CSV': str(ratings_csv),
+        'MODEL_DIR': str(model_dir),
+        'PORT': str(args.port),
+        'MODEL_CHECK_INTERVAL': str(args.model_check_interval),
+        'PYTHONUNBUFFERED': '1',
+    })
+    if args.server == 'serve':
+        command = [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(args.port),
+                   '--workers', str(args.workers)]
+    else:
+        command = [sys.executable, 'app.py']
+
+    return subprocess.Popen(command, cwd=root_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def run_load(base_url, generator, args, model_dir):
+    """
+    Llança els workers durant args.duration segons i els esdeveniments programats
+
+    Returns:
+        tuple: (mostres (endpoint, inici relatiu, latència, estat), esdeveniments)
+    """
+    samples = []
+    samples_lock = threading.Lock()
+    events = []
+    start = time.perf_counter()
+    stop_at = start + args.duration
+
+    def worker(index):
+        rng = generator.rng(index)
+        local = []
+        while time.perf_counter() < stop_at:
+            endpoint, method, path, body = generator.next_request(rng)
+            sent = time.perf_counter()
+            status = send(base_url, method, path, body, timeout=args.timeout)
+            local.append((endpoint, sent - start, time.perf_counter() - sent, status))
+        with samples_lock:
+            samples.extend(local)
+
+    def scheduled(at, name, action):
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if time.perf_counter() < stop_at:
+            result = action()
+            events.append({'event': name, 'at_s': round(time.perf_counter() - start, 2), 'result': result})
+            print(f"   ⚡ {name} als {at:.0f} s: {result}")
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    if args.train_at is not None:
+        threads.append(threading.Thread(
+            target=scheduled, args=(args.train_at, 'train', lambda: send(base_url, 'POST', '/api/train')),
+            daemon=True))
+    if args.reload_at is not None and model_dir is not None:
+        threads.append(threading.Thread(
+            target=scheduled, args=(args.reload_at, 'reload', lambda: publish_next_model(model_dir)),
+            daemon=True))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return samples, events
+
+
+def summarize(samples, duration):
+    """
+    Returns:
+        dict: Per endpoint, throughput, codis d'estat i percentils de latència
+    """
+    if not samples:
+        return {}
+
+    df = pd.DataFrame(samples, columns=['endpoint', 'start_s', 'latency_s', 'status'])
+    report = {}
+    for endpoint, group in list(df.groupby('endpoint')) + [('total', df)]:
+        ok = group[group['status'] == 200]
+        latencies = ok['latency_s'].to_numpy() * 1000
+        report[endpoint] = {
+            'requests': int(len(group)),
+            'throughput_rps': round(len(group) / duration, 2),
+            'ok': int(len(ok)),
+            'status': {str(code): int(count) for code, count in group['status'].value_counts().items()},
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+            'p99_ms': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+            'max_ms': round(float(latencies.max()), 2) if len(latencies) else None,
+        }
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prova de càrrega HTTP de l'API de recomanacions")
+    parser.add_argument('--url', default=None,
+                        help="Servidor ja en marxa (per defecte s'arrenca un servidor local sintètic)")
+    parser.add_argument('--server', choices=('app', 'serve'), default='app',
+                        help="Servidor local: app.py (un procés) o serve.py (pre-fork)")
+    parser.add_argument('--workers', type=int, default=2, help="Workers de serve.py")
+    parser.add_argument('--port', type=int, default=5055, help="Port del servidor local")
+    parser.add_argument('--anime', type=Path, default=root_dir / 'data' / 'anime.csv',
+                        help="Fitxer anime.csv")
+    parser.add_argument('--users', type=int, default=2000, help="Usuaris del dataset sintètic")
+    parser.add_argument('--titles', type=int, default=400, help="Animes del dataset sintètic")
+    parser.add_argument('--density', type=float, default=0.15, help="Densitat del dataset sintètic")
+    parser.add_argument('--duration', type=float, default=30, help="Durada de la prova (segons)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Clients simultanis")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Pes de cada endpoint")
+    parser.add_argument('--ratings', default=DEFAULT_RATINGS, help="Freqüència de cada valoració (1-5)")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Exponent de Zipf dels títols demanats")
+    parser.add_argument('--profile-size', type=int, default=8,
+                        help="Màxim de títols per perfil a /api/recommendations-multiple")
+    parser.add_argument('--train-at', type=float, default=None,
+                        help="Segon de la prova en què es crida /api/train")
+    parser.add_argument('--reload-at', type=float, default=None,
+                        help="Segon de la prova en què es publica una versió nova del model")
+    parser.add_argument('--model-dir', type=Path, default=None,
+                        help="Directori de models del servidor (amb --url i --reload-at)")
+    parser.add_argument('--model-check-interval', type=int, default=5,
+                        help="Interval del vigilant de models del servidor local (segons)")
+    parser.add_argument('--timeout', type=float, default=60, help="Timeout per petició (segons)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', type=Path, default=None, help="Desa l'informe en aquest JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    try:
+        mix = parse_weights(args.mix)
+        ratings = parse_weights(args.ratings, cast=float)
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+        return False
+    unknown = set(mix[0]) - set(ENDPOINTS)
+    if unknown:
+        print(f"❌ ERROR: Endpoints desconeguts: {', '.join(sorted(unknown))}. Opcions: {', '.join(ENDPOINTS)}")
+        return False
+
+    print("=" * 70)
+    print("🔥 PROVA DE CÀRREGA HTTP")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        process = None
+        log_path = Path(tmp_dir) / 'server.log'
+        model_dir = args.model_dir
+        titles = None
+
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            if not args.anime.exists():
+                print(f"❌ ERROR: No s'ha trobat {args.anime}")
+                return False
+            ratings_csv, model_dir, titles = prepare_synthetic(args, tmp_dir)
+            base_url = f'http://127.0.0.1:{args.port}'
+            log_file = open(log_path, 'w', encoding='utf-8')
+            process = start_server(args, ratings_csv, model_dir, log_file)
+            print(f"🌐 Servidor {args.server} arrencat a {base_url} (pid {process.pid})")
+
+        try:
+            if not wait_until_ready(base_url, process):
+                print("❌ ERROR: El servidor no està preparat (/readyz)")
+                if process is not None:
+                    print(log_path.read_text(encoding='utf-8')[-3000:])
+                return False
+
+            if titles is None:
+                # Sense el dataset, l'ordre de popularitat és una permutació fixa del catàleg
+                catalog = [anime['name'] for anime in fetch_json(base_url, '/api/animes')['animes']]
+                titles = list(np.random.default_rng(args.seed).permutation(catalog))
+            if not titles:
+                print("❌ ERROR: El catàleg és buit")
+                return False
+
+            generator = TrafficGenerator(titles, mix, ratings, args.zipf, args.profile_size, args.seed)
+            print(f"\n🚦 {args.concurrency} clients durant {args.duration:.0f} s "
+                  f"({len(titles)} títols, Zipf {args.zipf})...")
+            samples, events = run_load(base_url, generator, args, model_dir)
+            if args.reload_at is not None and model_dir is None:
+                print("⚠️  --reload-at necessita --model-dir quan s'usa --url")
+        finally:
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                log_file.close()
+
+    report = {
+        'config': {
+            'url': args.url,
+            'server': None if args.url else args.server,
+            'workers': args.workers if not args.url and args.server == 'serve' else None,
+            'cpu_count': os.cpu_count(),
+            'duration_s': args.duration,
+            'concurrency': args.concurrency,
+            'mix': args.mix,
+            'ratings': args.ratings,
+            'zipf': args.zipf,
+            'seed': args.seed,
+        },
+        'events': events,
+        'endpoints': summarize(samples, args.duration),
+    }
+
+    print(f"\n{'Endpoint':<18}{'Peticions':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  Estats")
+    print("-" * 78)
+    for endpoint, stats in report['endpoints'].items():
+        percentiles = [f"{stats[key]:>10.1f}" if stats[key] is not None else f"{'-':>10}"
+                       for key in ('p50_ms', 'p95_ms', 'p99_ms')]
+        print(f"{endpoint:<18}{stats['requests']:>10}{stats['throughput_rps']:>9.1f}"
+              f"{''.join(percentiles)}  {stats['status']}")
+    print("=" * 70)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Informe guardat a {args.json}")
+
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -6,8 +6,11 @@ i guardar-la en un fitxer PKL versionat.
 
 Ús:
     python scripts/train_model.py
+    python scripts/train_model.py --compress zlib --level 6
+    python scripts/train_model.py --memory
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -16,11 +19,58 @@ root_dir = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(root_dir))
 
 from src.recommendation_system import RecommendationSystem
+from src.models import AnimeCatalog
+from src.model_storage import CODECS, validate_codec
+from src.deadline import LatencyEstimator
+from src.memory import format_report
 
 
-def train_new_model():
+def create_training_system(model_dir, anime_csv, rating_csv, compression=None, compression_level=None):
+    """
+    Crea una instància de RecommendationSystem buida (sense carregar cap model)
+    preparada per entrenar amb train_model()
+    
+    Args:
+        model_dir (Path): Directori on es desaran els models
+        anime_csv (Path): Fitxer anime.csv
+        rating_csv (Path): Fitxer de valoracions
+    """
+    rec_system = RecommendationSystem.__new__(RecommendationSystem)
+    rec_system.animes_dict = AnimeCatalog()
+    rec_system.users_dict = {}
+    rec_system.ratings_df = None
+    rec_system.userRatings_pivot = None
+    rec_system.corrMatrix = None
+    rec_system.cosineMatrix = None
+    rec_system.userNeighbors = None
+    rec_system.contentNeighbors = None
+    rec_system.animeStats = None
+    rec_system.animePopularity = None
+    rec_system.animeAvgRating = None
+    rec_system.model_dir = Path(model_dir)
+    rec_system.anime_csv_path = Path(anime_csv)
+    rec_system.rating_csv_path = Path(rating_csv)
+    rec_system.model_dir.mkdir(exist_ok=True)
+    rec_system.current_model_version = None
+    rec_system.model_load_time = None
+    rec_system.data_files_hash = None
+    rec_system.latency_estimator = LatencyEstimator()
+    rec_system._column_info = None
+    rec_system._content_lookup = None
+    rec_system.compression, rec_system.compression_level = validate_codec(
+        compression, compression_level
+    )
+    return rec_system
+
+
+def train_new_model(compression=None, compression_level=None, memory=False):
     """
     Entrena un nou model i el guarda amb versionat automàtic
+    
+    Args:
+        compression (str): Còdec per comprimir el model ('zlib', 'lzma', 'bz2' o None)
+        compression_level (int): Nivell de compressió
+        memory (bool): Si True, mostra la mida en memòria de cada component del model
     """
     DATA_DIR = root_dir / 'data'
     ANIME_CSV = DATA_DIR / 'anime.csv'
@@ -74,26 +124,19 @@ def train_new_model():
         print(f"\n🚀 Iniciant entrenament...\n")
         
         # Crear una instància temporal només per entrenar
-        rec_system = RecommendationSystem.__new__(RecommendationSystem)
-        rec_system.animes_dict = {}
-        rec_system.users_dict = {}
-        rec_system.ratings_df = None
-        rec_system.userRatings_pivot = None
-        rec_system.corrMatrix = None
-        rec_system.animeStats = None
-        rec_system.animePopularity = None
-        rec_system.animeAvgRating = None
-        rec_system.model_dir = root_dir / 'model'
-        rec_system.anime_csv_path = ANIME_CSV
-        rec_system.rating_csv_path = RATING_CSV
-        rec_system.model_dir.mkdir(exist_ok=True)
-        rec_system.current_model_version = None
-        rec_system.model_load_time = None
-        rec_system.data_files_hash = None
+        rec_system = create_training_system(
+            root_dir / 'model', ANIME_CSV, RATING_CSV, compression, compression_level
+        )
         
         # Entrenar i guardar
         rec_system.train_model(save=True)
         
+        if memory:
+            print("\n" + "="*70)
+            print("🧠 MEMÒRIA PER COMPONENT")
+            print("="*70)
+            print(format_report(rec_system.get_memory_report()))
+        
         print("\n" + "="*70)
         print("✅ MODEL ENTRENAT I GUARDAT!")
         print("="*70)
@@ -120,12 +163,45 @@ def train_new_model():
         return False
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Entrena un nou model de recomanacions")
+    parser.add_argument(
+        '--compress',
+        choices=sorted(CODECS),
+        default=None,
+        help="Comprimeix els components del model amb aquest còdec"
+    )
+    parser.add_argument(
+        '--level',
+        type=int,
+        default=None,
+        help="Nivell de compressió (per defecte el del còdec)"
+    )
+    parser.add_argument(
+        '--memory',
+        action='store_true',
+        help="Mostra la mida en memòria de cada component del model entrenat"
+    )
+    args = parser.parse_args()
+
+    # Sense --compress el nivell no tindria cap efecte: millor avisar que ignorar-lo
+    if args.level is not None and args.compress is None:
+        parser.error("--level només té sentit amb --compress")
+    if args.compress is not None:
+        try:
+            validate_codec(args.compress, args.level)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+
 if __name__ == "__main__":
     import time
     
+    args = parse_args()
     start_time = time.time()
     
-    if train_new_model():
+    if train_new_model(compression=args.compress, compression_level=args.level, memory=args.memory):
         elapsed_time = time.time() - start_time
         print(f"\n⏱️  Temps total: {elapsed_time:.1f} segons")
     else:
@@ -0,0 +1,455 @@
+"""
+Servidor de producció pre-fork per al Sistema de Recomanacions d'Animes
+
+El procés pare carrega el model una sola vegada i crea N workers amb fork().
+Els workers comparteixen el model en memòria (copy-on-write) i atenen les
+peticions pel mateix socket. Així el càlcul de recomanacions (pandas, CPU)
+no queda serialitzat pel GIL d'un sol procés.
+
+El procés pare no atén peticions:
+- Executa el scheduler (comprovació diària i vigilant de models)
+- Entrena en un procés fill separat quan cal
+- Quan detecta un model nou, el carrega, l'escalfa i recicla els workers un a un
+- Publica en un fitxer les mètriques que només registra ell (càrregues,
+  entrenament, jobs del scheduler) perquè les exposi el /metrics dels workers
+
+Ús (només Linux/macOS):
+    python serve.py --workers 4
+    python serve.py --workers 4 --threads 2 --port 8000
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer
+
+import app as webapp
+from src.metrics import (
+    REGISTRY,
+    MODEL_LOAD_DURATION,
+    MODEL_TRAINING_DURATION,
+    MODEL_TRAINING_STAGE_DURATION,
+    MODEL_WARMUP_DURATION,
+    SCHEDULER_JOB_RUNS,
+)
+
+
+# Segons d'espera perquè un worker acabi les peticions en curs
+GRACEFUL_TIMEOUT = 30
+
+# Segons màxims d'espera d'una plaça lliure abans de tornar al bucle del worker
+SLOT_WAIT = 0.5
+
+# Interval del vigilant de models (igual que a app.py)
+MODEL_CHECK_INTERVAL = webapp.app.config["MODEL_CHECK_INTERVAL"]
+
+# Mètriques que registren el procés pare i el d'entrenament, no els workers
+MASTER_METRICS = tuple(metric.name for metric in (
+    MODEL_LOAD_DURATION,
+    MODEL_TRAINING_DURATION,
+    MODEL_TRAINING_STAGE_DURATION,
+    MODEL_WARMUP_DURATION,
+    SCHEDULER_JOB_RUNS,
+))
+
+
+class WorkerWSGIServer(BaseWSGIServer):
+    """
+    Servidor d'un worker sobre el socket compartit
+
+    Tots els workers es desperten amb cada connexió i només un la pot acceptar.
+    Amb el socket bloquejant, els altres es quedarien dins d'accept() i no
+    atendrien l'aturada; sense bloqueig, accept() falla i tornen al bucle.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket.setblocking(False)
+
+    def get_request(self):
+        request, client_address = super().get_request()
+        # La connexió acceptada sí que ha de ser bloquejant (a macOS/BSD heretaria O_NONBLOCK)
+        request.setblocking(True)
+        return request, client_address
+
+
+class BoundedThreadedWSGIServer(socketserver.ThreadingMixIn, WorkerWSGIServer):
+    """
+    Servidor del worker amb threads i un màxim de peticions simultànies
+
+    El ThreadedWSGIServer de werkzeug crea un thread per cada connexió, sense
+    límit. Aquí cada connexió ocupa una plaça; quan no en queda cap, el worker
+    no fa accept() i la connexió es queda a la cua del socket compartit, on la
+    pot agafar un altre worker.
+    """
+
+    multithread = True
+    daemon_threads = True
+
+    def __init__(self, *args, max_threads, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slots = threading.BoundedSemaphore(max_threads)
+
+    def get_request(self):
+        # Amb totes les places ocupades s'espera poc i es torna al bucle de
+        # serve_forever(), perquè l'aturada (shutdown) tingui efecte igualment
+        if not self._slots.acquire(timeout=SLOT_WAIT):
+            raise socket.timeout("Totes les places del worker estan ocupades")
+        try:
+            return super().get_request()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request(self, request, client_address):
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+class PreforkServer:
+    """
+    Procés pare: manté el socket, els workers i el procés d'entrenament
+    """
+
+    def __init__(self, host, port, workers, threads, backlog=2048):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.threads = threads
+        self.backlog = backlog
+
+        self.sock = None
+        self.workers = {}  # pid -> versió del model amb què es va crear
+        self.trainer_pid = None
+        self.stopping = False
+        self.train_requested = False
+        self.master_pid = os.getpid()
+        self.frozen_version = None  # Versió del model congelada per gc.freeze()
+
+        # Fitxers de les mètriques del pare (llegit pels workers) i del procés d'entrenament
+        self.metrics_dir = None
+        self.published_metrics = None
+
+        # Estat d'entrenament visible des de tots els processos
+        self.training_state = multiprocessing.Value('b', 0)
+
+    # ------------------------------------------------------------------
+    # Socket i workers
+    # ------------------------------------------------------------------
+
+    def _create_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _freeze_model(self):
+        """
+        Congela els objectes actuals perquè el GC no toqui les pàgines
+        compartides (i no es copiïn) dins dels workers
+
+        Només es fa una vegada per versió del model: en canviar de model es
+        descongela i es recull abans, perquè el model antic (congelat) es
+        pugui alliberar al procés pare.
+        """
+        version = webapp.rec_system.current_model_version
+        if version == self.frozen_version:
+            return
+        if self.frozen_version is not None:
+            gc.unfreeze()
+            gc.collect()
+        gc.freeze()
+        self.frozen_version = version
+
+    def _spawn_worker(self):
+        self._freeze_model()
+
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+            os._exit(0)
+
+        self.workers[pid] = webapp.rec_system.current_model_version
+        return pid
+
+    def _run_worker(self):
+        """Codi que s'executa dins de cada worker"""
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+        # /api/train demana l'entrenament al procés pare
+        webapp.training_launcher = self._request_training_from_worker
+
+        # Les mètriques del pare es llegeixen del fitxer que publica (la còpia
+        # heretada en fer fork es quedaria aturada)
+        REGISTRY.share_from(self._metrics_file('master'), MASTER_METRICS)
+
+        if self.threads > 1:
+            server = BoundedThreadedWSGIServer(
+                self.host, self.port, webapp.app, fd=self.sock.fileno(), max_threads=self.threads
+            )
+        else:
+            server = WorkerWSGIServer(self.host, self.port, webapp.app, fd=self.sock.fileno())
+
+        def graceful_stop(signum, frame):
+            # shutdown() espera el bucle principal: s'ha de cridar des d'un altre thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, graceful_stop)
+
+        try:
+            server.serve_forever()
+        except Exception as e:
+            print(f"❌ Worker {os.getpid()}: {str(e)}")
+            os._exit(1)
+
+    def _request_training_from_worker(self):
+        self.training_state.value = 1
+        os.kill(self.master_pid, signal.SIGUSR1)
+
+    def _stop_worker(self, pid, sig=signal.SIGTERM):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _recycle_workers(self):
+        """
+        Substitueix els workers un a un per altres creats a partir del
+        model actual, sense deixar mai el servei sense workers
+        """
+        version = webapp.rec_system.current_model_version
+        old_workers = [pid for pid, v in self.workers.items() if v != version]
+        if not old_workers:
+            return
+
+        print(f"\n♻️  Reciclant {len(old_workers)} workers amb el model v{version}...")
+        for pid in old_workers:
+            self._spawn_worker()
+            self._stop_worker(pid)
+            self.workers.pop(pid, None)
+
+    # ------------------------------------------------------------------
+    # Mètriques del pare i del procés d'entrenament
+    # ------------------------------------------------------------------
+
+    def _metrics_file(self, name):
+        return os.path.join(self.metrics_dir, f'{name}.json')
+
+    def _publish_metrics(self):
+        """Escriu les mètriques del pare si han canviat des de l'última vegada"""
+        snapshot = REGISTRY.snapshot(MASTER_METRICS)
+        if snapshot != self.published_metrics:
+            REGISTRY.write_snapshot(self._metrics_file('master'), MASTER_METRICS)
+            self.published_metrics = snapshot
+
+    def _collect_trainer_metrics(self):
+        """Suma al pare les mètriques que ha deixat el procés d'entrenament"""
+        path = self._metrics_file('trainer')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                REGISTRY.merge(json.load(f))
+            os.remove(path)
+        except (OSError, ValueError):
+            pass
+
+    def _reap_children(self):
+        """Recull els processos fills que han acabat"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            if pid == self.trainer_pid:
+                self.trainer_pid = None
+                self.training_state.value = 0
+                self._collect_trainer_metrics()
+                if os.waitstatus_to_exitcode(status) == 0:
+                    print("\n✅ Entrenament acabat. El vigilant carregarà el model nou.")
+                    # Comprovar de seguida en lloc d'esperar el proper interval
+                    webapp.run_scheduler_job('model_watcher', webapp.check_for_new_models)
+                else:
+                    print("\n❌ L'entrenament ha fallat. Revisa els errors anteriors.")
+            elif pid in self.workers:
+                self.workers.pop(pid)
+                if not self.stopping:
+                    print(f"⚠️  Worker {pid} ha acabat inesperadament. Creant-ne un de nou...")
+
+    # ------------------------------------------------------------------
+    # Entrenament en un procés separat
+    # ------------------------------------------------------------------
+
+    def _launch_trainer(self):
+        """
+        Entrena en un procés fill: no competeix pel GIL ni amb el pare ni
+        amb els workers. El model nou es guarda a disc i el vigilant de
+        models del pare el detecta.
+        """
+        if self.trainer_pid is not None:
+            return
+
+        self.training_state.value = 1
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self.sock.close()
+            # Només les mètriques d'aquest entrenament: el pare les sumarà a les seves
+            REGISTRY.reset(MASTER_METRICS)
+            exit_code = 0
+            try:
+                print("\n🎓 ENTRENAMENT EN PROCÉS SEPARAT INICIAT")
+                webapp.rec_system.train_model(save=True)
+            except Exception as e:
+                print(f"❌ Error durant l'entrenament: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                try:
+                    REGISTRY.write_snapshot(self._metrics_file('trainer'), MASTER_METRICS)
+                except OSError as e:
+                    print(f"⚠️  No s'han pogut desar les mètriques de l'entrenament: {str(e)}")
+                sys.stdout.flush()
+                os._exit(exit_code)
+
+        self.trainer_pid = pid
+
+    def _launch_trainer_from_master(self):
+        # Cridat des del job diari del scheduler (thread): el fork es fa al bucle principal
+        self.training_state.value = 1
+        self.train_requested = True
+
+    # ------------------------------------------------------------------
+    # Bucle principal
+    # ------------------------------------------------------------------
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def _handle_train(self, signum, frame):
+        self.train_requested = True
+
+    def run(self):
+        self.sock = self._create_socket()
+        self.metrics_dir = tempfile.mkdtemp(prefix='anime-metrics-')
+        self._publish_metrics()
+
+        webapp.shared_training_state = self.training_state
+        webapp.training_launcher = self._launch_trainer_from_master
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGUSR1, self._handle_train)
+
+        for _ in range(self.num_workers):
+            self._spawn_worker()
+
+        # El scheduler només s'executa al procés pare. El vigilant de models
+        # s'executa al bucle principal perquè cap fork() passi a mitja recàrrega
+        scheduler = webapp.setup_scheduler()
+        scheduler.remove_job('model_watcher')
+        last_model_check = time.time()
+
+        print(f"\n🌐 Servidor pre-fork iniciat a http://{self.host}:{self.port}")
+        print(f"   👷 Workers: {self.num_workers} (threads per worker: {self.threads})")
+        print(f"   🆔 Procés pare: {self.master_pid}")
+        print("=" * 70 + "\n")
+
+        try:
+            while not self.stopping:
+                self._reap_children()
+
+                if self.train_requested:
+                    self.train_requested = False
+                    self._launch_trainer()
+
+                if time.time() - last_model_check >= MODEL_CHECK_INTERVAL:
+                    webapp.run_scheduler_job('model_watcher', webapp.check_for_new_models)
+                    last_model_check = time.time()
+
+                self._recycle_workers()
+                self._publish_metrics()
+
+                while len(self.workers) < self.num_workers and not self.stopping:
+                    self._spawn_worker()
+
+                time.sleep(0.5)
+        finally:
+            self._shutdown(scheduler)
+
+    def _shutdown(self, scheduler):
+        print("\n🛑 Aturant el servidor...")
+        scheduler.shutdown(wait=False)
+
+        for pid in list(self.workers):
+            self._stop_worker(pid)
+        if self.trainer_pid is not None:
+            self._stop_worker(self.trainer_pid)
+
+        deadline = time.time() + GRACEFUL_TIMEOUT
+        while (self.workers or self.trainer_pid) and time.time() < deadline:
+            self._reap_children()
+            time.sleep(0.1)
+
+        for pid in list(self.workers):
+            self._stop_worker(pid, signal.SIGKILL)
+
+        self.sock.close()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        print("👋 Servidor aturat. Adéu!")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Servidor pre-fork de l'API de recomanacions")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)),
+                        help="Nombre de processos worker (per defecte: nombre de CPUs)")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 1)),
+                        help="Peticions simultànies per worker (per defecte: 1)")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    if not hasattr(os, 'fork'):
+        print("❌ El mode pre-fork necessita fork() (Linux/macOS). Usa 'python app.py'.")
+        sys.exit(1)
+
+    args = parse_args()
+
+    if not webapp.initialize_system():
+        print("\n❌ NO ES POT INICIAR EL SERVIDOR")
+        print("  Executa primer: python scripts/train_model.py")
+        sys.exit(1)
+
+    # Escalfar al pare abans del fork: els workers neixen ja preparats
+    webapp.warmup_system()
+
+    PreforkServer(args.host, args.port, args.workers, args.threads).run()
@@ -0,0 +1,115 @@
+"""
+Control d'admissió per als endpoints de recomanacions
+
+Limita quantes peticions calculen alhora i manté una cua acotada per la resta.
+Si una petició hauria d'esperar més que el termini màxim (o la cua és plena)
+es rebutja de seguida amb Overloaded, perquè l'API pugui respondre 503 amb
+Retry-After en lloc de deixar que totes les peticions acabin per timeout.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """El servidor no pot admetre la petició ara mateix"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Servidor saturat ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+
+    def __init__(self, limit, max_queue, queue_timeout, retry_after=1):
+        """
+        Args:
+            limit (int): Peticions que poden calcular alhora
+            max_queue (int): Peticions que poden esperar a la cua
+            queue_timeout (float): Segons màxims d'espera a la cua
+            retry_after (int): Valor de Retry-After (segons) en rebutjar
+        """
+        self._cond = threading.Condition()
+        self.limit = max(1, int(limit))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = {'queue_full': 0, 'timeout': 0}
+        self.total_wait = 0.0
+
+    def acquire(self):
+        """
+        Ocupa una plaça, esperant a la cua si cal
+
+        Returns:
+            float: Segons que s'ha esperat
+
+        Raises:
+            Overloaded: Si la cua és plena o s'ha superat el termini d'espera
+        """
+        with self._cond:
+            if self.active < self.limit and self.queued == 0:
+                self.active += 1
+                self.admitted += 1
+                return 0.0
+
+            if self.queued >= self.max_queue:
+                self.rejected['queue_full'] += 1
+                raise Overloaded('queue_full', self.retry_after)
+
+            start = time.monotonic()
+            deadline = start + self.queue_timeout
+            self.queued += 1
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected['timeout'] += 1
+                        raise Overloaded('timeout', self.retry_after)
+                    self._cond.wait(remaining)
+            finally:
+                self.queued -= 1
+
+            waited = time.monotonic() - start
+            self.active += 1
+            self.admitted += 1
+            self.total_wait += waited
+            return waited
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        """Context manager: ocupa una plaça durant el bloc"""
+        waited = self.acquire()
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def set_limit(self, limit):
+        """Canvia el límit de concurrència (p. ex. mentre s'entrena)"""
+        with self._cond:
+            self.limit = max(1, int(limit))
+            self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'queued': self.queued,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': dict(self.rejected),
+                'total_wait_seconds': self.total_wait,
+            }
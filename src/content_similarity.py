@@ -0,0 +1,143 @@
+"""
+Similitud per contingut entre animes (cold start)
+
+Per als animes d'anime.csv que no són a la pivot (no tenen prou valoracions)
+no hi ha similitud col·laborativa. Aquí es construeix un vector per anime amb:
+- Gèneres amb pes TF-IDF (els gèneres rars pesen més que "Comedy")
+- Tipus (TV, Movie, OVA...) en one-hot
+- Nombre d'episodis per trams
+- Membres (popularitat) per trams logarítmics
+
+Cada bloc es normalitza i es pondera, i només es desen els top-K veïns de
+cada anime (la matriu completa de ~12k x 12k no cal per servir).
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.genres import GenreIndex
+
+
+# Veïns desats per anime
+DEFAULT_CONTENT_NEIGHBORS = 20
+
+# Pes de cada bloc de característiques (sumen 1)
+FEATURE_WEIGHTS = {
+    'genre': 0.6,
+    'type': 0.2,
+    'episodes': 0.1,
+    'members': 0.1,
+}
+
+# Trams d'episodis: 1, 2-6, 7-13, 14-26, 27-52, 53+ (i desconegut)
+EPISODE_BINS = (1, 6, 13, 26, 52)
+
+# Trams de membres (escala logarítmica)
+MEMBER_BINS = (100, 1000, 10000, 100000)
+
+# Animes per bloc en calcular els veïns
+CONTENT_BLOCK_SIZE = 1024
+
+
+def _one_hot(codes, size):
+    matrix = np.zeros((len(codes), size), dtype=np.float32)
+    matrix[np.arange(len(codes)), codes] = 1.0
+    return matrix
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def content_features(animes_df):
+    """
+    Vectors de contingut (un per fila d'animes_df), amb norma 1
+
+    Args:
+        animes_df (DataFrame): Columnes 'genre', 'type', 'episodes' i 'members'
+
+    Returns:
+        ndarray: Matriu animes x característiques (float32)
+    """
+    # Gèneres: binari -> TF-IDF
+    genre_index = GenreIndex(animes_df['genre'].tolist())
+    vocabulary_size = len(genre_index.vocabulary)
+    genres = np.zeros((len(animes_df), vocabulary_size), dtype=np.float32)
+    for bit in range(vocabulary_size):
+        word, offset = divmod(bit, 64)
+        genres[:, bit] = (genre_index.masks[:, word] >> np.uint64(offset)) & np.uint64(1)
+    document_frequency = genres.sum(axis=0)
+    idf = np.log((1 + len(animes_df)) / (1 + document_frequency)) + 1
+    genres *= idf.astype(np.float32)
+
+    # Tipus
+    type_codes, _ = pd.factorize(animes_df['type'].fillna('Unknown'))
+    types = _one_hot(type_codes, type_codes.max() + 1 if len(type_codes) else 1)
+
+    # Episodis ("Unknown" a anime.csv)
+    episodes = pd.to_numeric(animes_df['episodes'], errors='coerce').to_numpy()
+    episode_codes = np.where(
+        np.isnan(episodes),
+        len(EPISODE_BINS) + 1,
+        np.searchsorted(EPISODE_BINS, np.nan_to_num(episodes), side='left')
+    )
+    episode_features = _one_hot(episode_codes, len(EPISODE_BINS) + 2)
+
+    # Membres
+    members = pd.to_numeric(animes_df['members'], errors='coerce').fillna(0).to_numpy()
+    member_features = _one_hot(np.searchsorted(MEMBER_BINS, members, side='right'), len(MEMBER_BINS) + 1)
+
+    blocks = [
+        (genres, FEATURE_WEIGHTS['genre']),
+        (types, FEATURE_WEIGHTS['type']),
+        (episode_features, FEATURE_WEIGHTS['episodes']),
+        (member_features, FEATURE_WEIGHTS['members']),
+    ]
+    # Producte escalar final = suma ponderada dels cosinus de cada bloc
+    features = np.hstack([_normalize_rows(block) * np.sqrt(weight) for block, weight in blocks])
+    return features.astype(np.float32)
+
+
+def content_neighbor_index(animes_df, k=DEFAULT_CONTENT_NEIGHBORS, block_size=CONTENT_BLOCK_SIZE):
+    """
+    Top-K veïns per contingut de cada anime d'anime.csv
+
+    Returns:
+        dict: {
+            'anime_ids': anime_id de cada fila (int32),
+            'names': noms en l'ordre d'anime.csv,
+            'genres': text de gèneres de cada anime,
+            'ratings': rating d'anime.csv (float32, NaN si no n'hi ha),
+            'neighbors': posicions dels veïns (num_animes x K, int32),
+            'similarities': similitud de cada veí (num_animes x K, float32),
+        }
+    """
+    animes_df = animes_df.dropna(subset=['name']).reset_index(drop=True)
+    features = content_features(animes_df)
+
+    num_animes = len(animes_df)
+    k = max(0, min(k, num_animes - 1))
+    neighbors = np.zeros((num_animes, k), dtype=np.int32)
+    similarities = np.zeros((num_animes, k), dtype=np.float32)
+
+    for start in range(0, num_animes if k > 0 else 0, block_size):
+        stop = min(start + block_size, num_animes)
+        sims = features[start:stop] @ features.T
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # Un mateix no és veí
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        neighbors[start:stop] = np.take_along_axis(top, order, axis=1)
+        similarities[start:stop] = np.take_along_axis(top_sims, order, axis=1)
+
+    return {
+        'anime_ids': animes_df['anime_id'].to_numpy(dtype=np.int32),
+        'names': animes_df['name'].astype(str).to_numpy(),
+        'genres': animes_df['genre'].fillna('Unknown').astype(str).to_numpy(),
+        'ratings': pd.to_numeric(animes_df['rating'], errors='coerce').to_numpy(dtype=np.float32),
+        'neighbors': neighbors,
+        'similarities': similarities,
+    }
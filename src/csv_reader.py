@@ -0,0 +1,166 @@
+"""
+Lectura en paral·lel dels CSV de valoracions
+
+rating.csv / cleaned_data.csv només tenen columnes enteres (user_id, anime_id,
+rating). El fitxer es divideix en trams de bytes alineats a salts de línia, cada
+tram es parseja en un procés del pool directament a arrays NumPy compactes
+(int32 per als ids i int8 per a la valoració) i els resultats es concatenen.
+
+Amb fitxers petits (o workers=1) es llegeix en el mateix procés: crear el pool
+costaria més que el que s'estalvia.
+
+El pool usa el context per defecte (fork a Linux). Des d'un procés amb altres
+threads vius (l'entrenament dins de app.py) cal passar workers=1.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Columnes de les valoracions i el tipus compacte de cadascuna
+RATING_DTYPES = {
+    'user_id': np.int32,
+    'anime_id': np.int32,
+    'rating': np.int8,
+}
+
+# Per sota d'aquesta mida no val la pena obrir un pool de processos
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+# Trams per worker (més trams que workers reparteix millor la càrrega)
+RANGES_PER_WORKER = 4
+
+# Màxim de workers per defecte
+DEFAULT_MAX_WORKERS = 8
+
+
+def default_workers():
+    return max(1, min(os.cpu_count() or 1, DEFAULT_MAX_WORKERS))
+
+
+def _read_header(path):
+    """
+    Returns:
+        tuple: (noms de les columnes, offset del primer byte de dades)
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+    names = [name.strip() for name in header.decode('utf-8-sig').strip().split(',')]
+    return names, len(header)
+
+
+def _byte_ranges(path, start, num_ranges):
+    """Trams [inici, fi) que acaben just després d'un salt de línia"""
+    size = os.path.getsize(path)
+    if size <= start:
+        return []
+
+    step = max(1, (size - start) // num_ranges)
+    boundaries = [start]
+    with open(path, 'rb') as f:
+        for i in range(1, num_ranges):
+            position = start + i * step
+            if position <= boundaries[-1]:
+                continue
+            f.seek(position)
+            f.readline()  # Avançar fins al final de la línia en curs
+            position = f.tell()
+            if position >= size:
+                break
+            boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _compact(values, dtype):
+    """Converteix al tipus compacte si els valors hi caben (si no, float32 o int64)"""
+    if values.dtype.kind == 'f':
+        if np.all(np.mod(values, 1) == 0):
+            values = values.astype(np.int64)
+        else:
+            return values.astype(np.float32)
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        return values.astype(np.int64)
+    return values.astype(dtype, copy=False)
+
+
+def _parse_range(path, start, end, names, columns):
+    """
+    Parseja un tram de bytes del fitxer
+
+    Returns:
+        dict: columna -> ndarray
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    try:
+        df = pd.read_csv(
+            io.BytesIO(data),
+            header=None,
+            names=names,
+            usecols=columns,
+            on_bad_lines='skip',
+            engine='c',
+        ).dropna()
+    except pd.errors.EmptyDataError:
+        df = pd.DataFrame({column: np.empty(0, np.int64) for column in columns})
+    return {column: _compact(df[column].to_numpy(), RATING_DTYPES.get(column, np.int64)) for column in columns}
+
+
+def _concat(parts, columns):
+    arrays = {}
+    for column in columns:
+        pieces = [part[column] for part in parts]
+        dtype = np.result_type(*[piece.dtype for piece in pieces]) if pieces else RATING_DTYPES[column]
+        arrays[column] = np.concatenate(pieces).astype(dtype, copy=False) if pieces else np.empty(0, dtype)
+    return arrays
+
+
+def read_ratings_arrays(path, columns=tuple(RATING_DTYPES), workers=None, min_parallel_bytes=PARALLEL_MIN_BYTES):
+    """
+    Llegeix les columnes enteres d'un CSV de valoracions en paral·lel
+
+    Args:
+        path: Fitxer CSV amb capçalera
+        columns: Columnes a llegir (han de ser a la capçalera)
+        workers (int): Processos del pool (per defecte, CPUs fins a 8)
+        min_parallel_bytes (int): Mida mínima per usar el pool
+
+    Returns:
+        dict: columna -> ndarray (int32 per als ids, int8 per a la valoració)
+
+    Raises:
+        ValueError: Si falta alguna columna a la capçalera
+    """
+    names, data_start = _read_header(path)
+    missing = [column for column in columns if column not in names]
+    if missing:
+        raise ValueError(f"Falten columnes a {path}: {missing}")
+    columns = list(columns)
+
+    workers = workers or default_workers()
+    size = os.path.getsize(path)
+    if workers <= 1 or size < min_parallel_bytes:
+        df = pd.read_csv(path, usecols=columns, on_bad_lines='skip', engine='c').dropna()
+        return {column: _compact(df[column].to_numpy(), RATING_DTYPES.get(column, np.int64)) for column in columns}
+
+    ranges = _byte_ranges(path, data_start, workers * RANGES_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse_range, path, start, end, names, columns) for start, end in ranges]
+        parts = [future.result() for future in futures]
+    return _concat(parts, columns)
+
+
+def read_ratings_csv(path, columns=tuple(RATING_DTYPES), workers=None, min_parallel_bytes=PARALLEL_MIN_BYTES):
+    """
+    Com read_ratings_arrays, però retorna un DataFrame (mateix ordre de files
+    que el fitxer)
+    """
+    return pd.DataFrame(read_ratings_arrays(path, columns, workers, min_parallel_bytes))
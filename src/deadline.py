@@ -0,0 +1,113 @@
+"""
+Recomanacions amb termini (deadline) i degradació a mètodes més barats
+
+Cada mètode de recomanació té diversos nivells ("tiers"), del més precís al
+més barat. Es manté una estimació de la latència de cada nivell i, donat el
+temps que queda, es tria el primer nivell que previsiblement hi cap.
+
+Un nivell descartat només s'actualitza si s'executa. Perquè una mesura lenta
+puntual (pausa del GC, memòria cau freda) no el deixi descartat per sempre, si
+fa PROBE_INTERVAL segons que no té cap mesura es torna a provar una vegada, i
+la mesura d'aquesta prova substitueix l'estimació antiga en lloc de mitjanar-s'hi.
+"""
+
+import threading
+import time
+
+
+# Nivells de get_recommendations_adjusted, del més car al més barat:
+# - full: correlació de Pearson calculada al moment (corrwith sobre la pivot)
+# - precomputed: columna de la matriu de correlacions precalculada a l'entrenament
+# - popularity: rànquing per rating mitjà dels animes populars (sense correlació)
+ADJUSTED_TIERS = ('full', 'precomputed', 'popularity')
+
+# Nivells de get_recommendations_for_user
+USER_TIERS = ('full', 'popularity')
+
+# Amb similitud per cosinus la matriu ja és precalculada: 'full' és la seva columna
+COSINE_TIERS = ('full', 'popularity')
+
+# Segons sense mesures a partir dels quals es torna a provar un nivell descartat
+PROBE_INTERVAL = 30.0
+
+
+class LatencyEstimator:
+    """
+    Estimació conservadora de la latència per (mètode, nivell)
+    Mitjana i desviació mòbils exponencials: estimació = mitjana + k * desviació
+    """
+
+    def __init__(self, alpha=0.2, deviations=2.0, probe_interval=PROBE_INTERVAL):
+        self.alpha = alpha
+        self.deviations = deviations
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._state = {}  # (method, tier) -> [mitjana, desviació]
+        self._last_sample = {}  # (method, tier) -> instant de l'última mesura o prova
+        self._probing = set()  # (method, tier) amb una prova en curs
+
+    def observe(self, method, tier, seconds):
+        key = (method, tier)
+        with self._lock:
+            self._last_sample[key] = time.monotonic()
+            state = self._state.get(key)
+            # L'estimació d'un nivell en prova és antiga: es torna a començar
+            if state is None or key in self._probing:
+                self._probing.discard(key)
+                self._state[key] = [seconds, seconds / 2]
+                return
+            mean, deviation = state
+            error = seconds - mean
+            state[0] = mean + self.alpha * error
+            state[1] = deviation + self.alpha * (abs(error) - deviation)
+
+    def estimate(self, method, tier):
+        """
+        Returns:
+            float: Segons estimats, o None si encara no hi ha mesures
+        """
+        state = self._state.get((method, tier))
+        if state is None:
+            return None
+        return state[0] + self.deviations * state[1]
+
+    def choose_tier(self, method, tiers, remaining):
+        """
+        Tria el nivell més precís que previsiblement acaba dins del temps restant
+
+        Args:
+            tiers (tuple): Nivells ordenats del més car al més barat
+            remaining (float): Segons disponibles (None = sense termini)
+        """
+        if remaining is None:
+            return tiers[0]
+        if remaining <= 0:
+            return tiers[-1]
+
+        for tier in tiers[:-1]:
+            estimate = self.estimate(method, tier)
+            # Sense mesures encara: s'intenta (l'escalfament les proporciona)
+            if estimate is None or estimate <= remaining or self._claim_probe(method, tier):
+                return tier
+        return tiers[-1]
+
+    def _claim_probe(self, method, tier):
+        """
+        Decideix si una petició ha de tornar a provar un nivell descartat
+
+        Només una petició per interval: l'instant es reserva en el moment de
+        triar-la, no quan acaba, perquè les concurrents no provin totes alhora.
+        """
+        key = (method, tier)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sample.get(key, now) < self.probe_interval:
+                return False
+            self._last_sample[key] = now
+            self._probing.add(key)
+            return True
+
+    def get_estimates(self):
+        with self._lock:
+            keys = list(self._state)
+        return {f'{method}.{tier}': round(self.estimate(method, tier) * 1000, 3) for method, tier in keys}
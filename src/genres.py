@@ -0,0 +1,105 @@
+"""
+Índex de gèneres en bits
+
+La columna 'genre' d'anime.csv és un text separat per comes ("Action, Comedy").
+Es converteix una sola vegada en un vocabulari fix i una màscara de bits per
+anime (uint64, una paraula per cada 64 gèneres), de manera que filtrar per
+gèneres és una operació vectoritzada sobre l'array de màscares.
+"""
+
+import numpy as np
+
+
+BITS_PER_WORD = 64
+
+
+def parse_genres(genre):
+    """Llista de gèneres d'un valor de la columna 'genre' (pot ser NaN)"""
+    if not isinstance(genre, str):
+        return []
+    return [name.strip() for name in genre.split(',') if name.strip()]
+
+
+class GenreIndex:
+    """
+    Vocabulari de gèneres i màscara de bits per element
+
+    Args:
+        genres: Valors de la columna 'genre', un per element (ordre de la pivot)
+        vocabulary: Gèneres coneguts (per defecte, els que apareixen a genres)
+    """
+
+    def __init__(self, genres, vocabulary=None):
+        parsed = [parse_genres(genre) for genre in genres]
+        known = {name for names in parsed for name in names}
+        if vocabulary is not None:
+            known.update(vocabulary)
+        self.vocabulary = tuple(sorted(known))
+        self._positions = {name.lower(): i for i, name in enumerate(self.vocabulary)}
+
+        words = max(1, -(-len(self.vocabulary) // BITS_PER_WORD))
+        self.masks = np.zeros((len(parsed), words), dtype=np.uint64)
+        for row, names in enumerate(parsed):
+            for name in names:
+                bit = self._positions[name.lower()]
+                self.masks[row, bit // BITS_PER_WORD] |= np.uint64(1) << np.uint64(bit % BITS_PER_WORD)
+
+    def take(self, rows):
+        """
+        Índex amb el mateix vocabulari per a un subconjunt dels elements, sense
+        tornar a parsejar els textos
+
+        Args:
+            rows: Posició de cada element nou a aquest índex (-1: sense gèneres)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        index = GenreIndex.__new__(GenreIndex)
+        index.vocabulary = self.vocabulary
+        index._positions = self._positions
+        index.masks = np.zeros((len(rows), self.masks.shape[1]), dtype=np.uint64)
+        found = rows >= 0
+        index.masks[found] = self.masks[rows[found]]
+        return index
+
+    def normalize(self, names):
+        """
+        Valida una llista de gèneres (sense distingir majúscules)
+
+        Returns:
+            tuple: Noms canònics ordenats i sense repetits
+
+        Raises:
+            ValueError: Si algun gènere no existeix
+        """
+        canonical = set()
+        for name in names:
+            position = self._positions.get(str(name).strip().lower())
+            if position is None:
+                raise ValueError(f"Gènere desconegut: '{name}'")
+            canonical.add(self.vocabulary[position])
+        return tuple(sorted(canonical))
+
+    def query_mask(self, names):
+        """Màscara de bits amb els gèneres indicats"""
+        query = np.zeros(self.masks.shape[1], dtype=np.uint64)
+        for name in self.normalize(names):
+            bit = self._positions[name.lower()]
+            query[bit // BITS_PER_WORD] |= np.uint64(1) << np.uint64(bit % BITS_PER_WORD)
+        return query
+
+    def allowed(self, include=None, exclude=None):
+        """
+        Elements que tenen algun gènere d'include i cap d'exclude
+
+        Returns:
+            ndarray: Booleans alineats amb els elements, o None si no hi ha filtre
+        """
+        if not include and not exclude:
+            return None
+
+        allowed = np.ones(len(self.masks), dtype=bool)
+        if include:
+            allowed &= (self.masks & self.query_mask(include)).any(axis=1)
+        if exclude:
+            allowed &= ~(self.masks & self.query_mask(exclude)).any(axis=1)
+        return allowed
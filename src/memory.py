@@ -0,0 +1,155 @@
+"""
+Comptabilitat de memòria del model carregat
+
+Mesura la mida profunda (l'objecte i tot el que referencia) de cada component
+de RecommendationSystem, per saber quina estructura convé reduir primer i
+estimar la RAM necessària a partir de la mida del dataset.
+
+- DataFrame / Series / Index: memory_usage(deep=True) (inclou els strings)
+- ndarray: nbytes (més els objectes si és d'objectes)
+- dict, list, tuple, set i objectes Python (User, AnimeCatalog...): recursiu
+  amb sys.getsizeof (també els atributs de __slots__)
+Els objectes compartits entre components només es compten al primer.
+"""
+
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+
+# Components de RecommendationSystem, en l'ordre de l'informe
+MODEL_COMPONENTS = (
+    'animes_dict',
+    'users_dict',
+    'ratings_df',
+    'userRatings_pivot',
+    'corrMatrix',
+    'cosineMatrix',
+    'userNeighbors',
+    'contentNeighbors',
+    'animeStats',
+    'animePopularity',
+    'animeAvgRating',
+    '_column_info',
+    '_content_lookup',
+)
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Mida profunda d'un objecte en bytes
+
+    Args:
+        obj: Objecte a mesurar
+        seen (set): ids ja comptats (per no comptar dues vegades el compartit)
+
+    Returns:
+        int: Bytes
+    """
+    if seen is None:
+        seen = set()
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True, index=True))
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(deep_sizeof(item, seen) for item in obj.ravel())
+        return int(size)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, slot, None), seen) for slot in obj.__slots__)
+    return size
+
+
+def _shape(obj):
+    """Forma o nombre d'elements d'un component (None si no en té)"""
+    if obj is None:
+        return None
+    if hasattr(obj, 'shape'):
+        return list(obj.shape)
+    if isinstance(obj, Mapping):
+        return [len(obj)]
+    return None
+
+
+def memory_report(rec_system):
+    """
+    Mida de cada component del model carregat
+
+    Returns:
+        dict: {
+            'components': {nom: {'bytes', 'mb', 'shape', 'percent'}}, de més gran a més petit
+            'total_bytes', 'total_mb',
+            'num_ratings', 'bytes_per_rating': per extrapolar a datasets més grans,
+            'process_rss_mb': memòria resident del procés (None si no es pot llegir)
+        }
+    """
+    seen = set()
+    components = {}
+    for name in MODEL_COMPONENTS:
+        value = getattr(rec_system, name, None)
+        size = deep_sizeof(value, seen)
+        components[name] = {
+            'bytes': size,
+            'mb': round(size / (1024 * 1024), 2),
+            'shape': _shape(value),
+        }
+
+    total = sum(component['bytes'] for component in components.values())
+    for component in components.values():
+        component['percent'] = round(100 * component['bytes'] / total, 1) if total else 0.0
+
+    num_ratings = len(rec_system.ratings_df) if rec_system.ratings_df is not None else 0
+    return {
+        'components': dict(sorted(components.items(), key=lambda item: -item[1]['bytes'])),
+        'total_bytes': total,
+        'total_mb': round(total / (1024 * 1024), 2),
+        'num_ratings': num_ratings,
+        'bytes_per_rating': round(total / num_ratings, 1) if num_ratings else None,
+        'process_rss_mb': process_rss_mb(),
+    }
+
+
+def process_rss_mb():
+    """Memòria resident del procés actual en MB (Linux), o None"""
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def format_report(report):
+    """Taula de text de memory_report per a la consola"""
+    lines = [f"{'Component':<22}{'MB':>12}{'%':>8}  Forma"]
+    lines.append("-" * 60)
+    for name, component in report['components'].items():
+        shape = ' x '.join(str(dim) for dim in component['shape']) if component['shape'] else '-'
+        lines.append(f"{name:<22}{component['mb']:>12.2f}{component['percent']:>8.1f}  {shape}")
+    lines.append("-" * 60)
+    lines.append(f"{'TOTAL':<22}{report['total_mb']:>12.2f}")
+    if report['bytes_per_rating'] is not None:
+        lines.append(f"Bytes per valoració: {report['bytes_per_rating']} ({report['num_ratings']} valoracions)")
+    if report['process_rss_mb'] is not None:
+        lines.append(f"Memòria resident del procés: {report['process_rss_mb']} MB")
+    return '\n'.join(lines)
@@ -0,0 +1,447 @@
+"""
+Mètriques de l'aplicació en format de text de Prometheus
+Sense dependències externes: comptadors, gauges i histogrames amb buckets fixos
+
+Ús:
+    from src.metrics import REGISTRY, stage_timer
+
+    with stage_timer('adjusted', 'score'):
+        ...
+
+    REGISTRY.render()  # Text per l'endpoint /metrics
+
+Amb diversos processos (serve.py), les mètriques que registra un procés que no
+atén /metrics es poden desar en un fitxer (write_snapshot) i els workers les
+llegeixen d'allà en lloc de la seva còpia local (share_from).
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from src.profiling import record_stage
+
+
+# Buckets per defecte (segons): de 1 ms a 60 s
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Buckets per operacions llargues (càrrega i entrenament del model)
+SLOW_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _check_labels(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"La mètrica {self.name} espera les etiquetes {self.labelnames}, "
+                f"rebudes {labels}"
+            )
+
+    def header(self):
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+
+    def dump(self):
+        """Estat serialitzable en JSON: llista de [etiquetes, valor]"""
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, state):
+        """Suma un estat de dump() (d'un altre procés) al d'aquesta mètrica"""
+        with self._lock:
+            for labels, value in state:
+                labels = tuple(labels)
+                self._values[labels] = self._values.get(labels, 0) + value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def empty_copy(self):
+        return type(self)(self.name, self.documentation, self.labelnames)
+
+
+class Counter(_Metric):
+    """Comptador que només creix"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._check_labels(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        return self._values.get(labels, 0)
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self.header()
+        for labels, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(_Metric):
+    """Valor que pot pujar i baixar"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def set(self, value, *labels):
+        self._check_labels(labels)
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        self._check_labels(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def get(self, *labels):
+        return self._values.get(labels, 0)
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self.header()
+        for labels, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Histograma amb buckets fixos
+    observe() només fa una cerca binària i tres sumes sota un lock
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labels -> [comptes per bucket (+Inf inclòs), suma, total]
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                self._check_labels(labels)
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[labels] = state
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labels):
+        """Context manager que observa el temps transcorregut"""
+        return _Timer(self, labels)
+
+    def get_count(self, *labels):
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def dump(self):
+        with self._lock:
+            return [[list(labels), list(state[0]), state[1], state[2]] for labels, state in self._values.items()]
+
+    def merge(self, state):
+        with self._lock:
+            for labels, counts, total_sum, total_count in state:
+                labels = tuple(labels)
+                current = self._values.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total_sum
+                current[2] += total_count
+
+    def empty_copy(self):
+        return type(self)(self.name, self.documentation, self.labelnames, self.buckets)
+
+    def collect(self):
+        with self._lock:
+            items = sorted(
+                (labels, (list(state[0]), state[1], state[2]))
+                for labels, state in self._values.items()
+            )
+        lines = self.header()
+        for labels, (counts, total_sum, total_count) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_str} {_format_value(total_sum)}')
+            lines.append(f'{self.name}_count{label_str} {total_count}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(perf_counter() - self.start, *self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Conjunt de mètriques i funcions que generen mètriques en el moment de llegir-les"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._shared_path = None
+        self._shared_names = frozenset()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """
+        Registra una funció que retorna una llista de
+        (nom, tipus, descripció, {etiquetes: valor}) en el moment de llegir
+        """
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def _select(self, names):
+        return [metric for metric in list(self._metrics) if metric.name in names]
+
+    def snapshot(self, names):
+        """
+        Returns:
+            dict: nom -> estat serialitzable de les mètriques indicades
+        """
+        return {metric.name: metric.dump() for metric in self._select(names)}
+
+    def merge(self, snapshot):
+        """Suma una instantània d'un altre procés a les mètriques locals"""
+        for metric in self._select(snapshot):
+            metric.merge(snapshot[metric.name])
+
+    def reset(self, names):
+        """Buida les mètriques indicades (p. ex. les heretades en fer fork)"""
+        for metric in self._select(names):
+            metric.clear()
+
+    def write_snapshot(self, path, names):
+        """Escriu la instantània de les mètriques indicades (fitxer temporal + rename)"""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(names), f)
+        os.replace(tmp_path, path)
+
+    def share_from(self, path, names):
+        """
+        A partir d'ara, render() pren aquestes mètriques del fitxer que escriu
+        un altre procés amb write_snapshot(), no de la còpia local
+        """
+        self._shared_path = path
+        self._shared_names = frozenset(names)
+
+    def _read_shared(self):
+        try:
+            with open(self._shared_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def render(self):
+        """Genera el text en format d'exposició de Prometheus"""
+        lines = []
+        shared = self._read_shared() if self._shared_path else None
+        for metric in list(self._metrics):
+            if shared is not None and metric.name in self._shared_names:
+                copy = metric.empty_copy()
+                copy.merge(shared.get(metric.name, []))
+                metric = copy
+            lines.extend(metric.collect())
+
+        for collector in list(self._collectors):
+            try:
+                samples = collector()
+            except Exception:
+                continue
+            for name, kind, documentation, values in samples:
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in values.items():
+                    label_str = _format_labels([k for k, _ in labels], [v for _, v in labels])
+                    lines.append(f'{name}{label_str} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# ============================================================================
+# MÈTRIQUES DE L'APLICACIÓ
+# ============================================================================
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total',
+    "Peticions HTTP ateses",
+    ('route', 'method', 'status')
+)
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds',
+    "Latència de les peticions HTTP",
+    ('route', 'method')
+)
+
+RECOMMENDATION_STAGE_DURATION = REGISTRY.histogram(
+    'recommendation_stage_duration_seconds',
+    "Temps de cada etapa del càlcul de recomanacions",
+    ('method', 'stage')
+)
+
+MODEL_LOAD_DURATION = REGISTRY.histogram(
+    'model_load_duration_seconds',
+    "Temps de càrrega del model des de disc",
+    ('kind', 'outcome'),
+    buckets=SLOW_BUCKETS
+)
+
+MODEL_TRAINING_DURATION = REGISTRY.histogram(
+    'model_training_duration_seconds',
+    "Temps d'entrenament del model",
+    ('outcome',),
+    buckets=SLOW_BUCKETS
+)
+
+MODEL_TRAINING_STAGE_DURATION = REGISTRY.histogram(
+    'model_training_stage_duration_seconds',
+    "Temps de cada etapa de l'entrenament del model",
+    ('stage',),
+    buckets=SLOW_BUCKETS
+)
+
+MODEL_WARMUP_DURATION = REGISTRY.histogram(
+    'model_warmup_duration_seconds',
+    "Temps d'escalfament del model després de carregar-lo",
+    ('outcome',),
+    buckets=SLOW_BUCKETS
+)
+
+ADMISSION_WAIT_DURATION = REGISTRY.histogram(
+    'admission_wait_duration_seconds',
+    "Temps d'espera a la cua d'admissió de les peticions admeses"
+)
+
+RECOMMENDATION_TIERS = REGISTRY.counter(
+    'recommendation_tier_total',
+    "Recomanacions servides per cada nivell de càlcul (degradació per termini)",
+    ('method', 'tier')
+)
+
+RECOMMENDATION_DEADLINE_EXCEEDED = REGISTRY.counter(
+    'recommendation_deadline_exceeded_total',
+    "Respostes amb deadline_ms que han acabat després del termini",
+    ('method',)
+)
+
+SCHEDULER_JOB_RUNS = REGISTRY.counter(
+    'scheduler_job_runs_total',
+    "Execucions dels jobs del scheduler",
+    ('job', 'outcome')
+)
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'labels', 'method', 'stage', 'start')
+
+    def __init__(self, histogram, labels, method, stage):
+        self.histogram = histogram
+        self.labels = labels
+        self.method = method
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = perf_counter() - self.start
+        self.histogram.observe(elapsed, *self.labels)
+        # Desglossament per la petició actual (perfilat i registre de peticions lentes)
+        record_stage(self.method, self.stage, elapsed)
+        return False
+
+
+def stage_timer(method, stage):
+    """Cronometra una etapa del càlcul de recomanacions"""
+    return _StageTimer(RECOMMENDATION_STAGE_DURATION, (method, stage), method, stage)
+
+
+def training_stage_timer(stage):
+    """Cronometra una etapa de l'entrenament (a la traça apareix com 'train.<etapa>')"""
+    return _StageTimer(MODEL_TRAINING_STAGE_DURATION, (stage,), 'train', stage)
@@ -0,0 +1,174 @@
+"""
+Emmagatzematge dels models entrenats
+Permet guardar els components del model comprimits (zlib, lzma o bz2) en blocs
+independents perquè es puguin descomprimir en paral·lel en carregar-los
+"""
+
+import bz2
+import lzma
+import os
+import pickle
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Còdecs disponibles (tots de la llibreria estàndard i alliberen el GIL)
+CODECS = {
+    'zlib': zlib,
+    'lzma': lzma,
+    'bz2': bz2,
+}
+
+# Nivell per defecte de cada còdec
+DEFAULT_LEVELS = {
+    'zlib': 6,
+    'lzma': 6,
+    'bz2': 9,
+}
+
+# Mida de cada bloc comprimit (16 MB)
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Camps petits que es guarden sense comprimir
+METADATA_KEYS = (
+    'version',
+    'anime_csv_path',
+    'rating_csv_path',
+    'data_files_hash',
+    'created_at',
+)
+
+STORAGE_KEY = '__storage__'
+STORAGE_FORMAT = 1
+
+
+def _compress_chunk(codec, level, chunk):
+    if codec == 'lzma':
+        return lzma.compress(chunk, preset=level)
+    return CODECS[codec].compress(chunk, level)
+
+
+def _decompress_chunk(codec, chunk):
+    return CODECS[codec].decompress(chunk)
+
+
+def _default_workers():
+    return max(1, os.cpu_count() or 1)
+
+
+def validate_codec(codec, level=None):
+    """
+    Valida el còdec i el nivell de compressió
+
+    Returns:
+        tuple: (codec, level) normalitzats. codec és None si no es comprimeix
+    """
+    if codec in (None, '', 'none'):
+        return None, None
+
+    codec = codec.lower()
+    if codec not in CODECS:
+        raise ValueError(
+            f"Còdec de compressió desconegut: '{codec}'. "
+            f"Opcions: {', '.join(CODECS)}"
+        )
+
+    if level is None:
+        level = DEFAULT_LEVELS[codec]
+    level = int(level)
+
+    min_level = 0 if codec in ('zlib', 'lzma') else 1
+    if not min_level <= level <= 9:
+        raise ValueError(f"Nivell de compressió invàlid per {codec}: {level}")
+
+    return codec, level
+
+
+def save_model_data(path, model_data, codec=None, level=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    """
+    Guarda el diccionari del model a disc
+
+    Args:
+        path: Ruta del fitxer PKL
+        model_data (dict): Components del model
+        codec (str): 'zlib', 'lzma', 'bz2' o None per no comprimir
+        level (int): Nivell de compressió (per defecte el del còdec)
+        chunk_size (int): Mida de cada bloc abans de comprimir
+        workers (int): Threads per comprimir els blocs
+    """
+    codec, level = validate_codec(codec, level)
+
+    if codec is None:
+        _write_atomic(path, model_data)
+        return
+
+    metadata = {key: model_data[key] for key in METADATA_KEYS if key in model_data}
+
+    # Serialitzar cada component, partir-lo en blocs i comprimir-los en paral·lel
+    # (un component cada vegada per no duplicar tot el model a memòria)
+    stored = {}
+    with ThreadPoolExecutor(max_workers=workers or _default_workers()) as executor:
+        for key, value in model_data.items():
+            if key in METADATA_KEYS:
+                continue
+            raw = memoryview(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            chunks = [raw[i:i + chunk_size] for i in range(0, len(raw), chunk_size)] or [b'']
+            stored[key] = list(executor.map(lambda chunk: _compress_chunk(codec, level, chunk), chunks))
+
+    container = {
+        STORAGE_KEY: {
+            'format': STORAGE_FORMAT,
+            'codec': codec,
+            'level': level,
+            'chunk_size': chunk_size,
+        },
+        'metadata': metadata,
+        'components': stored,
+    }
+
+    _write_atomic(path, container)
+
+
+def _write_atomic(path, obj):
+    """
+    Escriu el pickle en un fitxer temporal i el renomena al final, perquè el
+    vigilant de models mai vegi un fitxer a mig escriure
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_model_data(path, workers=None):
+    """
+    Carrega un model guardat amb save_model_data (comprimit o no)
+
+    Returns:
+        dict: Components del model, amb el mateix format que es va guardar
+    """
+    with open(path, 'rb') as f:
+        container = pickle.load(f)
+
+    if not isinstance(container, dict) or STORAGE_KEY not in container:
+        # Model sense comprimir (format original)
+        return container
+
+    storage = container[STORAGE_KEY]
+    codec = storage['codec']
+    components = container['components']
+
+    # Descomprimir els blocs de cada component en paral·lel
+    model_data = dict(container.get('metadata', {}))
+    with ThreadPoolExecutor(max_workers=workers or _default_workers()) as executor:
+        for key, chunks in components.items():
+            raw_chunks = executor.map(lambda chunk: _decompress_chunk(codec, chunk), chunks)
+            model_data[key] = pickle.loads(b''.join(raw_chunks))
+
+    return model_data
+
@@ -1,5 +1,6 @@
 # Models de dades per al sistema
 from .anime import Anime
+from .anime_catalog import AnimeCatalog, AnimeView
 from .user import User
 
-__all__ = ['Anime', 'User']
+__all__ = ['Anime', 'AnimeCatalog', 'AnimeView', 'User']
@@ -0,0 +1,207 @@
+"""
+Catàleg d'animes en format columnar
+
+En lloc d'un objecte Anime per títol (cadascun amb el seu __dict__), el catàleg
+guarda arrays contigus alineats i ordenats per anime_id: id, membres, tipus,
+episodis i rating, més taules de noms i de textos de gènere internats i un
+GenreIndex (src/genres.py) amb la màscara de bits de gèneres de cada anime. Es construeix amb operacions vectoritzades directament des
+d'anime.csv i en accedir-hi per anime_id retorna una vista compatible amb Anime.
+"""
+
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from src.genres import BITS_PER_WORD, GenreIndex
+
+
+class AnimeView:
+    """
+    Vista d'un anime del catàleg amb la mateixa interfície de lectura que Anime
+    (get_anime_id, get_name, get_members i l'atribut genre). No copia dades:
+    llegeix dels arrays del catàleg.
+    """
+
+    __slots__ = ('_catalog', '_position')
+
+    def __init__(self, catalog, position):
+        self._catalog = catalog
+        self._position = position
+
+    def get_anime_id(self):
+        return int(self._catalog.ids[self._position])
+
+    def get_name(self):
+        catalog = self._catalog
+        return catalog.name_table[catalog.name_codes[self._position]]
+
+    def get_members(self):
+        return int(self._catalog.members[self._position])
+
+    @property
+    def genre(self):
+        """Gèneres separats per comes, com a anime.csv (None si no en té)"""
+        return self._catalog.genre_text(self._position)
+
+    @property
+    def type(self):
+        catalog = self._catalog
+        code = catalog.type_codes[self._position]
+        return catalog.type_table[code] if code >= 0 else None
+
+    @property
+    def episodes(self):
+        """Nombre d'episodis (None si és desconegut)"""
+        episodes = int(self._catalog.episodes[self._position])
+        return episodes if episodes >= 0 else None
+
+    @property
+    def rating(self):
+        """Rating d'anime.csv (NaN si no en té)"""
+        return float(self._catalog.ratings[self._position])
+
+    def __repr__(self):
+        return f"AnimeView(anime_id={self.get_anime_id()}, name={self.get_name()!r})"
+
+
+class AnimeCatalog(Mapping):
+    """
+    Catàleg d'animes indexat per anime_id (es comporta com un dict de només
+    lectura anime_id -> AnimeView)
+
+    Atributs (arrays alineats, ordenats per anime_id):
+        ids (int32), members (int32), episodes (int32, -1 si és desconegut),
+        ratings (float32, NaN si no n'hi ha), type_codes (int8, -1 si no en té),
+        name_codes (int32), genre_codes (int32, -1 si no en té)
+    Taules:
+        name_table (noms internats), type_table, genre_table (textos de gènere
+        d'anime.csv internats)
+    genre_index: GenreIndex alineat amb ids (genre_masks i genre_vocabulary en
+        són dreceres)
+    """
+
+    __slots__ = ('ids', 'members', 'episodes', 'ratings', 'type_codes', 'type_table',
+                 'name_codes', 'name_table', 'genre_codes', 'genre_table', 'genre_index')
+
+    def __init__(self, animes_df=None):
+        """
+        Args:
+            animes_df (DataFrame): Columnes d'anime.csv (anime_id i name
+                obligatòries; genre, type, episodes, rating i members opcionals)
+        """
+        if animes_df is None:
+            animes_df = pd.DataFrame({'anime_id': [], 'name': []})
+        animes_df = animes_df.dropna(subset=['anime_id', 'name']).drop_duplicates('anime_id')
+        animes_df = animes_df.sort_values('anime_id', kind='stable')
+
+        def column(name, default):
+            if name in animes_df.columns:
+                return animes_df[name]
+            return pd.Series(default, index=animes_df.index, dtype=object)
+
+        self.ids = animes_df['anime_id'].to_numpy(dtype=np.int32)
+        self.members = pd.to_numeric(column('members', 0), errors='coerce').fillna(0).to_numpy(dtype=np.int32)
+        self.episodes = pd.to_numeric(column('episodes', None), errors='coerce').fillna(-1).to_numpy(dtype=np.int32)
+        self.ratings = pd.to_numeric(column('rating', None), errors='coerce').to_numpy(dtype=np.float32)
+
+        type_codes, type_table = pd.factorize(column('type', None))
+        self.type_codes = type_codes.astype(np.int8)
+        self.type_table = tuple(str(name) for name in type_table)
+
+        name_codes, name_table = pd.factorize(animes_df['name'].astype(str))
+        self.name_codes = name_codes.astype(np.int32)
+        self.name_table = tuple(sys.intern(name) for name in name_table)
+
+        # Els textos de gènere es repeteixen molt: es parseja cada text diferent
+        # una sola vegada i cada anime n'agafa la màscara pel codi
+        genres = column('genre', None)
+        genres = genres.where(genres.map(lambda genre: isinstance(genre, str) and bool(genre.strip())))
+        genre_codes, genre_table = pd.factorize(genres)
+        self.genre_codes = genre_codes.astype(np.int32)
+        self.genre_table = tuple(sys.intern(str(genre)) for genre in genre_table)
+        self.genre_index = GenreIndex(self.genre_table).take(self.genre_codes)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Construeix el catàleg llegint anime.csv"""
+        return cls(pd.read_csv(path, encoding='utf-8', on_bad_lines='skip'))
+
+    @classmethod
+    def from_animes(cls, animes):
+        """
+        Converteix un dict antic anime_id -> Anime (models anteriors al catàleg)
+        """
+        return cls(pd.DataFrame({
+            'anime_id': [anime.get_anime_id() for anime in animes.values()],
+            'name': [anime.get_name() for anime in animes.values()],
+            'members': [anime.get_members() for anime in animes.values()],
+            'genre': [getattr(anime, 'genre', None) for anime in animes.values()],
+        }))
+
+    @property
+    def genre_masks(self):
+        return self.genre_index.masks
+
+    @property
+    def genre_vocabulary(self):
+        return self.genre_index.vocabulary
+
+    def position(self, anime_id):
+        """Posició d'un anime_id als arrays (None si no hi és)"""
+        position = int(np.searchsorted(self.ids, anime_id))
+        if position < len(self.ids) and self.ids[position] == anime_id:
+            return position
+        return None
+
+    def positions(self, anime_ids):
+        """Posició de cada anime_id als arrays (-1 si no hi és)"""
+        anime_ids = np.asarray(anime_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, anime_ids)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == anime_ids[found]
+        return np.where(found, positions, -1)
+
+    def genre_text(self, position):
+        """Text de gèneres d'una posició tal com és a anime.csv (None si no en té)"""
+        code = self.genre_codes[position]
+        return self.genre_table[code] if code >= 0 else None
+
+    def __setstate__(self, state):
+        _, slots = state
+        if 'genre_masks' in slots:
+            # Catàlegs desats abans del GenreIndex: només tenen les màscares, i el
+            # text es refà en l'ordre del vocabulari
+            masks, vocabulary = slots.pop('genre_masks'), slots.pop('genre_vocabulary')
+            index = GenreIndex([], vocabulary=vocabulary)
+            index.masks = masks
+            texts = [
+                ', '.join(name for bit, name in enumerate(vocabulary)
+                          if int(row[bit // BITS_PER_WORD]) >> (bit % BITS_PER_WORD) & 1) or None
+                for row in masks
+            ]
+            genre_codes, genre_table = pd.factorize(pd.Series(texts, dtype=object))
+            slots['genre_codes'] = genre_codes.astype(np.int32)
+            slots['genre_table'] = tuple(sys.intern(str(genre)) for genre in genre_table)
+            slots['genre_index'] = index
+        for name, value in slots.items():
+            setattr(self, name, value)
+
+    def __getitem__(self, anime_id):
+        position = self.position(anime_id) if isinstance(anime_id, (int, np.integer)) else None
+        if position is None:
+            raise KeyError(anime_id)
+        return AnimeView(self, position)
+
+    def __iter__(self):
+        return (int(anime_id) for anime_id in self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, anime_id):
+        return isinstance(anime_id, (int, np.integer)) and self.position(anime_id) is not None
+
+    def __repr__(self):
+        return f"AnimeCatalog({len(self)} animes, {len(self.genre_vocabulary)} gèneres)"
@@ -0,0 +1,137 @@
+"""
+Eines de diagnòstic per peticions lentes
+
+- Traça d'etapes per thread: acumula els mil·lisegons de cada etapa
+  (resolve, score, filter, format) de la petició actual
+- Perfilat amb cProfile d'una sola crida, amb les N funcions més costoses
+- Registre de peticions lentes amb el desglossament per etapes
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+from collections import deque
+from datetime import datetime
+
+
+_local = threading.local()
+
+# cProfile no admet dos perfiladors actius alhora de manera fiable
+_profile_lock = threading.Lock()
+
+
+class StageTrace:
+    """Temps acumulat per etapa durant una petició"""
+
+    __slots__ = ('stages',)
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def as_ms(self):
+        return {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+
+
+def begin_trace():
+    """Comença una traça nova per al thread actual"""
+    trace = StageTrace()
+    _local.trace = trace
+    return trace
+
+
+def end_trace():
+    """Tanca la traça del thread actual i la retorna (o None)"""
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    return trace
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+def record_stage(method, stage, seconds):
+    """Afegeix el temps d'una etapa a la traça activa, si n'hi ha"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.add(f'{method}.{stage}', seconds)
+
+
+def profile_call(top_n, fn, *args, **kwargs):
+    """
+    Executa fn amb cProfile
+
+    Returns:
+        tuple: (resultat, llista de les top_n funcions per temps acumulat).
+               La llista és None si ja hi ha un altre perfilat en curs.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return fn(*args, **kwargs), None
+
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats('cumulative')
+
+    top_functions = []
+    for func in stats.fcn_list[:top_n]:
+        primitive_calls, total_calls, total_time, cumulative_time, _ = stats.stats[func]
+        filename, line, name = func
+        top_functions.append({
+            'function': f'{filename}:{line}({name})',
+            'calls': total_calls,
+            'tottime_ms': round(total_time * 1000, 3),
+            'cumtime_ms': round(cumulative_time * 1000, 3),
+        })
+
+    return result, top_functions
+
+
+class SlowRequestLog:
+    """Últimes peticions que han superat el llindar de latència"""
+
+    def __init__(self, threshold_ms=1000, maxlen=100):
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def maybe_record(self, route, method, duration_ms, trace=None, context=None):
+        """
+        Desa la petició si supera el llindar
+
+        Returns:
+            bool: True si s'ha desat
+        """
+        if self.threshold_ms is None or duration_ms < self.threshold_ms:
+            return False
+
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'route': route,
+            'method': method,
+            'duration_ms': round(duration_ms, 3),
+            'stages_ms': trace.as_ms() if trace is not None else {},
+        }
+        if context:
+            entry['context'] = context
+
+        with self._lock:
+            self._entries.append(entry)
+        return True
+
+    def entries(self):
+        """Retorna les peticions lentes, de la més recent a la més antiga"""
+        with self._lock:
+            return list(reversed(self._entries))
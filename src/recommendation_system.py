@@ -3,39 +3,73 @@ Sistema de Recomanacions d'Animes
 Motor principal amb collaborative filtering i Pearson correlation
 """
 
-from src.models.anime import Anime
+from src.models.anime_catalog import AnimeCatalog
 from src.models.user import User
+from src.model_storage import save_model_data, load_model_data, validate_codec
+from src.metrics import (
+    MODEL_LOAD_DURATION, MODEL_TRAINING_DURATION, RECOMMENDATION_TIERS, stage_timer, training_stage_timer
+)
+from src.deadline import ADJUSTED_TIERS, USER_TIERS, COSINE_TIERS, LatencyEstimator
+from src.genres import GenreIndex
+from src.memory import memory_report
+from src.csv_reader import read_ratings_csv
+from src.content_similarity import DEFAULT_CONTENT_NEIGHBORS, content_neighbor_index
+from src.similarity import (
+    SIMILARITIES, DEFAULT_SHRINKAGE, DEFAULT_USER_NEIGHBORS,
+    adjusted_cosine_similarity, similarity_coverage, user_neighbor_index
+)
 import pandas as pd
 import numpy as np
-import pickle
-import os
+import bisect
+import time
 from pathlib import Path
 from datetime import datetime
 
 
+# Màxim de coincidències parcials d'una cerca (search_anime i search_anime_exact)
+PARTIAL_MATCH_LIMIT = 20
+
+
 class RecommendationSystem:
 
-    def __init__(self, anime_csv_path='data/anime.csv', rating_csv_path='data/cleaned_data.csv', model_dir='model'):
+    def __init__(self, anime_csv_path='data/anime.csv', rating_csv_path='data/cleaned_data.csv', model_dir='model',
+                 compression=None, compression_level=None):
         """
         Inicialitza el sistema de recomanacions carregant el model més recent
+
+        Args:
+            compression (str): Còdec per comprimir els models nous ('zlib', 'lzma', 'bz2' o None)
+            compression_level (int): Nivell de compressió (per defecte el del còdec)
         """
-        self.animes_dict = {}
+        self.animes_dict = AnimeCatalog()  # Catàleg columnar d'anime.csv (anime_id -> vista Anime)
         self.users_dict = {}
         self.ratings_df = None
         self.userRatings_pivot = None
         self.corrMatrix = None
+        self.cosineMatrix = None     # Similitud per cosinus ajustat (alternativa a Pearson)
+        self.userNeighbors = None    # Índex top-K de veïns per usuari (recomanacions per user_id)
+        self.contentNeighbors = None # Top-K veïns per contingut de tot anime.csv (cold start)
         self.animeStats = None
         self.animePopularity = None  # Nova: per guardar popularitat
         self.animeAvgRating = None   # Nova: per guardar rating mitjà
         self.model_dir = Path(__file__).resolve().parent.parent / model_dir
         self.anime_csv_path = Path(anime_csv_path)
         self.rating_csv_path = Path(rating_csv_path)
+        self.compression, self.compression_level = validate_codec(compression, compression_level)
         
         # Info del model carregat
         self.current_model_version = None
         self.model_load_time = None
         self.data_files_hash = None  # Per detectar canvis
         
+        # Latència observada de cada nivell de recomanació (per als terminis)
+        self.latency_estimator = LatencyEstimator()
+        
+        # Gènere, rating mitjà i suport alineats amb les columnes de la pivot
+        self._column_info = None
+        # Noms en minúscules i índex de gèneres de contentNeighbors
+        self._content_lookup = None
+        
         # Crear directori model si no existeix
         self.model_dir.mkdir(exist_ok=True)
         
@@ -105,38 +139,56 @@ class RecommendationSystem:
         """
         return self._get_latest_version() + 1
     
-    def _load_latest_model(self):
+    def _load_latest_model(self, kind='load', version=None):
         """
         Carrega l'última versió del model entrenat
         
+        Args:
+            kind (str): 'load' o 'reload' (etiqueta de la mètrica de durada)
+            version (int): Versió concreta a carregar (per defecte, la més recent)
+        
         Returns:
             bool: True si s'ha carregat correctament, False altrament
         """
-        latest_version = self._get_latest_version()
+        latest_version = version or self._get_latest_version()
         
         if latest_version == 0:
             return False
         
         model_path = self.model_dir / f'corr_matrix_v{latest_version}.pkl'
+        if not model_path.exists():
+            print(f"❌ No existeix el model v{latest_version} ({model_path})")
+            return False
         
         print(f"\n📦 Carregant model v{latest_version} des de {model_path}...")
         
+        start_time = time.perf_counter()
         try:
-            with open(model_path, 'rb') as f:
-                model_data = pickle.load(f)
+            model_data = load_model_data(model_path)
             
             # Carregar les dades guardades
             self.animes_dict = model_data['animes_dict']
+            # Els models antics guarden un dict d'objectes Anime
+            if not isinstance(self.animes_dict, AnimeCatalog):
+                self.animes_dict = AnimeCatalog.from_animes(self.animes_dict)
             self.users_dict = model_data['users_dict']
             self.ratings_df = model_data['ratings_df']
             self.userRatings_pivot = model_data['userRatings_pivot']
             self.corrMatrix = model_data['corrMatrix']
             self.animeStats = model_data['animeStats']
             
+            # Els models antics no tenen la matriu de cosinus (només Pearson)
+            self.cosineMatrix = model_data.get('cosineMatrix')
+            self.userNeighbors = model_data.get('userNeighbors')
+            self.contentNeighbors = model_data.get('contentNeighbors')
+            
             # Carregar estadístiques addicionals si existeixen
             self.animePopularity = model_data.get('animePopularity')
             self.animeAvgRating = model_data.get('animeAvgRating')
             
+            # Els models antics estan indexats pel nom: passar-los a anime_id
+            self._upgrade_name_keyed_model()
+            
             # Si no existeixen, calcular-les
             if self.animePopularity is None:
                 self._calculate_anime_stats()
@@ -150,23 +202,55 @@ class RecommendationSystem:
             print(f"   - {len(self.animes_dict)} animes")
             print(f"   - {len(self.users_dict)} usuaris")
             print(f"   - Matriu de correlacions: {self.corrMatrix.shape}")
+            if self.cosineMatrix is None:
+                print(f"   - Sense matriu de cosinus (reentrena per activar similarity='cosine')")
+            if self.userNeighbors is None:
+                print(f"   - Sense índex de veïns d'usuari (reentrena per activar mode='user')")
+            if self.contentNeighbors is None:
+                print(f"   - Sense veïns per contingut (reentrena per activar el cold start)")
             
+            MODEL_LOAD_DURATION.observe(time.perf_counter() - start_time, kind, 'success')
             return True
             
         except Exception as e:
             print(f"❌ Error carregant el model: {str(e)}")
+            MODEL_LOAD_DURATION.observe(time.perf_counter() - start_time, kind, 'error')
             return False
     
     def _calculate_anime_stats(self):
         """
-        Calcula estadístiques addicionals dels animes
+        Calcula estadístiques addicionals dels animes (indexades per anime_id)
         """
         if self.ratings_df is not None:
             # Popularitat (nombre de valoracions)
-            self.animePopularity = self.ratings_df.groupby('name')['rating'].count()
+            self.animePopularity = self.ratings_df.groupby('anime_id')['rating'].count()
             
             # Rating mitjà
-            self.animeAvgRating = self.ratings_df.groupby('name')['rating'].mean()
+            self.animeAvgRating = self.ratings_df.groupby('anime_id')['rating'].mean()
+    
+    def _upgrade_name_keyed_model(self):
+        """
+        Els models entrenats abans de passar a anime_id tenen la pivot, les
+        matrius de similitud i les estadístiques indexades pel nom. Es
+        reetiqueten amb l'anime_id (el primer de cada nom, que és el que la
+        pivot per nom fusionava); l'ordre de columnes no canvia.
+        """
+        if self.userRatings_pivot is None or self.userRatings_pivot.columns.dtype != object:
+            return
+        
+        name_to_id = self.ratings_df.drop_duplicates('name').set_index('name')['anime_id'].to_dict()
+        self.userRatings_pivot = self.userRatings_pivot.rename(columns=name_to_id).rename_axis(
+            columns='anime_id'
+        )
+        for attribute in ('corrMatrix', 'cosineMatrix'):
+            matrix = getattr(self, attribute)
+            if matrix is not None:
+                setattr(self, attribute, matrix.rename(index=name_to_id, columns=name_to_id))
+        for attribute in ('animeStats', 'animePopularity', 'animeAvgRating'):
+            stats = getattr(self, attribute)
+            if stats is not None:
+                setattr(self, attribute, stats.rename(index=name_to_id).rename_axis('anime_id'))
+        print(f"   - Model indexat pel nom: convertit a anime_id")
     
     def reload_model(self):
         """
@@ -177,22 +261,41 @@ class RecommendationSystem:
             bool: True si s'ha recarregat correctament
         """
         print("\n🔄 Recarregant model més recent...")
-        return self._load_latest_model()
+        return self._load_latest_model(kind='reload')
     
-    def train_model(self, save=True):
+    def train_model(self, save=True, csv_workers=None):
         """
         Entrena el model calculant la matriu de correlacions
         Aquest procés pot trigar uns minuts amb datasets grans
         
         Args:
             save (bool): Si True, guarda el model en un fitxer PKL versionat
+            csv_workers (int): Processos per llegir les valoracions (None = CPUs;
+                1 = en el mateix procés, obligatori si hi ha altres threads vius,
+                perquè el pool es crea amb fork())
         """
         print("\n" + "="*70)
         print("🚀 INICIANT ENTRENAMENT DEL MODEL")
         print("="*70)
         
+        start_time = time.perf_counter()
+        try:
+            self._train_and_save(save, csv_workers)
+        except Exception:
+            MODEL_TRAINING_DURATION.observe(time.perf_counter() - start_time, 'error')
+            raise
+        MODEL_TRAINING_DURATION.observe(time.perf_counter() - start_time, 'success')
+        
+        print("="*70)
+        print("✅ ENTRENAMENT COMPLETAT!")
+        print("="*70)
+    
+    def _train_and_save(self, save, csv_workers=None):
+        """
+        Carrega les dades, calcula el model i, si cal, el guarda
+        """
         # Carregar dades dels CSV
-        self._load_data_for_training(self.anime_csv_path, self.rating_csv_path)
+        self._load_data_for_training(self.anime_csv_path, self.rating_csv_path, csv_workers)
         
         if save:
             # Guardar el model amb la següent versió
@@ -210,6 +313,9 @@ class RecommendationSystem:
                 'ratings_df': self.ratings_df,
                 'userRatings_pivot': self.userRatings_pivot,
                 'corrMatrix': self.corrMatrix,
+                'cosineMatrix': self.cosineMatrix,
+                'userNeighbors': self.userNeighbors,
+                'contentNeighbors': self.contentNeighbors,
                 'animeStats': self.animeStats,
                 'animePopularity': self.animePopularity,
                 'animeAvgRating': self.animeAvgRating,
@@ -221,10 +327,17 @@ class RecommendationSystem:
             }
             
             try:
-                with open(model_path, 'wb') as f:
-                    pickle.dump(model_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                with training_stage_timer('save'):
+                    save_model_data(
+                        model_path,
+                        model_data,
+                        codec=self.compression,
+                        level=self.compression_level
+                    )
                 
                 print(f"✅ Model v{next_version} guardat correctament!")
+                if self.compression:
+                    print(f"   Compressió: {self.compression} (nivell {self.compression_level})")
                 print(f"   Mida del fitxer: {model_path.stat().st_size / (1024*1024):.1f} MB")
                 
                 # Actualitzar info del model actual
@@ -235,84 +348,103 @@ class RecommendationSystem:
             except Exception as e:
                 print(f"❌ Error guardant el model: {str(e)}")
                 raise
-        
-        print("="*70)
-        print("✅ ENTRENAMENT COMPLETAT!")
-        print("="*70)
     
-    def _load_data_for_training(self, anime_csv_path, rating_csv_path):
+    def _load_data_for_training(self, anime_csv_path, rating_csv_path, csv_workers=None):
         """
         Carrega i processa les dades dels CSV per entrenar el model
         """
         print("\n📂 Carregant dades dels CSV...")
         
-        # Llegir anime.csv amb encoding UTF-8
-        a_cols = ['anime_id', 'name', 'genre', 'members']
-        animes_df = pd.read_csv(
-            anime_csv_path, 
-            sep=',', 
-            usecols=a_cols, 
-            encoding="utf-8",  # Canviat a UTF-8
-            on_bad_lines='skip'  # Saltar línies problemàtiques
-        )
-        
-        # Llegir rating CSV amb encoding UTF-8
-        ratings_df = pd.read_csv(
-            rating_csv_path, 
-            sep=',', 
-            encoding="utf-8",  # Canviat a UTF-8
-            on_bad_lines='skip'
-        )
-        
-        # Merge de les dades
-        self.ratings_df = pd.merge(animes_df, ratings_df)
+        with training_stage_timer('read'):
+            # Llegir anime.csv amb encoding UTF-8 (una sola vegada: catàleg, merge i contingut)
+            a_cols = ['anime_id', 'name', 'genre', 'members']
+            content_df = pd.read_csv(
+                anime_csv_path, 
+                sep=',', 
+                encoding="utf-8",  # Canviat a UTF-8
+                on_bad_lines='skip'  # Saltar línies problemàtiques
+            )
+            animes_df = content_df[a_cols]
+            
+            # Llegir rating CSV en paral·lel (int32 per als ids, int8 per a la valoració)
+            ratings_df = read_ratings_csv(rating_csv_path, workers=csv_workers)
+            
+            # Merge de les dades
+            self.ratings_df = pd.merge(animes_df, ratings_df)
         
         print(f"   ✓ Dades carregades: {len(self.ratings_df)} valoracions")
         
-        # Crear objectes Anime
-        print(f"\n🎬 Processant animes...")
-        for _, row in animes_df.iterrows():
-            anime = Anime(row['anime_id'], row['name'], row['members'])
-            anime.genre = row['genre']
-            self.animes_dict[row['anime_id']] = anime
-        
-        print(f"   ✓ {len(self.animes_dict)} animes processats")
-        
-        # Crear objectes User
-        print(f"\n👥 Processant usuaris...")
-        for _, row in self.ratings_df.iterrows():
-            user_id = row['user_id']
-            anime_id = row['anime_id']
-            rating = row['rating']
+        with training_stage_timer('objects'):
+            # Catàleg columnar d'animes (vectoritzat, sense un objecte per títol)
+            print(f"\n🎬 Processant animes...")
+            self.animes_dict = AnimeCatalog(content_df)
             
-            user = User(user_id, anime_id, rating)
+            print(f"   ✓ {len(self.animes_dict)} animes processats")
             
-            if user_id not in self.users_dict:
-                self.users_dict[user_id] = []
-            self.users_dict[user_id].append(user)
-        
-        print(f"   ✓ {len(self.users_dict)} usuaris processats")
+            # Crear objectes User
+            print(f"\n👥 Processant usuaris...")
+            for _, row in self.ratings_df.iterrows():
+                user_id = row['user_id']
+                anime_id = row['anime_id']
+                rating = row['rating']
+                
+                user = User(user_id, anime_id, rating)
+                
+                if user_id not in self.users_dict:
+                    self.users_dict[user_id] = []
+                self.users_dict[user_id].append(user)
+            
+            print(f"   ✓ {len(self.users_dict)} usuaris processats")
         
         # Crear pivot table
         print(f"\n📊 Creant pivot table...")
-        self.userRatings_pivot = self.ratings_df.pivot_table(
-            index='user_id', 
-            columns='name', 
-            values='rating'
-        )
+        with training_stage_timer('pivot'):
+            self.userRatings_pivot = self.ratings_df.pivot_table(
+                index='user_id', 
+                columns='anime_id', 
+                values='rating'
+            )
         print(f"   ✓ Pivot table creada: {self.userRatings_pivot.shape}")
         
         # Calcular matriu de correlacions amb un mínim de 50 en lloc de 100
         print(f"\n🔗 Calculant matriu de correlacions...")
-        self.corrMatrix = self.userRatings_pivot.corr(method='pearson', min_periods=50)  # Baixat a 50
-        print(f"   ✓ Matriu de correlacions calculada: {self.corrMatrix.shape}")
+        start = time.perf_counter()
+        with training_stage_timer('pearson'):
+            self.corrMatrix = self.userRatings_pivot.corr(method='pearson', min_periods=50)  # Baixat a 50
+        print(f"   ✓ Matriu de correlacions calculada: {self.corrMatrix.shape} "
+              f"en {time.perf_counter() - start:.1f} s, cobertura {similarity_coverage(self.corrMatrix):.1%}")
+        
+        # Similitud per cosinus ajustat amb shrinkage (un sol producte de matrius)
+        print(f"\n📐 Calculant similitud per cosinus ajustat (λ={DEFAULT_SHRINKAGE})...")
+        start = time.perf_counter()
+        with training_stage_timer('cosine'):
+            self.cosineMatrix = adjusted_cosine_similarity(self.userRatings_pivot)
+        print(f"   ✓ Matriu de cosinus calculada: {self.cosineMatrix.shape} "
+              f"en {time.perf_counter() - start:.1f} s, cobertura {similarity_coverage(self.cosineMatrix):.1%}")
+        
+        # Top-K veïns per usuari (mode 'user' de les recomanacions per user_id)
+        print(f"\n👥 Calculant índex de veïns d'usuari (K={DEFAULT_USER_NEIGHBORS})...")
+        start = time.perf_counter()
+        with training_stage_timer('user_neighbors'):
+            self.userNeighbors = user_neighbor_index(self.userRatings_pivot)
+        print(f"   ✓ Índex de veïns calculat: {self.userNeighbors['neighbors'].shape} "
+              f"en {time.perf_counter() - start:.1f} s")
+        
+        # Veïns per contingut de tots els animes d'anime.csv (també els que no són a la pivot)
+        print(f"\n🏷️  Calculant veïns per contingut (K={DEFAULT_CONTENT_NEIGHBORS})...")
+        start = time.perf_counter()
+        with training_stage_timer('content'):
+            self.contentNeighbors = content_neighbor_index(content_df)
+        print(f"   ✓ Veïns per contingut calculats: {self.contentNeighbors['neighbors'].shape} "
+              f"en {time.perf_counter() - start:.1f} s")
         
         # Calcular estadístiques
         print(f"\n📈 Calculant estadístiques...")
-        self.animeStats = self.ratings_df.groupby('name').agg({'rating': np.size})
-        
-        # Calcular popularitat i rating mitjà
-        self._calculate_anime_stats()
+        with training_stage_timer('stats'):
+            self.animeStats = self.ratings_df.groupby('anime_id').agg({'rating': np.size})
+            
+            # Calcular popularitat i rating mitjà
+            self._calculate_anime_stats()
         
         print(f"   ✓ Estadístiques calculades")
         
@@ -331,65 +463,285 @@ class RecommendationSystem:
             'num_animes': len(self.animes_dict),
             'num_users': len(self.users_dict),
             'num_ratings': len(self.ratings_df) if self.ratings_df is not None else 0,
-            'data_changed': self.has_data_changed()
+            'data_changed': self.has_data_changed(),
+            'similarities': self.available_similarities()
         }
     
+    def get_memory_report(self):
+        """
+        Mida en memòria de cada component del model carregat
+
+        Returns:
+            dict: Vegeu src.memory.memory_report
+        """
+        return memory_report(self)
+    
+    def available_similarities(self):
+        """Similituds que es poden demanar amb el model carregat"""
+        return [name for name in SIMILARITIES if self._similarity_matrix(name) is not None]
+    
+    def _similarity_matrix(self, similarity):
+        """Matriu precalculada d'una similitud ('pearson' o 'cosine')"""
+        if similarity == 'pearson':
+            return self.corrMatrix
+        if similarity == 'cosine':
+            return self.cosineMatrix
+        raise ValueError(f"Similitud desconeguda: '{similarity}'")
+    
+    def _similarity_values(self, similarity):
+        """
+        Matriu de similitud com a ndarray (vista de la del model, sense còpia),
+        desada amb el catàleg de columnes perquè cada petició no passi per pandas
+        """
+        cache = self._get_column_info()['similarity_values']
+        values = cache.get(similarity)
+        if values is None:
+            similarity_matrix = self._similarity_matrix(similarity)
+            if similarity_matrix is None:
+                return None
+            values = cache[similarity] = similarity_matrix.to_numpy()
+        return values
+    
+    def _tiers(self, method, similarity):
+        """
+        Nivells de degradació i nom del mètode per a l'estimador de latència
+        (Pearson conserva els noms 'adjusted' i 'user')
+        """
+        key = method if similarity == 'pearson' else f'{method}_{similarity}'
+        if similarity == 'cosine':
+            return key, COSINE_TIERS
+        return key, ADJUSTED_TIERS if method == 'adjusted' else USER_TIERS
+    
+    def resolve_anime(self, anime):
+        """
+        anime_id intern d'un anime donat per anime_id o pel nom exacte (sense
+        distingir majúscules). El nom es busca al diccionari del catàleg, sense
+        cap recorregut per subcadena; si diversos animes comparteixen el nom,
+        es tria el que té més valoracions.
+        
+        Returns:
+            int: anime_id de la pivot, o None si no hi és
+        """
+        info = self._get_column_info()
+        if isinstance(anime, (int, np.integer)) and not isinstance(anime, bool):
+            return int(anime) if int(anime) in info['positions'] else None
+        ids = info['name_ids'].get(str(anime).strip().lower())
+        return ids[0] if ids else None
+    
+    def find_anime_id(self, query):
+        """
+        Resolució per a l'entrada de l'API: nom exacte al diccionari i, si no
+        n'hi ha, la millor coincidència parcial (la de suggest_animes)
+        
+        Returns:
+            int: anime_id, o None si no hi ha cap coincidència
+        """
+        anime_id = self.resolve_anime(query)
+        if anime_id is not None:
+            return anime_id
+        positions = self._match_positions(query, 1)
+        return int(self._get_column_info()['ids'][positions[0]]) if positions else None
+    
+    def anime_name(self, anime_id):
+        """Nom d'un anime de la pivot o, si no hi és, d'anime.csv (None si no existeix)"""
+        info = self._get_column_info()
+        position = info['positions'].get(anime_id)
+        if position is not None:
+            return str(info['names'][position])
+        if self.contentNeighbors is not None:
+            position = self._get_content_lookup()['id_positions'].get(anime_id)
+            if position is not None:
+                return str(self.contentNeighbors['names'][position])
+        return None
+    
     def search_anime_exact(self, query):
         """
         Cerca animes que coincideixin exactament o parcialment amb la query
         
+        Si diversos animes comparteixen exactament el nom, es retornen tots
+        (amb el seu anime_id) perquè el client en triï un. Les coincidències
+        parcials són com a màxim PARTIAL_MATCH_LIMIT, les més valorades primer
+        (les que comencen per la query abans que les que només la contenen).
+        
         Returns:
             list: Llista d'animes que coincideixen
         """
-        query_lower = query.lower()
-        matches = []
-        
-        for anime_name in self.userRatings_pivot.columns:
-            anime_name_lower = anime_name.lower()
+        with stage_timer('search_exact', 'resolve'):
+            info = self._get_column_info()
+            query_lower = query.strip().lower()
             
-            # Coincidència exacta
-            if anime_name_lower == query_lower:
-                return [{'name': anime_name, 'match_type': 'exact'}]
+            # Coincidència exacta (diccionari)
+            exact_ids = info['name_ids'].get(query_lower)
+            if exact_ids and len(exact_ids) == 1:
+                return [{'name': self.anime_name(exact_ids[0]), 'anime_id': exact_ids[0], 'match_type': 'exact'}]
+            if exact_ids:
+                positions = [info['positions'][anime_id] for anime_id in exact_ids]
+                match_type = 'exact'
+            else:
+                # Coincidència parcial (índex de prefixos, com l'autocompletat)
+                positions = self._match_positions(query_lower, PARTIAL_MATCH_LIMIT)
+                match_type = 'partial'
             
-            # Coincidència parcial
-            if query_lower in anime_name_lower:
-                anime_info = self.ratings_df[self.ratings_df['name'] == anime_name].iloc[0]
-                matches.append({
-                    'name': anime_name,
-                    'genre': str(anime_info.get('genre', 'Unknown')),
-                    'match_type': 'partial'
-                })
+            return [
+                {
+                    'name': str(info['names'][position]),
+                    'anime_id': int(info['ids'][position]),
+                    'genre': str(info['genres'][position]),
+                    'match_type': match_type
+                }
+                for position in positions
+            ]
+    
+    def _popularity_ranking(self, exclude, num_recommendations, allowed=None):
+        """
+        Rànquing barat per rating mitjà entre els animes populars
+        S'usa com a últim nivell quan no hi ha temps per calcular correlacions
+        """
+        popular_animes = self.animeStats['rating'] >= 50
+        df = self._filter_by_genre(self.animeStats[popular_animes], allowed)
+        if self.animeAvgRating is not None:
+            df = df.join(self.animeAvgRating.rename('avg_rating'))
+        if self.animePopularity is not None:
+            df = df.join(self.animePopularity.rename('popularity'))
+        
+        df = df[~df.index.isin(list(exclude))]
+        df = df.assign(similarity=np.nan)
+        if 'avg_rating' in df.columns:
+            df = df.sort_values(['avg_rating', 'rating'], ascending=False)
+        else:
+            df = df.sort_values('rating', ascending=False)
+        
+        return df.head(num_recommendations)
+    
+    def get_recommendations_within(self, anime, user_rating=5, num_recommendations=6, deadline_ms=None,
+                                   similarity='pearson', include_genres=None, exclude_genres=None):
+        """
+        Com get_recommendations_adjusted, però tria el nivell de càlcul que
+        previsiblement acaba dins del termini (full → precomputed → popularity)
+        
+        El termini és orientatiu: la tria es fa amb la latència prevista i el
+        càlcul no s'interromp si un nivell tarda més del previst
+        
+        Args:
+            anime: anime_id o nom exacte
+        
+        Returns:
+            tuple: (recomanacions o None, nivell utilitzat)
+        """
+        remaining = deadline_ms / 1000 if deadline_ms is not None else None
+        method, tiers = self._tiers('adjusted', similarity)
+        tier = self.latency_estimator.choose_tier(method, tiers, remaining)
+        recommendations = self.get_recommendations_adjusted(
+            anime, user_rating, num_recommendations, tier=tier, similarity=similarity,
+            include_genres=include_genres, exclude_genres=exclude_genres
+        )
         
-        return matches
+        # Sense dades col·laboratives: veïns per contingut (nivell 'content')
+        if recommendations is None:
+            recommendations = self.get_content_recommendations(
+                anime, num_recommendations, include_genres, exclude_genres
+            )
+            if recommendations is not None:
+                tier = 'content'
+                RECOMMENDATION_TIERS.inc(method, tier)
+        
+        return recommendations, tier
     
-    def get_recommendations_adjusted(self, anime_name, user_rating=5, num_recommendations=6):
+    def get_recommendations_adjusted(self, anime, user_rating=5, num_recommendations=6, tier='full',
+                                     similarity='pearson', include_genres=None, exclude_genres=None):
         """
         Obté recomanacions ajustades segons la valoració de l'usuari
         
         - Si rating >= 4: Retorna animes similars
         - Si rating <= 2: Retorna animes diferents (correlació negativa o baixa)
         - Si rating = 3: Retorna animes moderadament similars
+        
+        Args:
+            anime: anime_id o nom exacte (vegeu resolve_anime)
+            tier (str): 'full' (Pearson al moment), 'precomputed' (matriu de
+                        correlacions de l'entrenament) o 'popularity' (rànquing
+                        per rating mitjà, sense correlació)
+            similarity (str): 'pearson' o 'cosine' (cosinus ajustat precalculat;
+                              'full' llegeix directament la seva columna)
+            include_genres (list): Només animes amb algun d'aquests gèneres
+            exclude_genres (list): Cap anime amb algun d'aquests gèneres
         """
+        method, tiers = self._tiers('adjusted', similarity)
+        if tier not in tiers:
+            raise ValueError(f"Nivell de recomanació desconegut: '{tier}'")
+        similarity_matrix = self._similarity_matrix(similarity)
+        if similarity_matrix is None:
+            raise ValueError(f"El model carregat no té la similitud '{similarity}'")
+        start_time = time.perf_counter()
         
         # Verificar que l'anime existeix
-        if anime_name not in self.userRatings_pivot.columns:
-            matching = [col for col in self.userRatings_pivot.columns if anime_name.lower() in col.lower()]
-            if not matching:
+        with stage_timer('adjusted', 'resolve'):
+            anime_id = self.resolve_anime(anime)
+            if anime_id is None:
                 return None
-            anime_name = matching[0]
         
         # Obtenir correlacions
-        anime_ratings = self.userRatings_pivot[anime_name]
-        similar_animes = self.userRatings_pivot.corrwith(anime_ratings)
-        similar_animes = similar_animes.dropna()
+        with stage_timer('adjusted', 'score'):
+            if tier == 'full' and similarity == 'pearson':
+                anime_ratings = self.userRatings_pivot[anime_id]
+                similar_animes = self.userRatings_pivot.corrwith(anime_ratings)
+                similar_animes = similar_animes.dropna()
+            elif tier in ('full', 'precomputed'):
+                similar_animes = similarity_matrix[anime_id].dropna()
+            else:
+                similar_animes = None
+        
+        with stage_timer('adjusted', 'filter'):
+            allowed = self.genre_filter(include_genres, exclude_genres)
+            if similar_animes is None:
+                top_recommendations = self._popularity_ranking([anime_id], num_recommendations, allowed)
+            else:
+                top_recommendations = self._rank_by_similarity(
+                    similar_animes, anime_id, user_rating, num_recommendations, allowed
+                )
+        
+        with stage_timer('adjusted', 'format'):
+            info = self._get_column_info()
+            recommendations = []
+            for anime_id_rec, row in zip(top_recommendations.index, top_recommendations.itertuples()):
+                position = info['positions'][anime_id_rec]
+                
+                # Obtenir correlació i score
+                correlation = row.similarity
+                avg_rating = getattr(row, 'avg_rating', np.nan)
+                
+                recommendations.append({
+                    "anime_id": int(anime_id_rec),
+                    "title": str(info['names'][position]),
+                    "score": float(round(avg_rating, 1)) if pd.notna(avg_rating) else 0.0,
+                    "genre": str(info['genres'][position]),
+                    "year": None,
+                    "correlation": float(round(correlation, 2)) if pd.notna(correlation) else 0.0
+                })
+        
+        self.latency_estimator.observe(method, tier, time.perf_counter() - start_time)
+        RECOMMENDATION_TIERS.inc(method, tier)
+        
+        return recommendations
+    
+    def _rank_by_similarity(self, similar_animes, anime_id, user_rating, num_recommendations, allowed=None):
+        """
+        Filtra i ordena els animes segons la similitud i la valoració de l'usuari
         
+        Args:
+            allowed (ndarray): Filtre de gèneres alineat amb la pivot (None = tots)
+        
+        Returns:
+            DataFrame: Top recomanacions amb 'similarity', 'avg_rating' i 'popularity'
+        """
         # Crear DataFrame amb correlacions
-        df = pd.DataFrame(similar_animes, columns=['similarity'])
+        df = similar_animes.to_frame('similarity')
         
         # Filtrar per popularitat (mínim 50 valoracions)
         popular_animes = self.animeStats['rating'] >= 50  # Baixat a 50
         df = self.animeStats[popular_animes].join(df)
         df = df.dropna()
+        df = self._filter_by_genre(df, allowed)
         
         # Afegir rating mitjà i popularitat
         if self.animeAvgRating is not None:
@@ -398,7 +750,7 @@ class RecommendationSystem:
             df = df.join(self.animePopularity.rename('popularity'))
         
         # Eliminar l'anime actual dels resultats
-        df = df[df.index != anime_name]
+        df = df[df.index != anime_id]
         
         # AJUSTAR SEGONS LA VALORACIÓ DE L'USUARI
         if user_rating >= 4:
@@ -420,114 +772,552 @@ class RecommendationSystem:
             df = df.sort_values('score', ascending=False)
         
         # Obtenir top recomanacions
-        top_recommendations = df.head(num_recommendations)
-        
-        recommendations = []
-        for anime_name_rec in top_recommendations.index:
-            anime_info = self.ratings_df[self.ratings_df['name'] == anime_name_rec].iloc[0]
-            
-            # Obtenir correlació i score
-            correlation = top_recommendations.loc[anime_name_rec, 'similarity']
-            avg_rating = top_recommendations.loc[anime_name_rec].get('avg_rating', anime_info.get('rating', 0))
-            
-            recommendations.append({
-                "title": str(anime_name_rec),
-                "score": float(round(avg_rating, 1)) if pd.notna(avg_rating) else 0.0,
-                "genre": str(anime_info.get('genre', 'Unknown')),
-                "year": None,
-                "correlation": float(round(correlation, 2)) if pd.notna(correlation) else 0.0
-            })
-        
-        return recommendations
+        return df.head(num_recommendations)
     
-    def get_recommendations(self, anime_name, user_rating=None, num_recommendations=6):
+    def get_recommendations(self, anime, user_rating=None, num_recommendations=6):
         """
         Versió legacy per compatibilitat - redirigeix a get_recommendations_adjusted
         """
-        return self.get_recommendations_adjusted(anime_name, user_rating or 5, num_recommendations)
+        return self.get_recommendations_adjusted(anime, user_rating or 5, num_recommendations)
+    
+    def get_recommendations_for_user_within(self, user_ratings_dict, num_recommendations=10, deadline_ms=None,
+                                            similarity='pearson', include_genres=None, exclude_genres=None):
+        """
+        Com get_recommendations_for_user, però degrada a 'popularity' si la
+        combinació de correlacions previsiblement no acaba dins del termini
+        (orientatiu, com a get_recommendations_within)
+        
+        Returns:
+            tuple: (recomanacions, nivell utilitzat)
+        """
+        remaining = deadline_ms / 1000 if deadline_ms is not None else None
+        method, tiers = self._tiers('user', similarity)
+        tier = self.latency_estimator.choose_tier(method, tiers, remaining)
+        recommendations = self.get_recommendations_for_user(
+            user_ratings_dict, num_recommendations, tier=tier, similarity=similarity,
+            include_genres=include_genres, exclude_genres=exclude_genres
+        )
+        return recommendations, tier
     
-    def get_recommendations_for_user(self, user_ratings_dict, num_recommendations=10):
+    def get_recommendations_for_user(self, user_ratings_dict, num_recommendations=10, tier='full',
+                                     similarity='pearson', include_genres=None, exclude_genres=None):
         """
         Obté recomanacions basades en múltiples valoracions d'un usuari
+        
+        Args:
+            user_ratings_dict (dict): {anime_id o nom exacte: valoració 1-5}
+            tier (str): 'full' (combinació de correlacions) o 'popularity'
+                        (rànquing per rating mitjà, sense correlació)
+            similarity (str): 'pearson' (corrMatrix) o 'cosine' (cosineMatrix)
+            include_genres (list): Només animes amb algun d'aquests gèneres
+            exclude_genres (list): Cap anime amb algun d'aquests gèneres
         """
-        simCandidates = pd.Series(dtype=float)
+        method, tiers = self._tiers('user', similarity)
+        if tier not in tiers:
+            raise ValueError(f"Nivell de recomanació desconegut: '{tier}'")
+        similarity_matrix = self._similarity_matrix(similarity)
+        if similarity_matrix is None:
+            raise ValueError(f"El model carregat no té la similitud '{similarity}'")
+        start_time = time.perf_counter()
         
-        for anime_name, rating in user_ratings_dict.items():
-            if anime_name not in self.corrMatrix.columns:
-                matching = [col for col in self.corrMatrix.columns if anime_name.lower() in col.lower()]
-                if not matching:
-                    print(f"Anime '{anime_name}' no trobat")
+        with stage_timer('user', 'resolve'):
+            user_ratings = {}
+            for anime, rating in user_ratings_dict.items():
+                anime_id = self.resolve_anime(anime)
+                if anime_id is None:
+                    print(f"Anime '{anime}' no trobat")
                     continue
-                anime_name = matching[0]
+                user_ratings[anime_id] = rating
+        
+        simCandidates = pd.Series(dtype=float)
+        # El nivell 'popularity' no combina cap correlació
+        ratings_to_score = user_ratings.items() if tier == 'full' else ()
+        
+        with stage_timer('user', 'score'):
+            for anime_id, rating in ratings_to_score:
+                sims = similarity_matrix[anime_id].dropna()
+                
+                # Ajustar segons la valoració
+                if rating >= 4:
+                    # Li agrada: mantenir correlacions positives
+                    sims = sims.map(lambda x: x * rating)
+                elif rating <= 2:
+                    # No li agrada: invertir correlacions
+                    sims = sims.map(lambda x: -x * (6 - rating))
+                else:
+                    # Neutral: ponderar menys
+                    sims = sims.map(lambda x: x * rating * 0.5)
+                
+                simCandidates = pd.concat([simCandidates, sims])
+        
+        with stage_timer('user', 'filter'):
+            allowed = self.genre_filter(include_genres, exclude_genres)
+            if tier == 'popularity':
+                ranking = self._popularity_ranking(user_ratings.keys(), num_recommendations, allowed)
+                # Sense correlació: puntuació 0 per a tots
+                simCandidates = pd.Series(0.0, index=ranking.index)
+            simCandidates = simCandidates.groupby(simCandidates.index, sort=False).sum()
+            simCandidates = self._filter_by_genre(simCandidates, allowed)
+            simCandidates = simCandidates.sort_values(ascending=False, kind='stable')
             
-            sims = self.corrMatrix[anime_name].dropna()
+            # Eliminar animes ja valorats
+            simCandidates = simCandidates[~simCandidates.index.isin(list(user_ratings))]
             
-            # Ajustar segons la valoració
-            if rating >= 4:
-                # Li agrada: mantenir correlacions positives
-                sims = sims.map(lambda x: x * rating)
-            elif rating <= 2:
-                # No li agrada: invertir correlacions
-                sims = sims.map(lambda x: -x * (6 - rating))
-            else:
-                # Neutral: ponderar menys
-                sims = sims.map(lambda x: x * rating * 0.5)
+            top_recommendations = simCandidates.head(num_recommendations)
+        
+        with stage_timer('user', 'format'):
+            info = self._get_column_info()
+            recommendations = []
+            for anime_id_rec, similarity_score in top_recommendations.items():
+                position = info['positions'][anime_id_rec]
+                avg_rating = info['avg_ratings'][position] if info['avg_ratings'] is not None else np.nan
+                
+                recommendations.append({
+                    "anime_id": int(anime_id_rec),
+                    "title": str(info['names'][position]),
+                    "score": float(round(avg_rating, 1)) if pd.notna(avg_rating) else 0.0,
+                    "genre": str(info['genres'][position]),
+                    "year": None,
+                    "correlation": float(round(similarity_score / sum(user_ratings_dict.values()), 2))
+                })
+        
+        self.latency_estimator.observe(method, tier, time.perf_counter() - start_time)
+        RECOMMENDATION_TIERS.inc(method, tier)
+        
+        return recommendations
+    
+    def score_users_batch(self, user_ratings_dicts, num_recommendations=10, similarity='pearson', dtype=None,
+                          batch_size=512):
+        """
+        Versió vectoritzada de get_recommendations_for_user per a moltes consultes
+        alhora (avaluació offline): un producte de matrius per bloc de consultes
+        
+        Args:
+            user_ratings_dicts (list): Diccionaris {anime_id: valoració 1-5}
+            similarity (str): 'pearson' o 'cosine'
+            dtype: Precisió de la matriu de similitud (p. ex. np.float32)
+            batch_size (int): Consultes per producte de matrius
+        
+        Returns:
+            list: Per cada consulta, els anime_id recomanats en ordre
+        """
+        similarity_matrix = self._similarity_matrix(similarity)
+        if similarity_matrix is None:
+            raise ValueError(f"El model carregat no té la similitud '{similarity}'")
+        
+        columns = similarity_matrix.columns
+        values = similarity_matrix.to_numpy(dtype=dtype or similarity_matrix.to_numpy().dtype)
+        known = (~np.isnan(values)).astype(values.dtype)
+        sims = np.nan_to_num(values)
+        ids = columns.to_numpy()
+        
+        results = []
+        for start in range(0, len(user_ratings_dicts), batch_size):
+            chunk = user_ratings_dicts[start:start + batch_size]
+            weights = np.zeros((len(chunk), len(columns)), dtype=sims.dtype)
+            
+            for row, ratings in enumerate(chunk):
+                positions = columns.get_indexer(list(ratings.keys()))
+                found = positions >= 0
+                rating_values = np.asarray(list(ratings.values()), dtype=float)[found]
+                # Mateixa ponderació que get_recommendations_for_user
+                weights[row, positions[found]] = np.where(
+                    rating_values >= 4, rating_values,
+                    np.where(rating_values <= 2, -(6 - rating_values), rating_values * 0.5)
+                )
+            
+            scores = weights @ sims
+            support = (weights != 0).astype(sims.dtype) @ known
+            scores[(support == 0) | (weights != 0)] = -np.inf
             
-            simCandidates = pd.concat([simCandidates, sims])
+            count = min(num_recommendations, len(columns))
+            top = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            
+            for row_top, row_scores in zip(top, top_scores):
+                results.append([int(ids[i]) for i in row_top[np.isfinite(row_scores)]])
+        
+        return results
+    
+    def _get_column_info(self):
+        """
+        Catàleg alineat amb les columnes de la pivot (posició = codi dens de
+        cada anime_id): nom, gènere, rating mitjà i nombre de valoracions com a
+        arrays, més els diccionaris anime_id -> posició i nom -> anime_ids
+        (es recalcula si canvia el model carregat)
+        """
+        cached = self._column_info
+        if cached is not None and cached['pivot'] is self.userRatings_pivot:
+            return cached
+        
+        ids = self.userRatings_pivot.columns
+        catalog = self.ratings_df.drop_duplicates('anime_id').set_index('anime_id')[['name', 'genre']].reindex(ids)
+        names = catalog['name'].fillna('').astype(str).to_numpy()
+        genres = catalog['genre']
+        avg_ratings = self.animeAvgRating.reindex(ids) if self.animeAvgRating is not None else None
+        support = self.animeStats['rating'].reindex(ids).fillna(0).to_numpy()
+        
+        # Noms repetits: primer l'anime amb més valoracions
+        lower_names = [name.lower() for name in names]
+        name_ids = {}
+        for position in np.argsort(-support, kind='stable'):
+            name_ids.setdefault(lower_names[position], []).append(int(ids[position]))
+        
+        # Noms en minúscules ordenats (cerca per prefix amb bisect)
+        sorted_positions = np.argsort(np.asarray(lower_names, dtype=object), kind='stable')
+        
+        self._column_info = {
+            'pivot': self.userRatings_pivot,
+            'ids': ids.to_numpy(),
+            'positions': {int(anime_id): position for position, anime_id in enumerate(ids)},
+            'names': names,
+            'lower_names': lower_names,
+            'sorted_lower_names': [lower_names[position] for position in sorted_positions],
+            'sorted_positions': sorted_positions,
+            'name_ids': name_ids,
+            'genres': genres.fillna('Unknown').astype(str).to_numpy(),
+            'genre_index': self._catalog_genre_index(ids, genres),
+            'avg_ratings': avg_ratings.to_numpy() if avg_ratings is not None else None,
+            'support': support,
+            'similarity_values': {},
+        }
+        return self._column_info
+    
+    def _catalog_genre_index(self, anime_ids, genres):
+        """
+        Màscares de gènere del catàleg per als anime_ids indicats (vocabulari de
+        tot anime.csv, encara que cap d'aquests animes tingui algun gènere)
+
+        Args:
+            anime_ids: anime_ids (None en els models antics que no els guarden)
+            genres: Textos de gènere dels mateixos animes, per si algun no és al
+                catàleg (models antics)
+        """
+        catalog = self.animes_dict
+        rows = catalog.positions(anime_ids) if anime_ids is not None else None
+        if rows is None or (rows < 0).any():
+            return GenreIndex(list(genres), vocabulary=catalog.genre_vocabulary)
+        return catalog.genre_index.take(rows)
+    
+    def _get_content_lookup(self):
+        """Noms en minúscules, posició de cada anime_id i índex de gèneres de contentNeighbors (per model)"""
+        cached = self._content_lookup
+        if cached is not None and cached['content'] is self.contentNeighbors:
+            return cached
+        
+        names = self.contentNeighbors['names']
+        lower_names = [name.lower() for name in names]
+        positions = {}
+        for position, name in enumerate(lower_names):
+            positions.setdefault(name, position)
+        # Els models antics no guarden l'anime_id de cada fila
+        anime_ids = self.contentNeighbors.get('anime_ids')
+        id_positions = {int(anime_id): position for position, anime_id in enumerate(anime_ids)} \
+            if anime_ids is not None else {}
+        
+        self._content_lookup = {
+            'content': self.contentNeighbors,
+            'lower_names': lower_names,
+            'positions': positions,
+            'id_positions': id_positions,
+            'genre_index': self._catalog_genre_index(anime_ids, self.contentNeighbors['genres']),
+        }
+        return self._content_lookup
+    
+    def resolve_content_anime(self, query):
+        """
+        Busca un anime a tot anime.csv (no només a la pivot)
+        
+        Returns:
+            str: Nom de l'anime (coincidència exacta o la primera parcial), o None
+        """
+        if self.contentNeighbors is None:
+            return None
+        lookup = self._get_content_lookup()
+        query_lower = query.strip().lower()
+        
+        position = lookup['positions'].get(query_lower)
+        if position is None:
+            position = next(
+                (i for i, name in enumerate(lookup['lower_names']) if query_lower in name), None
+            )
+        if position is None:
+            return None
+        return str(self.contentNeighbors['names'][position])
+    
+    def get_content_recommendations(self, anime, num_recommendations=6, include_genres=None,
+                                    exclude_genres=None):
+        """
+        Recomanacions per contingut (gèneres, tipus, episodis, membres) per als
+        animes sense dades col·laboratives. Sempre retorna animes semblants,
+        independentment de la valoració.
+        
+        Args:
+            anime: anime_id o nom
+        
+        Returns:
+            list: Recomanacions, o None si l'anime no existeix a anime.csv
+        """
+        if self.contentNeighbors is None:
+            return None
+        
+        with stage_timer('content', 'resolve'):
+            lookup = self._get_content_lookup()
+            if isinstance(anime, (int, np.integer)) and not isinstance(anime, bool):
+                position = lookup['id_positions'].get(int(anime))
+            else:
+                resolved = self.resolve_content_anime(anime)
+                position = lookup['positions'][resolved.lower()] if resolved is not None else None
+            if position is None:
+                return None
+        
+        with stage_timer('content', 'filter'):
+            neighbors = self.contentNeighbors['neighbors'][position]
+            similarities = self.contentNeighbors['similarities'][position]
+            allowed = lookup['genre_index'].allowed(include_genres, exclude_genres)
+            if allowed is not None:
+                keep = allowed[neighbors]
+                neighbors, similarities = neighbors[keep], similarities[keep]
+            neighbors, similarities = neighbors[:num_recommendations], similarities[:num_recommendations]
         
-        simCandidates = simCandidates.groupby(simCandidates.index).sum()
-        simCandidates = simCandidates.sort_values(ascending=False)
+        with stage_timer('content', 'format'):
+            anime_ids = self.contentNeighbors.get('anime_ids')
+            recommendations = []
+            for neighbor, similarity in zip(neighbors, similarities):
+                rating = float(self.contentNeighbors['ratings'][neighbor])
+                recommendations.append({
+                    "anime_id": int(anime_ids[neighbor]) if anime_ids is not None else None,
+                    "title": str(self.contentNeighbors['names'][neighbor]),
+                    "score": round(rating, 1) if pd.notna(rating) else 0.0,
+                    "genre": str(self.contentNeighbors['genres'][neighbor]),
+                    "year": None,
+                    "correlation": round(float(similarity), 2)
+                })
         
-        # Eliminar animes ja valorats
-        for anime_name in user_ratings_dict.keys():
-            if anime_name in simCandidates.index:
-                simCandidates = simCandidates.drop(anime_name)
+        return recommendations
+    
+    def get_genres(self):
+        """Vocabulari de gèneres dels animes del model"""
+        return list(self._get_column_info()['genre_index'].vocabulary)
+    
+    def normalize_genres(self, names):
+        """
+        Valida i normalitza una llista de gèneres
         
-        top_recommendations = simCandidates.head(num_recommendations)
+        Raises:
+            ValueError: Si algun gènere no existeix
+        """
+        return self._get_column_info()['genre_index'].normalize(names)
+    
+    def genre_filter(self, include_genres=None, exclude_genres=None):
+        """
+        Filtre de gèneres alineat amb les columnes de la pivot
         
-        recommendations = []
-        for anime_name_rec, similarity_score in top_recommendations.items():
-            anime_info = self.ratings_df[self.ratings_df['name'] == anime_name_rec].iloc[0]
+        Returns:
+            ndarray: Booleans per columna, o None si no es filtra
+        """
+        if not include_genres and not exclude_genres:
+            return None
+        return self._get_column_info()['genre_index'].allowed(include_genres, exclude_genres)
+    
+    def _filter_by_genre(self, data, allowed):
+        """Es queda amb les files (indexades per anime_id) que passen el filtre de gèneres"""
+        if allowed is None:
+            return data
+        positions = self.userRatings_pivot.columns.get_indexer(data.index)
+        keep = (positions >= 0) & allowed[positions]
+        return data[keep]
+    
+    def get_recommendations_for_known_user(self, user_id, num_recommendations=10, mode='item',
+                                           similarity='pearson', include_genres=None, exclude_genres=None):
+        """
+        Recomanacions per un usuari del dataset a partir de les seves valoracions
+        desades, sense recórrer ratings_df
+        
+        - mode 'item': mitjana ponderada de les seves valoracions (centrades)
+          amb la matriu de similitud entre animes
+        - mode 'user': valoracions dels seus top-K veïns precalculats
+        
+        Returns:
+            list: Recomanacions amb 'predicted_rating', o None si l'usuari no existeix
+        
+        Raises:
+            ValueError: Si el mode o la similitud no estan disponibles
+        """
+        if mode == 'item':
+            if self._similarity_matrix(similarity) is None:
+                raise ValueError(f"El model carregat no té la similitud '{similarity}'")
+        elif mode == 'user':
+            if self.userNeighbors is None:
+                raise ValueError("El model carregat no té l'índex de veïns d'usuari")
+        else:
+            raise ValueError(f"Mode desconegut: '{mode}'")
+        
+        with stage_timer('known_user', 'resolve'):
+            position = self.userRatings_pivot.index.get_indexer([user_id])[0]
+            if position < 0:
+                return None
+            pivot_values = self.userRatings_pivot.to_numpy()
+            user_ratings = pivot_values[position]
+            rated = ~np.isnan(user_ratings)
+            user_mean = user_ratings[rated].mean() if rated.any() else 0.0
+            info = self._get_column_info()
+        
+        with stage_timer('known_user', 'score'):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if mode == 'item':
+                    # Fila de similituds de cada anime valorat per l'usuari
+                    # (les matrius es construeixen amb l'ordre de columnes de la pivot).
+                    # És l'única còpia: els NaN i el valor absolut es fan a sobre
+                    sims = self._similarity_values(similarity)[rated]
+                    np.nan_to_num(sims, copy=False)
+                    deviations = (user_ratings[rated] - user_mean).astype(sims.dtype)
+                    numerator = deviations @ sims
+                    weights = np.abs(sims, out=sims).sum(axis=0)
+                    predicted = user_mean + numerator / weights
+                else:
+                    neighbors = self.userNeighbors['neighbors'][position]
+                    neighbor_sims = self.userNeighbors['similarities'][position]
+                    positive = neighbor_sims > 0
+                    neighbors, neighbor_sims = neighbors[positive], neighbor_sims[positive]
+                    
+                    neighbor_ratings = pivot_values[neighbors]
+                    neighbor_rated = ~np.isnan(neighbor_ratings)
+                    deviations = np.where(
+                        neighbor_rated,
+                        neighbor_ratings - self.userNeighbors['user_means'][neighbors][:, None],
+                        0
+                    )
+                    weights = neighbor_sims @ neighbor_rated
+                    predicted = user_mean + (neighbor_sims @ deviations) / weights
+        
+        with stage_timer('known_user', 'filter'):
+            # Animes no vistos, amb suport (mínim 50 valoracions) i predicció
+            candidates = ~rated & (weights > 0) & (info['support'] >= 50)
+            allowed = self.genre_filter(include_genres, exclude_genres)
+            if allowed is not None:
+                candidates &= allowed
+            candidate_positions = np.flatnonzero(candidates)
+            candidate_scores = predicted[candidate_positions]
             
-            recommendations.append({
-                "title": str(anime_name_rec),
-                "score": float(round(anime_info.get('rating', 0), 1)) if pd.notna(anime_info.get('rating', 0)) else 0.0,
-                "genre": str(anime_info.get('genre', 'Unknown')),
-                "year": None,
-                "correlation": float(round(similarity_score / sum(user_ratings_dict.values()), 2))
-            })
+            count = min(num_recommendations, len(candidate_positions))
+            if count == 0:
+                return []
+            top = np.argpartition(-candidate_scores, count - 1)[:count]
+            top = top[np.argsort(-candidate_scores[top], kind='stable')]
+            top_positions = candidate_positions[top]
+        
+        with stage_timer('known_user', 'format'):
+            recommendations = []
+            for column, predicted_rating in zip(top_positions, predicted[top_positions]):
+                avg_rating = info['avg_ratings'][column] if info['avg_ratings'] is not None else np.nan
+                recommendations.append({
+                    "anime_id": int(info['ids'][column]),
+                    "title": str(info['names'][column]),
+                    "score": float(round(avg_rating, 1)) if pd.notna(avg_rating) else 0.0,
+                    "genre": str(info['genres'][column]),
+                    "year": None,
+                    "predicted_rating": round(float(predicted_rating), 2)
+                })
         
         return recommendations
     
+    def get_popular_animes(self, limit=20):
+        """
+        Retorna els noms dels animes amb més valoracions
+        
+        Returns:
+            list: Noms ordenats de més a menys popular
+        """
+        return [self.anime_name(anime_id) for anime_id in self.get_popular_anime_ids(limit)]
+    
+    def get_popular_anime_ids(self, limit=20):
+        """
+        Returns:
+            list: anime_id dels animes amb més valoracions, de més a menys popular
+        """
+        if self.animePopularity is None:
+            return []
+        popular = self.animePopularity[self.animePopularity.index.isin(self.userRatings_pivot.columns)]
+        return [int(anime_id) for anime_id in popular.nlargest(limit).index]
+    
+    def iter_all_animes(self):
+        """
+        Generador amb tots els animes disponibles, ordenats pel nom
+        Permet enviar el catàleg en streaming sense construir la llista sencera
+        """
+        info = self._get_column_info()
+        
+        for position in np.argsort(info['names'], kind='stable'):
+            yield {
+                "anime_id": int(info['ids'][position]),
+                "name": str(info['names'][position]),
+                "genre": str(info['genres'][position])
+            }
+    
     def get_all_animes(self):
         """Retorna tots els animes disponibles"""
-        animes_list = []
-        seen_names = set()
-        
-        for _, row in self.ratings_df[['name', 'genre']].drop_duplicates('name').iterrows():
-            if row['name'] not in seen_names:
-                seen_names.add(row['name'])
-                animes_list.append({
-                    "name": str(row['name']),
-                    "genre": str(row['genre'])
-                })
-        
-        return sorted(animes_list, key=lambda x: x['name'])
+        return list(self.iter_all_animes())
     
     def search_anime(self, query):
-        """Cerca animes pel nom"""
-        query_lower = query.lower()
-        results = []
+        """Cerca animes pel nom (com a màxim PARTIAL_MATCH_LIMIT, ordenats com suggest_animes)"""
+        info = self._get_column_info()
+        return [
+            {
+                "anime_id": int(info['ids'][position]),
+                "name": str(info['names'][position]),
+                "genre": str(info['genres'][position])
+            }
+            for position in self._match_positions(query, PARTIAL_MATCH_LIMIT)
+        ]
+    
+    def suggest_animes(self, query, limit=8):
+        """
+        Suggeriments per a l'autocompletat: primer els noms que comencen per la
+        query i després els que la contenen, cadascun per nombre de valoracions
         
-        for anime_name in self.userRatings_pivot.columns:
-            if query_lower in anime_name.lower():
-                anime_info = self.ratings_df[self.ratings_df['name'] == anime_name].iloc[0]
-                results.append({
-                    "name": str(anime_name),
-                    "genre": str(anime_info.get('genre', 'Unknown'))
-                })
+        Returns:
+            list: {'anime_id', 'name'} (com a màxim limit)
+        """
+        with stage_timer('suggest', 'resolve'):
+            info = self._get_column_info()
+            return [
+                {"anime_id": int(info['ids'][position]), "name": str(info['names'][position])}
+                for position in self._match_positions(query, limit)
+            ]
+    
+    def _match_positions(self, query, limit):
+        """
+        Posicions de la pivot dels noms que coincideixen parcialment amb la
+        query: primer els que hi comencen (índex ordenat, O(log n)) i, només si
+        no n'hi ha prou, els que la contenen; cada grup per nombre de valoracions
+        
+        Returns:
+            list: Com a màxim limit posicions
+        """
+        info = self._get_column_info()
+        query_lower = str(query).strip().lower()
+        if not query_lower or limit <= 0:
+            return []
+        
+        # Rang de noms amb el prefix (llista ordenada: O(log n))
+        start = bisect.bisect_left(info['sorted_lower_names'], query_lower)
+        stop = bisect.bisect_left(info['sorted_lower_names'], query_lower + '\U0010ffff', lo=start)
+        prefix = info['sorted_positions'][start:stop]
+        prefix = prefix[np.argsort(-info['support'][prefix], kind='stable')][:limit]
         
-        return results[:20]
+        positions = [int(position) for position in prefix]
+        if len(positions) < limit:
+            contains = [
+                position for position, name in enumerate(info['lower_names'])
+                if query_lower in name and not name.startswith(query_lower)
+            ]
+            contains.sort(key=lambda position: -info['support'][position])
+            positions.extend(contains[:limit - len(positions)])
+        return positions
     
     def list_available_models(self):
         """Llista tots els models disponibles al directori model/"""
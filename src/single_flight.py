@@ -0,0 +1,82 @@
+"""
+Agrupació de peticions idèntiques concurrents (single-flight)
+
+Quan arriben diverses peticions iguals alhora (per exemple, un anime de moda
+just després de recarregar el model), només la primera fa el càlcul. Les altres
+esperen i reben el mateix resultat. No és una cache: el resultat es descarta
+tan bon punt s'ha lliurat a totes les peticions que l'esperaven.
+"""
+
+import threading
+
+
+class _Call:
+    """Càlcul en curs per una clau"""
+
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        # Estadístiques
+        self.executed = 0   # Càlculs fets realment
+        self.coalesced = 0  # Peticions que han reutilitzat un càlcul en curs
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Executa fn(*args, **kwargs) un sol cop per clau entre crides concurrents
+
+        Returns:
+            tuple: (resultat, shared) on shared és True si s'ha reutilitzat
+                   el càlcul d'una altra petició
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result, False
+
+    def in_flight(self):
+        """Nombre de càlculs en curs"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self):
+        """Retorna les estadístiques d'agrupació"""
+        return {
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'in_flight': self.in_flight(),
+        }
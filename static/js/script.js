@@ -81,6 +81,7 @@ form.addEventListener('submit', async (e) => {
     e.preventDefault();
 
     const animeName = document.getElementById('animeSearch').value;
+    const animeId = resolveAnimeId(animeName);
     const rating = currentRating;
 
     if (rating === 0) {
@@ -90,6 +91,8 @@ form.addEventListener('submit', async (e) => {
 
     // Guardar cerca
     lastSearch = { anime: animeName, rating: rating };
+    clearTimeout(suggestTimer);
+    hideSuggestions();
 
     // Mostrar secció de resultats i loading
     resultsSection.classList.remove('hidden');
@@ -106,10 +109,9 @@ form.addEventListener('submit', async (e) => {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({
-                anime: animeName,
-                rating: rating
-            })
+            body: JSON.stringify(animeId !== null
+                ? { anime_id: animeId, rating: rating }
+                : { anime: animeName, rating: rating })
         });
 
         if (response.status === 300) {
@@ -159,7 +161,7 @@ function showAnimeSelector(matches, query) {
         <p>Selecciona l'anime correcte:</p>
         <div class="anime-options">
             ${matches.map((match, index) => `
-                <button class="anime-option" data-anime="${escapeHtml(match.name)}" data-index="${index}">
+                <button class="anime-option" data-anime="${escapeHtml(match.name)}" data-anime-id="${match.anime_id ?? ''}" data-index="${index}">
                     <div class="option-title">${escapeHtml(match.name)}</div>
                     ${match.genre ? `<div class="option-genre">Gènere: ${escapeHtml(match.genre)}</div>` : ''}
                 </button>
@@ -173,6 +175,8 @@ function showAnimeSelector(matches, query) {
     document.querySelectorAll('.anime-option').forEach(button => {
         button.addEventListener('click', async () => {
             const selectedAnime = button.dataset.anime;
+            // Amb l'anime_id es distingeixen animes que comparteixen el nom
+            const selectedId = button.dataset.animeId;
             
             // Tornar a fer la cerca amb l'anime específic
             loadingIndicator.classList.remove('hidden');
@@ -184,10 +188,9 @@ function showAnimeSelector(matches, query) {
                     headers: {
                         'Content-Type': 'application/json',
                     },
-                    body: JSON.stringify({
-                        anime: selectedAnime,
-                        rating: lastSearch.rating
-                    })
+                    body: JSON.stringify(selectedId
+                        ? { anime_id: Number(selectedId), rating: lastSearch.rating }
+                        : { anime: selectedAnime, rating: lastSearch.rating })
                 });
                 
                 if (!response.ok) {
@@ -304,6 +307,11 @@ async function loadModelInfo() {
         // Actualitzar el footer amb la informació del model
         updateFooter(modelInfo);
         
+        // El catàleg només es torna a descarregar si la versió del model canvia
+        if (modelInfo.version && modelInfo.version !== catalogVersion) {
+            loadCatalog(modelInfo.version);
+        }
+        
     } catch (error) {
         console.error('Error carregant informació del model:', error);
         // Si hi ha error, mostrar informació bàsica
@@ -353,38 +361,152 @@ function updateFooter(modelInfo) {
 }
 
 // ============================================================================
-// AUTOCOMPLETAT (opcional)
+// CATÀLEG (localStorage per versió del model) I AUTOCOMPLETAT
 // ============================================================================
 
 const animeSearchInput = document.getElementById('animeSearch');
-let availableAnimes = [];
+const searchSuggestions = document.getElementById('searchSuggestions');
+const CATALOG_KEY_PREFIX = 'animeCatalog:v';
+const SUGGEST_DEBOUNCE_MS = 200;
+const SUGGEST_MIN_CHARS = 2;
+
+let catalogVersion = null;
+let catalogIds = new Map();   // nom en minúscules -> anime_id (només noms únics)
+let selectedAnimeId = null;   // anime_id triat als suggeriments
+let suggestTimer = null;
+let suggestController = null;
+
+function readCachedCatalog(version) {
+    /**
+     * Catàleg desat d'aquesta versió del model (null si no n'hi ha)
+     */
+    try {
+        const cached = localStorage.getItem(CATALOG_KEY_PREFIX + version);
+        return cached ? JSON.parse(cached) : null;
+    } catch (error) {
+        return null;
+    }
+}
 
-async function loadAvailableAnimes() {
+function storeCatalog(version, animes) {
+    /**
+     * Desa el catàleg i esborra els de versions anteriors
+     */
     try {
-        const response = await fetch(`${API_URL}/api/animes`);
-        const data = await response.json();
-        return data.animes;
+        Object.keys(localStorage)
+            .filter(key => key.startsWith(CATALOG_KEY_PREFIX))
+            .forEach(key => localStorage.removeItem(key));
+        localStorage.setItem(CATALOG_KEY_PREFIX + version, JSON.stringify(animes));
     } catch (error) {
-        console.error('Error carregant animes:', error);
-        return [];
+        // Sense espai o localStorage desactivat: el catàleg queda només en memòria
+        console.warn('No s\'ha pogut desar el catàleg:', error);
     }
 }
 
-loadAvailableAnimes().then(animes => {
-    availableAnimes = animes;
-});
+async function loadCatalog(version) {
+    /**
+     * Catàleg d'animes de la versió indicada: de localStorage si ja hi és,
+     * si no de /api/animes (una sola descàrrega per versió del model)
+     */
+    catalogVersion = version;
+    let animes = readCachedCatalog(version);
+    
+    if (!animes) {
+        try {
+            const response = await fetch(`${API_URL}/api/animes`);
+            if (!response.ok) return;
+            animes = (await response.json()).animes.map(anime => [anime.anime_id, anime.name]);
+            storeCatalog(version, animes);
+        } catch (error) {
+            console.error('Error carregant animes:', error);
+            return;
+        }
+    }
+    
+    // Diccionari nom -> anime_id per enviar l'anime_id directament
+    const ids = new Map();
+    const repeated = new Set();
+    animes.forEach(([animeId, name]) => {
+        const key = name.toLowerCase();
+        if (ids.has(key)) repeated.add(key);
+        ids.set(key, animeId);
+    });
+    repeated.forEach(key => ids.delete(key));
+    catalogIds = ids;
+}
+
+function resolveAnimeId(name) {
+    /**
+     * anime_id del nom escrit (triat als suggeriments o exacte al catàleg)
+     */
+    return selectedAnimeId ?? catalogIds.get(name.trim().toLowerCase()) ?? null;
+}
+
+function hideSuggestions() {
+    searchSuggestions.classList.add('hidden');
+    searchSuggestions.innerHTML = '';
+}
+
+function showSuggestions(suggestions) {
+    if (!suggestions.length) {
+        hideSuggestions();
+        return;
+    }
+    
+    searchSuggestions.innerHTML = suggestions.map(suggestion => `
+        <div class="suggestion-item" data-anime-id="${suggestion.anime_id}">${escapeHtml(suggestion.name)}</div>
+    `).join('');
+    searchSuggestions.classList.remove('hidden');
+    
+    searchSuggestions.querySelectorAll('.suggestion-item').forEach((item, index) => {
+        item.addEventListener('mousedown', (e) => {
+            e.preventDefault();  // Que l'input no perdi el focus abans del clic
+            animeSearchInput.value = suggestions[index].name;
+            selectedAnimeId = suggestions[index].anime_id;
+            hideSuggestions();
+        });
+    });
+}
+
+async function fetchSuggestions(query) {
+    /**
+     * Suggeriments del servidor; una petició nova cancel·la l'anterior
+     */
+    if (suggestController) suggestController.abort();
+    suggestController = new AbortController();
+    
+    try {
+        const response = await fetch(
+            `${API_URL}/api/suggest?q=${encodeURIComponent(query)}&limit=8`,
+            { signal: suggestController.signal }
+        );
+        if (!response.ok) return;
+        const data = await response.json();
+        // Només si l'input no ha canviat mentrestant
+        if (animeSearchInput.value.trim() === query) {
+            showSuggestions(data.suggestions);
+        }
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error obtenint suggeriments:', error);
+        }
+    }
+}
 
 animeSearchInput.addEventListener('input', (e) => {
-    const query = e.target.value.toLowerCase();
-    if (query.length > 2) {
-        const suggestions = availableAnimes.filter(anime =>
-            anime.name.toLowerCase().includes(query)
-        ).slice(0, 5);
-        // Aquí pots mostrar les suggerències si vols implementar un dropdown
-        console.log('Suggerències:', suggestions);
+    selectedAnimeId = null;
+    const query = e.target.value.trim();
+    clearTimeout(suggestTimer);
+    
+    if (query.length < SUGGEST_MIN_CHARS) {
+        hideSuggestions();
+        return;
     }
+    suggestTimer = setTimeout(() => fetchSuggestions(query), SUGGEST_DEBOUNCE_MS);
 });
 
+animeSearchInput.addEventListener('blur', hideSuggestions);
+
 // ============================================================================
 // INICIALITZACIÓ
 // ============================================================================
@@ -393,6 +515,10 @@ animeSearchInput.addEventListener('input', (e) => {
 document.addEventListener('DOMContentLoaded', () => {
     loadModelInfo();
     
-    // Actualitzar cada 30 segons per detectar si s'està entrenant
-    setInterval(loadModelInfo, 30000);
+    // Actualitzar cada 30 segons per detectar si s'està entrenant o si hi ha
+    // un model nou (només llavors es torna a descarregar el catàleg).
+    // Amb la pestanya amagada no es consulta
+    setInterval(() => {
+        if (!document.hidden) loadModelInfo();
+    }, 30000);
 });
@@ -0,0 +1,84 @@
+"""
+Fixtures compartides de les proves
+
+Les proves no fan servir el dataset complet: es genera un dataset sintètic
+petit sobre els animes més populars d'anime.csv i s'entrena un model en un
+directori temporal, una sola vegada per sessió.
+"""
+
+import contextlib
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Afegir el directori arrel i scripts/ al path
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+sys.path.insert(0, str(root_dir / 'scripts'))
+
+from generate_ratings import generate_ratings
+from train_model import create_training_system
+
+
+# Mida del dataset sintètic (prou petit per entrenar en pocs segons)
+TITLES = 120
+USERS = 400
+DENSITY = 0.25
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    """
+    anime.csv reduït i valoracions sintètiques
+
+    El segon anime més popular es rebateja amb el nom del primer, perquè hi hagi
+    dos animes diferents amb el mateix nom (com passa a l'anime.csv real).
+
+    Returns:
+        dict: anime_csv, rating_csv i duplicated_name
+    """
+    directory = tmp_path_factory.mktemp('dataset')
+    animes = pd.read_csv(root_dir / 'data' / 'anime.csv', encoding='utf-8', on_bad_lines='skip')
+    animes = animes.nlargest(TITLES, 'members').reset_index(drop=True)
+    duplicated_name = animes.loc[0, 'name']
+    animes.loc[1, 'name'] = duplicated_name
+
+    anime_csv = directory / 'anime.csv'
+    animes.to_csv(anime_csv, index=False)
+    rating_csv = directory / 'rating.csv'
+    generate_ratings(anime_csv, USERS, TITLES, DENSITY, seed=0).to_csv(rating_csv, index=False)
+
+    return {'anime_csv': anime_csv, 'rating_csv': rating_csv, 'duplicated_name': duplicated_name}
+
+
+@pytest.fixture(scope='session')
+def model_dir(dataset, tmp_path_factory):
+    """Directori amb un model entrenat sobre el dataset sintètic"""
+    directory = tmp_path_factory.mktemp('model')
+    rec_system = create_training_system(directory, dataset['anime_csv'], dataset['rating_csv'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        rec_system.train_model(save=True)
+    return directory
+
+
+@pytest.fixture
+def load_system(dataset, model_dir):
+    """Crea una instància nova amb el model entrenat carregat (es pot modificar)"""
+    def load():
+        rec_system = create_training_system(model_dir, dataset['anime_csv'], dataset['rating_csv'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert rec_system._load_latest_model()
+        return rec_system
+    return load
+
+
+@pytest.fixture(scope='session')
+def rec_system(dataset, model_dir):
+    """Model entrenat carregat, compartit per les proves que només el llegeixen"""
+    rec_system = create_training_system(model_dir, dataset['anime_csv'], dataset['rating_csv'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert rec_system._load_latest_model()
+    return rec_system
@@ -0,0 +1,96 @@
+"""
+Control d'admissió: places, cua acotada i rebuig ràpid amb 503 + Retry-After
+"""
+
+import threading
+import time
+
+import pytest
+
+import app as webapp
+from src.admission import AdmissionController, Overloaded
+
+
+def test_queue_full_is_rejected_immediately():
+    admission = AdmissionController(limit=2, max_queue=0, queue_timeout=10, retry_after=7)
+    assert admission.acquire() == 0.0
+    assert admission.acquire() == 0.0
+
+    start = time.monotonic()
+    with pytest.raises(Overloaded) as excinfo:
+        admission.acquire()
+    assert time.monotonic() - start < 1
+    assert (excinfo.value.reason, excinfo.value.retry_after) == ('queue_full', 7)
+
+    admission.release()
+    with admission.slot() as waited:
+        assert waited == 0.0
+        assert admission.get_stats()['active'] == 2
+    assert admission.get_stats()['rejected'] == {'queue_full': 1, 'timeout': 0}
+
+
+def test_queued_request_times_out():
+    admission = AdmissionController(limit=1, max_queue=1, queue_timeout=0.05)
+    admission.acquire()
+    with pytest.raises(Overloaded) as excinfo:
+        admission.acquire()
+    assert excinfo.value.reason == 'timeout'
+    stats = admission.get_stats()
+    assert (stats['active'], stats['queued'], stats['admitted']) == (1, 0, 1)
+    assert stats['rejected'] == {'queue_full': 0, 'timeout': 1}
+
+
+def test_queued_request_is_admitted_on_release():
+    admission = AdmissionController(limit=1, max_queue=1, queue_timeout=5)
+    admission.acquire()
+    waits = []
+    waiter = threading.Thread(target=lambda: waits.append(admission.acquire()))
+    waiter.start()
+    while admission.get_stats()['queued'] == 0:
+        time.sleep(0.001)
+
+    # Amb la cua plena, la següent es rebutja encara que hi hagi temps d'espera
+    with pytest.raises(Overloaded, match='queue_full'):
+        admission.acquire()
+
+    time.sleep(0.02)
+    admission.release()
+    waiter.join(5)
+    assert waits and waits[0] >= 0.02
+    stats = admission.get_stats()
+    assert (stats['active'], stats['queued'], stats['admitted']) == (1, 0, 2)
+
+
+def test_raising_limit_wakes_queued_requests():
+    admission = AdmissionController(limit=1, max_queue=2, queue_timeout=5)
+    admission.acquire()
+    waiters = [threading.Thread(target=admission.acquire) for _ in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    while admission.get_stats()['queued'] < 2:
+        time.sleep(0.001)
+
+    # Es desperten de seguida, sense esperar que s'esgoti el termini de la cua
+    admission.set_limit(3)
+    for waiter in waiters:
+        waiter.join(1)
+    assert not any(waiter.is_alive() for waiter in waiters)
+    assert admission.get_stats()['active'] == 3
+
+
+def test_endpoint_answers_503_with_retry_after(rec_system, monkeypatch):
+    admission = AdmissionController(limit=1, max_queue=0, queue_timeout=5, retry_after=3)
+    monkeypatch.setattr(webapp, 'rec_system', rec_system)
+    monkeypatch.setattr(webapp, 'admission', admission)
+    client = webapp.app.test_client()
+    body = {'anime_id': rec_system.get_popular_anime_ids(1)[0], 'rating': 5}
+
+    with admission.slot():
+        response = client.post('/api/recommendations', json=body)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert response.get_json()['reason'] == 'queue_full'
+
+    response = client.post('/api/recommendations', json=body)
+    assert response.status_code == 200
+    assert admission.get_stats()['active'] == 0
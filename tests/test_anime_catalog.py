@@ -0,0 +1,124 @@
+"""
+Catàleg columnar d'animes comparat amb el dict d'objectes Anime d'abans
+"""
+
+import math
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.genres import GenreIndex, parse_genres
+from src.models import Anime, AnimeCatalog
+
+
+ANIME_CSV = Path(__file__).resolve().parent.parent / 'data' / 'anime.csv'
+
+
+@pytest.fixture(scope='module')
+def animes_df():
+    return pd.read_csv(ANIME_CSV, encoding='utf-8', on_bad_lines='skip')
+
+
+@pytest.fixture(scope='module')
+def old_animes(animes_df):
+    """dict anime_id -> Anime construït com abans (una fila cada vegada)"""
+    animes = {}
+    for _, row in animes_df.iterrows():
+        anime = Anime(row['anime_id'], row['name'], row['members'])
+        anime.genre = row['genre']
+        animes[row['anime_id']] = anime
+    return animes
+
+
+def _assert_same_animes(catalog, old_animes):
+    assert len(catalog) == len(old_animes)
+    assert sorted(catalog) == sorted(old_animes)
+    for anime_id, old in old_animes.items():
+        view = catalog[anime_id]
+        assert view.get_anime_id() == old.get_anime_id()
+        assert view.get_name() == old.get_name()
+        assert view.get_members() == old.get_members()
+        assert view.genre == (old.genre if parse_genres(old.genre) else None)
+
+
+def test_catalog_matches_old_anime_objects(animes_df, old_animes):
+    catalog = AnimeCatalog.from_csv(ANIME_CSV)
+    _assert_same_animes(catalog, old_animes)
+
+    rows = animes_df.set_index('anime_id')
+    for anime_id in rows.index[::97]:
+        view, row = catalog[int(anime_id)], rows.loc[anime_id]
+        assert view.type == (row['type'] if isinstance(row['type'], str) else None)
+        episodes = pd.to_numeric(row['episodes'], errors='coerce')
+        assert view.episodes == (None if pd.isna(episodes) else int(episodes))
+        if pd.isna(row['rating']):
+            assert math.isnan(view.rating)
+        else:
+            assert view.rating == pytest.approx(row['rating'], abs=1e-5)
+
+
+def test_from_old_dict_matches_from_csv(old_animes):
+    converted = AnimeCatalog.from_animes(old_animes)
+    _assert_same_animes(converted, old_animes)
+    catalog = AnimeCatalog.from_csv(ANIME_CSV)
+    np.testing.assert_array_equal(converted.ids, catalog.ids)
+    np.testing.assert_array_equal(converted.genre_masks, catalog.genre_masks)
+    assert converted.genre_vocabulary == catalog.genre_vocabulary
+
+
+def test_genre_masks_match_genre_index(old_animes):
+    catalog = AnimeCatalog.from_csv(ANIME_CSV)
+    expected = GenreIndex([old_animes[anime_id].genre for anime_id in catalog])
+    assert catalog.genre_vocabulary == expected.vocabulary
+    np.testing.assert_array_equal(catalog.genre_masks, expected.masks)
+    np.testing.assert_array_equal(catalog.genre_index.allowed(['Mecha'], ['Comedy']),
+                                  expected.allowed(['Mecha'], ['Comedy']))
+
+
+def test_old_pickled_catalog_is_upgraded():
+    catalog = AnimeCatalog(pd.DataFrame({
+        'anime_id': [1, 2, 3],
+        'name': ['A', 'B', 'C'],
+        'genre': ['Drama, Action', None, 'Comedy'],
+    }))
+    # Estat d'un catàleg desat abans del GenreIndex (màscares sense el text)
+    _, slots = catalog.__getstate__()
+    slots = {name: value for name, value in slots.items() if not name.startswith('genre_')}
+    slots.update({'genre_masks': catalog.genre_masks, 'genre_vocabulary': catalog.genre_vocabulary})
+    old = AnimeCatalog.__new__(AnimeCatalog)
+    old.__setstate__((None, slots))
+
+    np.testing.assert_array_equal(old.genre_masks, catalog.genre_masks)
+    assert old.genre_vocabulary == catalog.genre_vocabulary
+    assert [old[anime_id].genre for anime_id in old] == ['Action, Drama', None, 'Comedy']
+    assert pickle.loads(pickle.dumps(old))[1].genre == 'Action, Drama'
+
+
+def test_recommendation_filters_use_catalog_masks(rec_system):
+    info = rec_system._get_column_info()
+    genres = rec_system.ratings_df.drop_duplicates('anime_id').set_index('anime_id')['genre'].reindex(info['ids'])
+    expected = GenreIndex(genres.tolist(), vocabulary=rec_system.animes_dict.genre_vocabulary)
+    assert info['genre_index'].vocabulary == expected.vocabulary
+    np.testing.assert_array_equal(info['genre_index'].masks, expected.masks)
+
+
+def test_mapping_behaviour():
+    catalog = AnimeCatalog(pd.DataFrame({
+        'anime_id': [30, 10, 20, 10],
+        'name': ['C', 'A', 'B', 'A (duplicat)'],
+        'genre': ['Drama', None, 'Action, Drama', 'Comedy'],
+    }))
+    # Ordenat per anime_id i sense repetits (es queda la primera fila)
+    assert list(catalog) == [10, 20, 30]
+    assert catalog[10].get_name() == 'A'
+    assert catalog[10].genre is None and catalog[10].get_members() == 0
+    assert catalog[np.int64(20)].genre == 'Action, Drama'
+    assert 30 in catalog and 40 not in catalog and '30' not in catalog
+    with pytest.raises(KeyError):
+        catalog[40]
+    with pytest.raises(KeyError):
+        catalog['30']
+    assert len(AnimeCatalog()) == 0
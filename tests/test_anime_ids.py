@@ -0,0 +1,106 @@
+"""
+Model indexat per anime_id: conversió dels models antics indexats pel nom,
+animes amb el mateix nom i anime_id a totes les recomanacions
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from src.model_storage import load_model_data, save_model_data
+from train_model import create_training_system
+
+
+def _old_name_keyed_model(model_data, anime_ids, id_to_name):
+    """Model com els d'abans del canvi: pivot, matrius i estadístiques pel nom"""
+    old = dict(model_data)
+    old['userRatings_pivot'] = model_data['userRatings_pivot'][anime_ids].rename(columns=id_to_name) \
+        .rename_axis(columns='name')
+    for key in ('corrMatrix', 'cosineMatrix'):
+        old[key] = model_data[key].loc[anime_ids, anime_ids].rename(index=id_to_name, columns=id_to_name) \
+            .rename_axis(index='name', columns='name')
+    for key in ('animeStats', 'animePopularity', 'animeAvgRating'):
+        old[key] = model_data[key].loc[anime_ids].rename(index=id_to_name).rename_axis('name')
+    # Els models antics no tenien aquests components
+    for key in ('userNeighbors', 'contentNeighbors'):
+        old.pop(key, None)
+    return old
+
+
+def test_old_name_keyed_model_is_upgraded_on_load(dataset, model_dir, tmp_path):
+    model_data = load_model_data(model_dir / 'corr_matrix_v1.pkl')
+    pivot = model_data['userRatings_pivot']
+    names = model_data['ratings_df'].drop_duplicates('anime_id').set_index('anime_id')['name']
+    # La pivot per nom fusionava els noms repetits: només es comparen els noms únics
+    names = names[~names.duplicated(keep=False)]
+    anime_ids = [anime_id for anime_id in pivot.columns if anime_id in names.index]
+    assert len(anime_ids) > 10
+
+    old_dir = tmp_path / 'model'
+    old_dir.mkdir()
+    save_model_data(old_dir / 'corr_matrix_v1.pkl', _old_name_keyed_model(model_data, anime_ids, names.to_dict()))
+
+    rec_system = create_training_system(old_dir, dataset['anime_csv'], dataset['rating_csv'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert rec_system._load_latest_model()
+
+    pd.testing.assert_frame_equal(rec_system.userRatings_pivot, pivot[anime_ids])
+    for key in ('corrMatrix', 'cosineMatrix'):
+        pd.testing.assert_frame_equal(getattr(rec_system, key), model_data[key].loc[anime_ids, anime_ids],
+                                      check_names=False)
+    for key in ('animeStats', 'animePopularity', 'animeAvgRating'):
+        expected = model_data[key].loc[anime_ids]
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(getattr(rec_system, key), expected)
+        else:
+            pd.testing.assert_series_equal(getattr(rec_system, key), expected)
+
+    # Es pot demanar per nom i per anime_id, i les respostes porten l'anime_id
+    anime_id = anime_ids[0]
+    assert rec_system.resolve_anime(names[anime_id]) == anime_id
+    recommendations = rec_system.get_recommendations_adjusted(anime_id, tier='precomputed')
+    assert recommendations
+    assert all(rec['anime_id'] in names.index for rec in recommendations)
+
+
+def test_same_name_titles_stay_distinct(dataset, rec_system):
+    name = dataset['duplicated_name']
+    animes = pd.read_csv(dataset['anime_csv'])
+    expected_ids = set(animes.loc[animes['name'] == name, 'anime_id'])
+    assert len(expected_ids) == 2
+
+    matches = rec_system.search_anime_exact(name)
+    assert {match['anime_id'] for match in matches} == expected_ids
+    assert all(match['match_type'] == 'exact' and match['name'] == name for match in matches)
+
+    # Pel nom es tria el que té més valoracions
+    support = rec_system.animeStats['rating']
+    assert rec_system.resolve_anime(name) == max(expected_ids, key=lambda anime_id: support[anime_id])
+
+    results = {}
+    for anime_id in expected_ids:
+        assert anime_id in rec_system.userRatings_pivot.columns
+        recommendations = rec_system.get_recommendations_adjusted(anime_id, tier='precomputed')
+        assert anime_id not in {rec['anime_id'] for rec in recommendations}
+        results[anime_id] = [rec['anime_id'] for rec in recommendations]
+    assert results[min(expected_ids)] != results[max(expected_ids)]
+
+
+@pytest.mark.parametrize('call', [
+    lambda rs, anime_id: rs.get_recommendations_adjusted(anime_id, tier='full'),
+    lambda rs, anime_id: rs.get_recommendations_adjusted(anime_id, user_rating=1, tier='precomputed'),
+    lambda rs, anime_id: rs.get_recommendations_adjusted(anime_id, tier='popularity'),
+    lambda rs, anime_id: rs.get_recommendations_adjusted(anime_id, similarity='cosine'),
+    lambda rs, anime_id: rs.get_recommendations_for_user({anime_id: 5}),
+    lambda rs, anime_id: rs.get_recommendations_for_user({anime_id: 5}, tier='popularity'),
+    lambda rs, anime_id: rs.get_recommendations_for_known_user(rs.userRatings_pivot.index[0], mode='item'),
+    lambda rs, anime_id: rs.get_recommendations_for_known_user(rs.userRatings_pivot.index[0], mode='user'),
+])
+def test_every_recommendation_carries_its_anime_id(rec_system, call):
+    anime_id = rec_system.get_popular_anime_ids(1)[0]
+    recommendations = call(rec_system, anime_id)
+    assert recommendations
+    for rec in recommendations:
+        assert rec['title'] == rec_system.anime_name(rec['anime_id'])
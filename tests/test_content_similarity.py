@@ -0,0 +1,98 @@
+"""
+Veïns per contingut (cold start): vectors de característiques, top-K comparat
+amb una cerca exhaustiva i recomanacions per als animes fora de la pivot
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.content_similarity import FEATURE_WEIGHTS, content_features, content_neighbor_index
+
+
+def _animes(num_animes=60, seed=0):
+    rng = np.random.default_rng(seed)
+    genres = ['Action', 'Comedy', 'Drama', 'Romance', 'Sci-Fi', 'Mecha', 'Horror']
+    rows = []
+    for i in range(num_animes):
+        chosen = rng.choice(genres, rng.integers(0, 4), replace=False)
+        rows.append({
+            'anime_id': 1000 + i,
+            'name': f'Anime {i}',
+            'genre': ', '.join(chosen) if len(chosen) else np.nan,
+            'type': rng.choice(['TV', 'Movie', 'OVA', None]),
+            'episodes': rng.choice(['1', '12', '24', '64', 'Unknown']),
+            'members': int(rng.integers(10, 500000)),
+            'rating': rng.choice([np.nan, 7.5, 8.25]),
+        })
+    return pd.DataFrame(rows)
+
+
+def test_similarity_is_weighted_sum_of_block_cosines():
+    animes = pd.DataFrame({
+        'genre': ['Action', 'Action', 'Drama', 'Drama'],
+        'type': ['TV', 'TV', 'TV', 'Movie'],
+        'episodes': ['12', '12', '12', '1'],
+        'members': [5000, 5000, 5000, 50],
+    })
+    features = content_features(animes)
+    assert features.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(features, axis=1), 1.0, rtol=1e-6)
+
+    sims = features @ features.T
+    # Idèntics; només canvia el gènere; no comparteixen res
+    assert sims[0, 1] == pytest.approx(1.0)
+    assert sims[0, 2] == pytest.approx(1 - FEATURE_WEIGHTS['genre'])
+    assert sims[2, 3] == pytest.approx(FEATURE_WEIGHTS['genre'])
+    assert sims[0, 3] == pytest.approx(0.0, abs=1e-7)
+
+
+@pytest.mark.parametrize('k, block_size', [(5, 7), (20, 1024), (200, 16)])
+def test_neighbors_match_exhaustive_search(k, block_size):
+    animes = _animes()
+    index = content_neighbor_index(animes, k=k, block_size=block_size)
+    features = content_features(animes)
+    sims = features @ features.T
+    np.fill_diagonal(sims, -np.inf)
+
+    k = min(k, len(animes) - 1)
+    assert index['neighbors'].shape == index['similarities'].shape == (len(animes), k)
+    expected = -np.sort(-sims, axis=1)[:, :k]
+    # Amb empats l'ordre dels veïns pot variar, però no les similituds
+    np.testing.assert_allclose(index['similarities'], expected, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(np.take_along_axis(sims, index['neighbors'].astype(np.intp), axis=1),
+                               index['similarities'], rtol=1e-5, atol=1e-6)
+    assert not (index['neighbors'] == np.arange(len(animes))[:, None]).any()
+
+    assert index['anime_ids'].tolist() == animes['anime_id'].tolist()
+    assert index['genres'][animes['genre'].isna().to_numpy()].tolist() == \
+        ['Unknown'] * int(animes['genre'].isna().sum())
+    np.testing.assert_array_equal(index['ratings'], animes['rating'].to_numpy(dtype=np.float32))
+
+
+def test_content_recommendations_follow_neighbors(rec_system):
+    content = rec_system.contentNeighbors
+    anime_id = int(content['anime_ids'][3])
+    expected = [int(content['anime_ids'][n]) for n in content['neighbors'][3][:6]]
+
+    by_id = rec_system.get_content_recommendations(anime_id, 6)
+    assert [r['anime_id'] for r in by_id] == expected
+    assert [r['correlation'] for r in by_id] == sorted((r['correlation'] for r in by_id), reverse=True)
+    by_name = rec_system.get_content_recommendations(str(content['names'][3]).upper(), 6)
+    assert [r['anime_id'] for r in by_name] == expected
+    assert rec_system.get_content_recommendations(-1) is None
+
+    genre = rec_system.get_genres()[0]
+    filtered = rec_system.get_content_recommendations(anime_id, 6, exclude_genres=[genre])
+    assert filtered and all(genre not in r['genre'].split(', ') for r in filtered)
+
+
+def test_animes_outside_pivot_fall_back_to_content(load_system):
+    rec_system = load_system()
+    anime_id = int(rec_system.userRatings_pivot.columns[5])
+    rec_system.userRatings_pivot = rec_system.userRatings_pivot.drop(columns=anime_id)
+
+    recommendations, tier = rec_system.get_recommendations_within(anime_id, 5)
+    assert tier == 'content'
+    assert [r['anime_id'] for r in recommendations] == \
+        [r['anime_id'] for r in rec_system.get_content_recommendations(anime_id)]
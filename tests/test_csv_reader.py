@@ -0,0 +1,104 @@
+"""
+Lector de CSV de valoracions per trams de bytes comparat amb pd.read_csv
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.recommendation_system as recommendation_system
+from src.csv_reader import RATING_DTYPES, _byte_ranges, _read_header, read_ratings_arrays, read_ratings_csv
+from train_model import create_training_system
+
+
+def _write_ratings(path, num_rows=5000, seed=0, trailing_newline=True, extra_column=False, bom=False):
+    rng = np.random.default_rng(seed)
+    ratings = pd.DataFrame({
+        'user_id': rng.integers(1, 80000, num_rows),
+        'anime_id': rng.integers(1, 35000, num_rows),
+        'rating': rng.integers(-1, 11, num_rows),
+    })
+    if extra_column:
+        ratings.insert(1, 'timestamp', rng.integers(0, 10 ** 9, num_rows))
+    text = ratings.to_csv(index=False)
+    if not trailing_newline:
+        text = text.rstrip('\n')
+    path.write_bytes(('\ufeff' if bom else '').encode('utf-8') + text.encode('utf-8'))
+    return path
+
+
+def _parallel(path, **kwargs):
+    # min_parallel_bytes=0 força el pool encara que el fitxer sigui petit
+    return read_ratings_csv(path, workers=3, min_parallel_bytes=0, **kwargs)
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'trailing_newline': False},
+    {'extra_column': True},
+    {'bom': True},
+    {'num_rows': 5},
+])
+def test_parallel_read_matches_pandas(tmp_path, options):
+    path = _write_ratings(tmp_path / 'rating.csv', **options)
+    expected = pd.read_csv(path, encoding='utf-8-sig')[list(RATING_DTYPES)]
+
+    result = _parallel(path)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert {column: result[column].dtype for column in result} == \
+        {column: np.dtype(dtype) for column, dtype in RATING_DTYPES.items()}
+    # El camí d'un sol procés dona el mateix
+    pd.testing.assert_frame_equal(read_ratings_csv(path, workers=1), result)
+
+
+def test_byte_ranges_cover_the_file_on_line_boundaries(tmp_path):
+    path = _write_ratings(tmp_path / 'rating.csv', num_rows=1000)
+    _, start = _read_header(path)
+    data = path.read_bytes()
+    ranges = _byte_ranges(path, start, 12)
+
+    assert ranges[0][0] == start and ranges[-1][1] == len(data)
+    for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+        assert end == next_start
+        assert data[end - 1:end] == b'\n'
+
+
+def test_column_subset_and_wide_ids(tmp_path):
+    path = tmp_path / 'rating.csv'
+    path.write_text('user_id,anime_id,rating\n1,5,7\n3000000000,6,-1\n2,7,10\n', encoding='utf-8')
+
+    arrays = read_ratings_arrays(path, columns=('user_id', 'rating'), workers=2, min_parallel_bytes=0)
+    assert list(arrays) == ['user_id', 'rating']
+    # Un id que no cap a int32 es manté com a int64
+    assert arrays['user_id'].dtype == np.int64
+    np.testing.assert_array_equal(arrays['user_id'], [1, 3000000000, 2])
+    np.testing.assert_array_equal(arrays['rating'], [7, -1, 10])
+
+
+def test_header_only_and_missing_columns(tmp_path):
+    path = tmp_path / 'rating.csv'
+    path.write_text('user_id,anime_id,rating\n', encoding='utf-8')
+    assert len(_parallel(path)) == 0
+
+    path.write_text('user_id,rating\n1,7\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        _parallel(path)
+
+
+def test_training_can_read_ratings_in_process(dataset, tmp_path, monkeypatch):
+    calls = []
+    real_reader = recommendation_system.read_ratings_csv
+
+    def reader(path, *args, **kwargs):
+        calls.append(kwargs.get('workers'))
+        return real_reader(path, *args, **kwargs)
+
+    monkeypatch.setattr(recommendation_system, 'read_ratings_csv', reader)
+    rec_system = create_training_system(tmp_path, dataset['anime_csv'], dataset['rating_csv'])
+    # L'entrenament dins de app.py (amb threads vius) no pot crear el pool amb fork()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rec_system.train_model(save=False, csv_workers=1)
+    assert calls == [1]
@@ -0,0 +1,63 @@
+"""
+Filtre k-core per blocs de data_cleaner comparat amb el filtre iteratiu en memòria
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_cleaner import preprocess_ratings_streaming
+
+
+def _reference_k_core(ratings, min_user_ratings, min_anime_ratings):
+    """Treu usuaris i animes per sota del mínim fins que no canvia res"""
+    ratings = ratings[ratings['rating'] != -1]
+    while True:
+        user_counts = ratings['user_id'].map(ratings['user_id'].value_counts())
+        anime_counts = ratings['anime_id'].map(ratings['anime_id'].value_counts())
+        keep = (user_counts >= min_user_ratings) & (anime_counts >= min_anime_ratings)
+        if keep.all():
+            return ratings
+        ratings = ratings[keep]
+
+
+def _random_ratings(seed=0, num_ratings=4000):
+    rng = np.random.default_rng(seed)
+    # Popularitat molt desigual perquè el filtre necessiti diverses iteracions
+    users = rng.zipf(1.6, num_ratings) % 300 + 1
+    animes = rng.zipf(1.4, num_ratings) % 120 + 1
+    ratings = pd.DataFrame({
+        'user_id': users,
+        'anime_id': animes,
+        'rating': rng.integers(-1, 11, num_ratings),
+    })
+    ratings.loc[ratings['rating'] == 0, 'rating'] = -1
+    return ratings.drop_duplicates(['user_id', 'anime_id']).reset_index(drop=True)
+
+
+def test_streaming_k_core_matches_in_memory(tmp_path, capsys):
+    ratings = _random_ratings()
+    input_file = tmp_path / 'rating.csv'
+    output_file = tmp_path / 'cleaned.csv'
+    ratings.to_csv(input_file, index=False)
+
+    assert preprocess_ratings_streaming(input_file, output_file, min_user_ratings=8,
+                                        min_anime_ratings=6, chunksize=97)
+
+    expected = _reference_k_core(ratings, 8, 6)
+    result = pd.read_csv(output_file)
+    assert len(expected) > 0
+    # Ha calgut més d'una iteració (si no, el cas no prova el recompte)
+    assert 'Iteració 2' in capsys.readouterr().out
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_streaming_k_core_can_empty_the_dataset(tmp_path, capsys):
+    ratings = _random_ratings(seed=1, num_ratings=300)
+    input_file = tmp_path / 'rating.csv'
+    output_file = tmp_path / 'cleaned.csv'
+    ratings.to_csv(input_file, index=False)
+
+    assert preprocess_ratings_streaming(input_file, output_file, min_user_ratings=500,
+                                        min_anime_ratings=500, chunksize=50)
+    assert _reference_k_core(ratings, 500, 500).empty
+    assert pd.read_csv(output_file).empty
@@ -0,0 +1,56 @@
+"""
+Tria de nivell per termini: estimació de latència, nova prova dels nivells
+descartats i respostes fora de termini
+"""
+
+import pytest
+
+import app as webapp
+from src.deadline import ADJUSTED_TIERS, LatencyEstimator
+
+
+def test_slow_tier_is_skipped_then_probed_again(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('src.deadline.time.monotonic', lambda: now[0])
+    estimator = LatencyEstimator(probe_interval=30)
+
+    estimator.observe('adjusted', 'full', 0.5)
+    assert estimator.choose_tier('adjusted', ADJUSTED_TIERS, 0.1) == 'precomputed'
+    assert estimator.choose_tier('adjusted', ADJUSTED_TIERS, None) == 'full'
+    assert estimator.choose_tier('adjusted', ADJUSTED_TIERS, 0) == 'popularity'
+
+    # Passat l'interval, una sola petició torna a provar el nivell descartat
+    now[0] = 31
+    assert estimator.choose_tier('adjusted', ADJUSTED_TIERS, 0.1) == 'full'
+    assert estimator.choose_tier('adjusted', ADJUSTED_TIERS, 0.1) == 'precomputed'
+
+    # La mesura de la prova substitueix l'estimació antiga
+    estimator.observe('adjusted', 'full', 0.01)
+    assert estimator.estimate('adjusted', 'full') == pytest.approx(0.02)
+    assert estimator.choose_tier('adjusted', ADJUSTED_TIERS, 0.1) == 'full'
+
+
+@pytest.fixture
+def client(rec_system, monkeypatch):
+    monkeypatch.setattr(webapp, 'rec_system', rec_system)
+    return webapp.app.test_client()
+
+
+@pytest.mark.parametrize('path, make_body', [
+    ('/api/recommendations', lambda anime_id: {'anime_id': anime_id, 'rating': 5}),
+    ('/api/recommendations-multiple', lambda anime_id: {'ratings_by_id': {str(anime_id): 5}}),
+])
+def test_response_reports_missed_deadline(client, rec_system, path, make_body):
+    body = make_body(rec_system.get_popular_anime_ids(1)[0])
+
+    response = client.post(path, json=body)
+    assert response.status_code == 200
+    assert response.get_json()['deadline_exceeded'] is False
+
+    # Un termini impossible: es degrada al nivell més barat i la resposta ho indica
+    response = client.post(path, json={**body, 'deadline_ms': 1e-6})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['tier'] == 'popularity'
+    assert data['deadline_exceeded'] is True
+    assert data['recommendations']
@@ -0,0 +1,87 @@
+"""
+Avaluació offline: mètriques de rànquing, separació hold-out i equivalència
+del lot vectoritzat amb get_recommendations_for_user
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from evaluate_model import evaluate, ranking_metrics, split_holdout
+
+
+def test_ranking_metrics():
+    # Encerts a les posicions 1 i 3 de 4, amb 3 animes rellevants
+    precision, recall, ndcg = ranking_metrics([10, 20, 30, 40, 50], {10, 30, 99}, k=4)
+    assert precision == pytest.approx(2 / 4)
+    assert recall == pytest.approx(2 / 3)
+    ideal = 1 + 1 / np.log2(3) + 1 / np.log2(4)
+    assert ndcg == pytest.approx((1 + 1 / np.log2(4)) / ideal)
+
+    assert ranking_metrics([1, 2], {1, 2}, k=2) == pytest.approx((1.0, 1.0, 1.0))
+    # Més rellevants que k: el rànquing ideal només té k posicions
+    assert ranking_metrics([1, 2, 3], {1, 5, 6, 7}, k=2)[2] == pytest.approx(1 / (1 + 1 / np.log2(3)))
+    assert ranking_metrics([], {1}, k=5) == (0.0, 0.0, 0.0)
+    # Menys recomanacions que k: la precisió es divideix igualment per k
+    assert ranking_metrics([1], {1}, k=5)[0] == pytest.approx(0.2)
+
+
+def test_split_holdout_partitions_sampled_users():
+    rng = np.random.default_rng(0)
+    ratings = pd.DataFrame({
+        'user_id': np.repeat(np.arange(30), rng.integers(1, 15, 30)),
+    })
+    ratings['anime_id'] = rng.integers(0, 1000, len(ratings))
+    ratings['rating'] = rng.integers(1, 11, len(ratings))
+
+    train, test = split_holdout(ratings, holdout=0.25, min_ratings=5, max_users=10, seed=3)
+    assert sorted(train.index.tolist() + test.index.tolist()) == ratings.index.tolist()
+
+    counts = ratings['user_id'].value_counts()
+    held = test['user_id'].value_counts()
+    assert len(held) == 10
+    for user_id, num_held in held.items():
+        assert counts[user_id] >= 5
+        assert num_held == max(1, int(counts[user_id] * 0.25))
+
+    again_train, again_test = split_holdout(ratings, holdout=0.25, min_ratings=5, max_users=10, seed=3)
+    assert again_test.index.equals(test.index) and again_train.index.equals(train.index)
+
+
+def _queries(rec_system, num_users=40):
+    """Perfils de l'escala 1-10 de la pivot passats a 1-5, com fa evaluate_model"""
+    pivot = rec_system.userRatings_pivot
+    queries = []
+    for user_id, row in pivot.iloc[:num_users].iterrows():
+        rated = row.dropna()
+        queries.append((user_id, {int(anime_id): int(np.ceil(rating / 2)) for anime_id, rating in rated.items()}))
+    # Perfils petits i un anime desconegut
+    queries.append((-1, {int(pivot.columns[0]): 5}))
+    queries.append((-2, {int(pivot.columns[1]): 1, int(pivot.columns[2]): 3, -99: 5}))
+    return queries
+
+
+@pytest.mark.parametrize('similarity', ['pearson', 'cosine'])
+def test_batch_scores_match_get_recommendations_for_user(rec_system, similarity):
+    queries = _queries(rec_system)
+    batch = rec_system.score_users_batch([query for _, query in queries], num_recommendations=10,
+                                         similarity=similarity, batch_size=16)
+
+    for (user_id, query), batch_ids in zip(queries, batch):
+        single = rec_system.get_recommendations_for_user(query, num_recommendations=10, similarity=similarity)
+        assert batch_ids == [r['anime_id'] for r in single], user_id
+        assert not set(batch_ids) & set(query)
+
+
+def test_evaluate_reports_metrics(rec_system):
+    queries = _queries(rec_system, num_users=20)
+    relevant_sets = {user_id: set(list(query)[:3]) for user_id, query in queries[:10]}
+    result = evaluate(rec_system, queries, relevant_sets, 'pearson', np.float32, k=5)
+
+    assert result['similarity'] == 'pearson' and result['dtype'] == 'float32'
+    assert result['evaluated_users'] == 10
+    for key in ('precision@5', 'recall@5', 'ndcg@5'):
+        assert 0 <= result[key] <= 1
+    # Els rellevants d'aquesta prova ja són valorats i no es recomanen mai
+    assert result['precision@5'] == 0
+    assert 0 < result['catalog_coverage'] <= 1
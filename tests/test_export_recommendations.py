@@ -0,0 +1,116 @@
+"""
+Exportació offline: represa des del checkpoint, validació d'arguments i
+contingut de les línies exportades
+"""
+
+import contextlib
+import io
+import json
+import sys
+
+import pytest
+
+import export_recommendations
+
+
+class _Killed(Exception):
+    """Simula que el procés mor a mitja exportació"""
+
+
+def _run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['export_recommendations.py', *map(str, argv)])
+    with contextlib.redirect_stdout(io.StringIO()):
+        return export_recommendations.main()
+
+
+@pytest.fixture
+def export(model_dir, tmp_path, monkeypatch):
+    """Executa l'exportació sobre el model de proves amb blocs petits i un sol procés"""
+    output = tmp_path / 'exportacio.ndjson'
+
+    def run(*extra):
+        return _run(monkeypatch, '--model-dir', model_dir, '--output', output,
+                    '--chunk-size', 16, '--workers', 1, '--top', 3, *extra)
+    run.output = output
+    run.checkpoint = tmp_path / 'exportacio.ndjson.checkpoint.json'
+    return run
+
+
+def test_export_writes_one_line_per_anime_and_rating(export, rec_system):
+    assert export()
+    records = [json.loads(line) for line in export.output.read_text(encoding='utf-8').splitlines()]
+
+    anime_ids = [int(anime_id) for anime_id in rec_system.userRatings_pivot.columns]
+    assert [(r['anime_id'], r['rating']) for r in records] == \
+        [(anime_id, rating) for anime_id in anime_ids for rating in (5, 3, 1)]
+
+    record = records[0]
+    expected = rec_system.get_recommendations_adjusted(
+        record['anime_id'], user_rating=5, num_recommendations=3, tier='precomputed'
+    )
+    assert record['title'] == rec_system.anime_name(record['anime_id'])
+    assert [r['anime_id'] for r in record['recommendations']] == [r['anime_id'] for r in expected]
+
+    checkpoint = json.loads(export.checkpoint.read_text(encoding='utf-8'))
+    assert checkpoint['completed']
+    assert checkpoint['bytes'] == export.output.stat().st_size
+
+
+def test_interrupted_export_resumes_from_checkpoint(export, monkeypatch):
+    assert export()
+    complete = export.output.read_bytes()
+    export.checkpoint.unlink()
+
+    # Primera execució: s'atura al quart bloc
+    original = export_recommendations.export_chunk
+    calls = []
+    kill_at = {3}
+
+    def interrupted(chunk_index, *args):
+        calls.append(chunk_index)
+        if chunk_index in kill_at:
+            kill_at.clear()
+            raise _Killed
+        return original(chunk_index, *args)
+
+    monkeypatch.setattr(export_recommendations, 'export_chunk', interrupted)
+    with pytest.raises(_Killed):
+        export()
+    checkpoint = json.loads(export.checkpoint.read_text(encoding='utf-8'))
+    assert checkpoint['done'] == [0, 1, 2] and not checkpoint['completed']
+
+    # Una línia a mitges després de l'últim bloc registrat (procés mort a mig escriure)
+    with open(export.output, 'ab') as f:
+        f.write(b'{"anime_id": 1, "tit')
+
+    calls.clear()
+    assert export()
+    assert calls[0] == 3 and 0 not in calls
+    assert export.output.read_bytes() == complete
+
+    # Ja completada: no es torna a calcular res
+    calls.clear()
+    assert export()
+    assert calls == []
+    assert export.output.read_bytes() == complete
+
+
+def test_checkpoint_with_other_params_needs_restart(export):
+    assert export('--ratings', '5')
+    assert not export('--ratings', '5,1')
+    assert json.loads(export.checkpoint.read_text(encoding='utf-8'))['params']['ratings'] == [5]
+
+    assert export('--ratings', '5,1', '--restart')
+    lines = export.output.read_text(encoding='utf-8').splitlines()
+    assert {json.loads(line)['rating'] for line in lines} == {5, 1}
+
+
+@pytest.mark.parametrize('argv', [
+    ['--tier', 'turbo'],
+    ['--similarity', 'cosine', '--tier', 'precomputed'],
+])
+def test_invalid_tier_is_rejected_by_argparse(monkeypatch, argv):
+    monkeypatch.setattr(sys, 'argv', ['export_recommendations.py', *argv])
+    with contextlib.redirect_stderr(io.StringIO()), pytest.raises(SystemExit) as excinfo:
+        export_recommendations.parse_args()
+    assert excinfo.value.code == 2
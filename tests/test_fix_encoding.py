@@ -0,0 +1,104 @@
+"""
+Detecció per trams i conversió a UTF-8, també de fitxers amb encoding barrejat
+"""
+
+import contextlib
+import io
+
+import pytest
+
+from fix_encoding import SAMPLE_RANGES, convert_to_utf8, detect_encoding, fix_file_encoding
+from fix_encoding import SAMPLE_SIZE as DEFAULT_SAMPLE_SIZE
+
+
+SAMPLE_SIZE = 256
+
+UTF8_LINE = '{i},Café Ñandú – Shōnen,Comèdia\n'
+LATIN1_LINE = '{i},Pokémon Été,Acción\n'
+
+
+def _lines(template, start, count):
+    return [template.format(i=i) for i in range(start, start + count)]
+
+
+def _write_mixed(path, count=200):
+    """Primera meitat en UTF-8 i segona meitat en Latin-1"""
+    utf8_lines = _lines(UTF8_LINE, 0, count)
+    latin1_lines = _lines(LATIN1_LINE, count, count)
+    path.write_bytes(''.join(utf8_lines).encode('utf-8') + ''.join(latin1_lines).encode('latin-1'))
+    return utf8_lines + latin1_lines
+
+
+def test_utf8_with_multibyte_characters_across_samples(tmp_path):
+    path = tmp_path / 'utf8.csv'
+    # Trams que comencen i acaben a mitja seqüència multibyte
+    path.write_text(''.join(_lines(UTF8_LINE, 0, 300)), encoding='utf-8')
+    assert detect_encoding(path, sample_size=SAMPLE_SIZE + 1) == ('utf-8', 1.0, False)
+
+    path.write_text(''.join(_lines('{i},Naruto,Action\n', 0, 300)), encoding='utf-8')
+    assert detect_encoding(path, sample_size=SAMPLE_SIZE) == ('ascii', 1.0, False)
+
+
+def test_mixed_file_is_detected(tmp_path):
+    path = tmp_path / 'mixed.csv'
+    _write_mixed(path)
+    encoding, _, mixed = detect_encoding(path, sample_size=SAMPLE_SIZE)
+    assert encoding.lower() in ('iso-8859-1', 'windows-1252')
+    assert mixed
+
+    path.write_bytes(''.join(_lines(LATIN1_LINE, 0, 400)).encode('latin-1'))
+    encoding, _, mixed = detect_encoding(path, sample_size=SAMPLE_SIZE)
+    assert encoding.lower() in ('iso-8859-1', 'windows-1252')
+    assert not mixed
+
+
+def test_mixed_conversion_keeps_utf8_lines(tmp_path):
+    source = tmp_path / 'mixed.csv'
+    expected = _write_mixed(source)
+
+    # Convertir tot el fitxer com a Latin-1 faria malbé les línies UTF-8
+    whole = tmp_path / 'whole.csv'
+    assert convert_to_utf8(source, whole, 'latin-1', chunk_size=100)
+    assert whole.read_text(encoding='utf-8').splitlines(keepends=True) != expected
+
+    target = tmp_path / 'fixed.csv'
+    assert convert_to_utf8(source, target, 'latin-1', mixed=True)
+    assert target.read_text(encoding='utf-8').splitlines(keepends=True) == expected
+
+
+def test_streaming_conversion_across_chunks(tmp_path):
+    source = tmp_path / 'cp1252.csv'
+    lines = _lines('{i},Hellsing “Ultimate” – Été\n', 0, 100)
+    source.write_bytes(''.join(lines).encode('cp1252'))
+    target = tmp_path / 'fixed.csv'
+    assert convert_to_utf8(source, target, 'cp1252', chunk_size=7)
+    assert target.read_text(encoding='utf-8') == ''.join(lines)
+
+    # Seqüències multibyte tallades entre blocs (origen UTF-16)
+    source.write_bytes(''.join(lines).encode('utf-16'))
+    assert convert_to_utf8(source, target, 'utf-16', chunk_size=7)
+    assert target.read_text(encoding='utf-8') == ''.join(lines)
+
+
+@pytest.mark.parametrize('mode', ['yes', 'check'])
+def test_fix_file_encoding_on_mixed_file(tmp_path, mode):
+    path = tmp_path / 'rating.csv'
+    # Més gran que tots els trams junts: la detecció no llegeix el fitxer sencer
+    expected = _write_mixed(path, count=12000)
+    original = path.read_bytes()
+    assert len(original) > SAMPLE_RANGES * DEFAULT_SAMPLE_SIZE
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        ok = fix_file_encoding(path, mode=mode)
+    assert 'Encoding barrejat' in output.getvalue()
+
+    if mode == 'check':
+        assert not ok
+        assert path.read_bytes() == original
+        assert not (tmp_path / 'rating.csv.backup').exists()
+    else:
+        assert ok
+        assert path.read_text(encoding='utf-8').splitlines(keepends=True) == expected
+        assert (tmp_path / 'rating.csv.backup').read_bytes() == original
+        assert not (tmp_path / 'rating.csv.utf8').exists()
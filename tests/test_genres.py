@@ -0,0 +1,83 @@
+"""
+Filtre de gèneres amb màscares de bits comparat amb el filtre per text amb pandas
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.genres import BITS_PER_WORD, GenreIndex, parse_genres
+
+
+GENRES = [
+    'Action, Comedy', 'Drama', None, 'comedy,  Romance ', 'Action, Drama, Sci-Fi', '', 'Romance',
+]
+
+
+def _reference_allowed(genres, include, exclude):
+    """Algun gènere d'include i cap d'exclude, comparant els noms en minúscules"""
+    sets = pd.Series(genres, dtype=object).map(lambda genre: {name.lower() for name in parse_genres(genre)})
+    include = {name.lower() for name in include or []}
+    exclude = {name.lower() for name in exclude or []}
+    allowed = pd.Series(True, index=sets.index)
+    if include:
+        allowed &= sets.map(lambda names: bool(names & include))
+    if exclude:
+        allowed &= ~sets.map(lambda names: bool(names & exclude))
+    return allowed.to_numpy()
+
+
+@pytest.mark.parametrize('include, exclude', [
+    (['Action'], None),
+    (None, ['Drama']),
+    (['comedy', 'ROMANCE'], ['Action']),
+    (['Sci-Fi', 'Drama'], ['Sci-Fi']),
+])
+def test_allowed_matches_text_filter(include, exclude):
+    index = GenreIndex(GENRES)
+    np.testing.assert_array_equal(index.allowed(include, exclude), _reference_allowed(GENRES, include, exclude))
+
+
+def test_no_filter_and_unknown_genre():
+    index = GenreIndex(GENRES)
+    assert index.allowed() is None
+    with pytest.raises(ValueError):
+        index.allowed(['Mecha'])
+    # Amb el vocabulari complet es reconeix encara que cap element el tingui
+    assert not GenreIndex(GENRES, vocabulary={'Mecha'}).allowed(['Mecha']).any()
+
+
+def test_more_than_one_word_of_genres():
+    # Més de 64 gèneres: les màscares ocupen diverses paraules
+    names = [f'G{i:03d}' for i in range(BITS_PER_WORD + 10)]
+    genres = [', '.join(names[i::7]) for i in range(7)]
+    index = GenreIndex(genres)
+    assert index.masks.shape[1] == 2
+    for include in (['G000'], ['G070'], ['G065', 'G003']):
+        np.testing.assert_array_equal(index.allowed(include, ['G069']),
+                                      _reference_allowed(genres, include, ['G069']))
+
+
+def test_recommendations_respect_genre_filter(rec_system):
+    info = rec_system._get_column_info()
+    genres = pd.Series(info['genres'], index=info['ids'])
+    vocabulary = sorted({name for genre in genres for name in parse_genres(genre)})
+    include, exclude = vocabulary[:3], vocabulary[3:5]
+
+    expected = _reference_allowed(list(genres), include, exclude)
+    np.testing.assert_array_equal(rec_system.genre_filter(include, exclude), expected)
+
+    allowed_ids = set(genres.index[expected])
+    anime_id = int(info['ids'][0])
+    for tier in ('full', 'precomputed', 'popularity'):
+        recommendations = rec_system.get_recommendations_adjusted(
+            anime_id, tier=tier, include_genres=include, exclude_genres=exclude
+        )
+        assert recommendations
+        assert {rec['anime_id'] for rec in recommendations} <= allowed_ids
+
+    user_id = rec_system.userRatings_pivot.index[0]
+    recommendations = rec_system.get_recommendations_for_known_user(
+        user_id, include_genres=include, exclude_genres=exclude
+    )
+    assert {rec['anime_id'] for rec in recommendations} <= allowed_ids
@@ -0,0 +1,77 @@
+"""
+Comptabilitat de memòria: mida profunda, objectes compartits i informe del model
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+import app as webapp
+from src.memory import MODEL_COMPONENTS, deep_sizeof, format_report, memory_report
+
+
+class _Slotted:
+    __slots__ = ('values', 'missing')
+
+    def __init__(self, values):
+        self.values = values
+
+
+def test_deep_sizeof_counts_contents():
+    array = np.zeros(1000, dtype=np.float64)
+    assert deep_sizeof(array) == 8000
+
+    frame = pd.DataFrame({'name': ['a' * 100, 'b' * 100], 'value': [1.0, 2.0]})
+    assert deep_sizeof(frame) == frame.memory_usage(deep=True, index=True).sum()
+    assert deep_sizeof(frame['name']) == frame['name'].memory_usage(deep=True, index=True)
+
+    strings = np.array(['x' * 500, 'y' * 500], dtype=object)
+    assert deep_sizeof(strings) == strings.nbytes + 2 * sys.getsizeof('x' * 500)
+
+    nested = {'array': array, 'items': [array.copy(), ('a' * 1000,)]}
+    assert deep_sizeof(nested) > 16000 + 1000
+    # Atributs de __slots__ (inclosos els que no s'han assignat)
+    assert deep_sizeof(_Slotted(array)) == sys.getsizeof(_Slotted(None)) + 8000
+    assert deep_sizeof(None) == 0
+
+
+def test_shared_objects_are_counted_once():
+    array = np.ones(1000)
+    seen = set()
+    assert deep_sizeof([array], seen) > 8000
+    assert deep_sizeof({'again': array}, seen) < 8000
+    assert deep_sizeof([array, array]) < deep_sizeof([array, array.copy()])
+
+
+def test_memory_report_of_loaded_model(rec_system):
+    report = memory_report(rec_system)
+    components = report['components']
+
+    assert set(components) == set(MODEL_COMPONENTS)
+    sizes = [component['bytes'] for component in components.values()]
+    assert sizes == sorted(sizes, reverse=True)
+    assert report['total_bytes'] == sum(sizes)
+    # Percentatges arrodonits a una xifra decimal
+    percents = sum(component['percent'] for component in components.values())
+    assert abs(percents - 100) <= 0.05 * len(components)
+
+    pivot = rec_system.userRatings_pivot
+    assert components['userRatings_pivot']['shape'] == list(pivot.shape)
+    assert components['userRatings_pivot']['bytes'] >= pivot.to_numpy().nbytes
+    assert components['users_dict']['shape'] == [len(rec_system.users_dict)]
+    assert report['num_ratings'] == len(rec_system.ratings_df)
+    assert report['bytes_per_rating'] == round(report['total_bytes'] / report['num_ratings'], 1)
+
+    text = format_report(report)
+    assert 'userRatings_pivot' in text and 'TOTAL' in text
+
+
+def test_model_info_includes_memory_on_request(rec_system, monkeypatch):
+    monkeypatch.setattr(webapp, 'rec_system', rec_system)
+    client = webapp.app.test_client()
+
+    assert 'memory' not in client.get('/api/model-info').get_json()
+    memory = client.get('/api/model-info?detail=memory').get_json()['memory']
+    assert memory['total_bytes'] > 0
+    assert 'corrMatrix' in memory['components']
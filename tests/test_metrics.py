@@ -0,0 +1,117 @@
+"""
+Mètriques en format de Prometheus: exposició, etiquetes, histogrames i
+instantànies compartides entre processos
+"""
+
+import pytest
+
+from src.metrics import MetricsRegistry
+
+
+def _registry():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', "Peticions", ('route', 'status'))
+    latency = registry.histogram('latency_seconds', "Latència", ('route',), buckets=(0.1, 1.0))
+    return registry, requests, latency
+
+
+def test_render_counters_and_histograms():
+    registry, requests, latency = _registry()
+    requests.inc('/api', '200')
+    requests.inc('/api', '200', amount=2)
+    requests.inc('/a"b', '500')
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, '/api')
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP requests_total Peticions', '# TYPE requests_total counter']
+    assert 'requests_total{route="/api",status="200"} 3' in lines
+    assert 'requests_total{route="/a\\"b",status="500"} 1' in lines
+
+    # Buckets acumulats; el límit d'un bucket és inclusiu
+    assert 'latency_seconds_bucket{route="/api",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/api",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/api",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/api"} 3.65' in lines
+    assert 'latency_seconds_count{route="/api"} 4' in lines
+
+
+def test_wrong_number_of_labels_is_rejected():
+    _, requests, latency = _registry()
+    with pytest.raises(ValueError):
+        requests.inc('/api')
+    with pytest.raises(ValueError):
+        latency.observe(0.2)
+
+
+def test_timer_observes_elapsed_time(monkeypatch):
+    _, _, latency = _registry()
+    now = iter([10.0, 10.5])
+    monkeypatch.setattr('src.metrics.perf_counter', lambda: next(now))
+    with latency.time('/api'):
+        pass
+    assert latency.get_count('/api') == 1
+    assert latency.dump() == [[['/api'], [0, 1, 0], 0.5, 1]]
+
+
+def test_snapshot_merge_adds_other_process_values():
+    source, source_requests, source_latency = _registry()
+    source_requests.inc('/api', '200', amount=4)
+    source_latency.observe(2.0, '/api')
+
+    target, target_requests, target_latency = _registry()
+    target_requests.inc('/api', '200')
+    target_latency.observe(0.5, '/api')
+
+    # Només es copien les mètriques demanades
+    snapshot = source.snapshot(['requests_total'])
+    assert list(snapshot) == ['requests_total']
+    target.merge(snapshot)
+    assert target_requests.get('/api', '200') == 5
+    assert target_latency.get_count('/api') == 1
+
+    target.merge(source.snapshot(['latency_seconds']))
+    assert target_latency.dump() == [[['/api'], [0, 1, 1], 2.5, 2]]
+
+    target.reset(['requests_total'])
+    assert target_requests.get('/api', '200') == 0
+    assert target_latency.get_count('/api') == 2
+
+
+def test_shared_metrics_are_read_from_snapshot_file(tmp_path):
+    path = tmp_path / 'metrics.json'
+    writer, writer_requests, writer_latency = _registry()
+    reader, reader_requests, reader_latency = _registry()
+    reader.share_from(path, ['latency_seconds'])
+
+    # Sense fitxer encara: la mètrica compartida surt buida, no la còpia local
+    reader_latency.observe(0.05, '/local')
+    reader_requests.inc('/api', '200')
+    text = reader.render()
+    assert '/local' not in text
+    assert 'requests_total{route="/api",status="200"} 1' in text
+
+    writer_latency.observe(0.5, '/train')
+    writer_requests.inc('/train', '200', amount=7)
+    writer.write_snapshot(path, ['latency_seconds'])
+    assert [p.name for p in tmp_path.iterdir()] == ['metrics.json']
+
+    lines = reader.render().splitlines()
+    assert 'latency_seconds_count{route="/train"} 1' in lines
+    # Les mètriques no compartides continuen sent les locals
+    assert 'requests_total{route="/api",status="200"} 1' in lines
+    assert not any('/train' in line and line.startswith('requests_total') for line in lines)
+
+    # Un fitxer corrupte no trenca l'endpoint
+    path.write_text('{', encoding='utf-8')
+    assert 'latency_seconds_count' not in reader.render()
+
+
+def test_collectors_are_rendered_and_failures_skipped():
+    registry, _, _ = _registry()
+    registry.register_collector(lambda: [('model_version', 'gauge', "Versió", {(('kind', 'item'),): 3})])
+    registry.register_collector(lambda: 1 / 0)
+
+    lines = registry.render().splitlines()
+    assert '# TYPE model_version gauge' in lines
+    assert 'model_version{kind="item"} 3' in lines
@@ -0,0 +1,118 @@
+"""
+Emmagatzematge comprimit dels models: anada i tornada per cada còdec i format
+del contenidor
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.model_storage import (
+    CODECS,
+    DEFAULT_LEVELS,
+    STORAGE_FORMAT,
+    STORAGE_KEY,
+    load_model_data,
+    save_model_data,
+    validate_codec,
+)
+
+
+def _model_data():
+    rng = np.random.default_rng(0)
+    ids = np.arange(100, 160)
+    matrix = rng.random((len(ids), len(ids)))
+    matrix[rng.random(matrix.shape) > 0.7] = np.nan
+    return {
+        'corrMatrix': pd.DataFrame(matrix, index=ids, columns=ids),
+        'animeStats': pd.DataFrame({'rating': rng.integers(1, 50, len(ids))}, index=ids),
+        'userNeighbors': None,
+        'empty': b'',
+        'version': 3,
+        'anime_csv_path': 'data/anime.csv',
+        'created_at': '2024-01-01T00:00:00',
+    }
+
+
+def _assert_same_model(loaded, model_data):
+    assert set(loaded) == set(model_data)
+    for key, value in model_data.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(loaded[key], value)
+        else:
+            assert loaded[key] == value, key
+
+
+@pytest.mark.parametrize('codec', sorted(CODECS))
+def test_compressed_model_round_trip(tmp_path, codec):
+    path = tmp_path / 'model.pkl'
+    model_data = _model_data()
+    # Blocs petits perquè cada component es parteixi en molts blocs
+    save_model_data(path, model_data, codec=codec, chunk_size=1024, workers=4)
+
+    with open(path, 'rb') as f:
+        container = pickle.load(f)
+    assert container[STORAGE_KEY] == {
+        'format': STORAGE_FORMAT,
+        'codec': codec,
+        'level': DEFAULT_LEVELS[codec],
+        'chunk_size': 1024,
+    }
+    # Les metadades es guarden sense comprimir i fora dels components
+    assert container['metadata'] == {'version': 3, 'anime_csv_path': 'data/anime.csv',
+                                     'created_at': '2024-01-01T00:00:00'}
+    assert set(container['components']) == {'corrMatrix', 'animeStats', 'userNeighbors', 'empty'}
+    assert len(container['components']['corrMatrix']) > 1
+    for chunks in container['components'].values():
+        assert all(isinstance(chunk, bytes) for chunk in chunks)
+        raw = b''.join(CODECS[codec].decompress(chunk) for chunk in chunks)
+        assert all(len(CODECS[codec].decompress(chunk)) <= 1024 for chunk in chunks)
+        pickle.loads(raw)
+
+    _assert_same_model(load_model_data(path, workers=3), model_data)
+    assert not (tmp_path / 'model.pkl.tmp').exists()
+
+
+@pytest.mark.parametrize('codec', [None, '', 'none'])
+def test_uncompressed_model_is_a_plain_pickle(tmp_path, codec):
+    path = tmp_path / 'model.pkl'
+    model_data = _model_data()
+    save_model_data(path, model_data, codec=codec)
+
+    # Format original: els models sense comprimir es poden llegir sense model_storage
+    with open(path, 'rb') as f:
+        _assert_same_model(pickle.load(f), model_data)
+    _assert_same_model(load_model_data(path), model_data)
+
+
+def test_trained_model_loads_from_compressed_file(tmp_path, rec_system):
+    path = tmp_path / 'model.pkl'
+    model_data = {
+        'userRatings_pivot': rec_system.userRatings_pivot,
+        'corrMatrix': rec_system.corrMatrix,
+        'animes_dict': rec_system.animes_dict,
+        'version': 1,
+    }
+    save_model_data(path, model_data, codec='zlib', level=1, chunk_size=64 * 1024)
+    loaded = load_model_data(path)
+
+    pd.testing.assert_frame_equal(loaded['userRatings_pivot'], rec_system.userRatings_pivot)
+    pd.testing.assert_frame_equal(loaded['corrMatrix'], rec_system.corrMatrix)
+    assert list(loaded['animes_dict']) == list(rec_system.animes_dict)
+
+
+def test_validate_codec():
+    assert validate_codec(None, 5) == (None, None)
+    assert validate_codec('none') == (None, None)
+    assert validate_codec('LZMA') == ('lzma', DEFAULT_LEVELS['lzma'])
+    assert validate_codec('zlib', '0') == ('zlib', 0)
+    assert validate_codec('bz2', 1) == ('bz2', 1)
+
+    with pytest.raises(ValueError, match='desconegut'):
+        validate_codec('gzip')
+    with pytest.raises(ValueError, match='invàlid per bz2'):
+        validate_codec('bz2', 0)
+    with pytest.raises(ValueError, match='invàlid per zlib'):
+        validate_codec('zlib', 10)
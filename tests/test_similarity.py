@@ -0,0 +1,84 @@
+"""
+Cosinus ajustat per blocs comparat amb un càlcul parell a parell
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.similarity import DEFAULT_SHRINKAGE, adjusted_cosine_similarity, similarity_coverage
+
+
+def _random_pivot(num_users=50, num_animes=12, density=0.35, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(1, 11, (num_users, num_animes)).astype(float)
+    values[rng.random((num_users, num_animes)) > density] = np.nan
+    # Un usuari sense valoracions i un anime que només valora un usuari
+    values[0] = np.nan
+    values[:, -1] = np.nan
+    values[1, -1] = 7
+    return pd.DataFrame(values, index=np.arange(1, num_users + 1), columns=np.arange(200, 200 + num_animes))
+
+
+def _reference_similarity(pivot, shrinkage):
+    """
+    Per cada parell: suma dels productes de les valoracions centrades (usuaris que
+    han valorat els dos) entre les normes de cada anime (tots els seus usuaris)
+    """
+    centered = pivot.sub(pivot.mean(axis=1), axis=0)
+    num_animes = pivot.shape[1]
+    similarity = np.full((num_animes, num_animes), np.nan)
+    for i in range(num_animes):
+        for j in range(num_animes):
+            a, b = centered.iloc[:, i], centered.iloc[:, j]
+            both = a.notna() & b.notna()
+            co_count = int(both.sum())
+            if i == j:
+                similarity[i, j] = 1.0
+            elif co_count:
+                norm_a = np.sqrt((a.dropna() ** 2).sum())
+                norm_b = np.sqrt((b.dropna() ** 2).sum())
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    value = (a[both] * b[both]).sum() / (norm_a * norm_b)
+                similarity[i, j] = value * co_count / (co_count + shrinkage) if shrinkage else value
+    return similarity
+
+
+@pytest.mark.parametrize('shrinkage', [0, 25])
+@pytest.mark.parametrize('block_size', [7, 4096])
+def test_adjusted_cosine_matches_pairwise(shrinkage, block_size):
+    pivot = _random_pivot()
+    result = adjusted_cosine_similarity(pivot, shrinkage=shrinkage, block_size=block_size)
+
+    assert result.dtypes.unique().tolist() == [np.float32]
+    assert result.index.equals(pivot.columns) and result.columns.equals(pivot.columns)
+    np.testing.assert_allclose(result.to_numpy(), _reference_similarity(pivot, shrinkage),
+                               rtol=1e-5, atol=1e-6, equal_nan=True)
+
+
+def test_pairs_without_common_users_have_no_neighbor():
+    pivot = pd.DataFrame({10: [5, np.nan, 3], 20: [np.nan, 4, np.nan], 30: [2, 8, np.nan]},
+                         index=[1, 2, 3], dtype=float)
+    result = adjusted_cosine_similarity(pivot)
+    assert np.isnan(result.loc[10, 20]) and np.isnan(result.loc[20, 10])
+    assert not np.isnan(result.loc[10, 30])
+    assert similarity_coverage(result) == 1.0
+
+
+def test_trained_cosine_matrix_matches_dense_reference(rec_system):
+    # Mateixa fórmula en float64 sobre la pivot densa (cost n² però independent dels blocs)
+    pivot = rec_system.userRatings_pivot
+    centered = pivot.sub(pivot.mean(axis=1), axis=0).to_numpy()
+    rated = ~np.isnan(centered)
+    centered = np.nan_to_num(centered)
+    co_counts = rated.T.astype(float) @ rated
+    norms = np.sqrt((centered ** 2).sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = (centered.T @ centered) / np.outer(norms, norms)
+    expected *= co_counts / (co_counts + DEFAULT_SHRINKAGE)
+    expected[co_counts == 0] = np.nan
+    np.fill_diagonal(expected, 1.0)
+
+    result = rec_system.cosineMatrix
+    assert result.index.equals(pivot.columns) and result.columns.equals(pivot.columns)
+    np.testing.assert_allclose(result.to_numpy(), expected, rtol=1e-4, atol=1e-5, equal_nan=True)
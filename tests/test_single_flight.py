@@ -0,0 +1,81 @@
+"""
+Agrupació de peticions idèntiques concurrents
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.single_flight import SingleFlight
+
+
+def _run_concurrently(flights, keys, fn):
+    """Llança una crida a flights.do per cada clau i espera que acabin totes"""
+    results = [None] * len(keys)
+
+    def call(index, key):
+        try:
+            results[index] = flights.do(key, fn, key)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(i, key)) for i, key in enumerate(keys)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def _wait_for_waiters(flights, expected, in_flight=1):
+    deadline = time.monotonic() + 5
+    while flights.coalesced < expected or flights.in_flight() < in_flight:
+        assert time.monotonic() < deadline, "Les peticions no s'han agrupat"
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute(key):
+        calls.append(key)
+        release.wait(5)
+        return {'key': key}
+
+    threads, results = _run_concurrently(flights, ['a'] * 5 + ['b'], compute)
+    _wait_for_waiters(flights, 4, in_flight=2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(calls) == ['a', 'b']
+    # Totes les peticions de la mateixa clau reben el mateix objecte
+    a_results = [result for result, _ in results[:5]]
+    assert all(result is a_results[0] for result in a_results)
+    assert sorted(shared for _, shared in results[:5]) == [False, True, True, True, True]
+    assert results[5] == ({'key': 'b'}, False)
+    assert flights.get_stats() == {'executed': 2, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail(key):
+        release.wait(5)
+        raise KeyError(key)
+
+    threads, results = _run_concurrently(flights, ['a'] * 3, fail)
+    _wait_for_waiters(flights, 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert all(isinstance(result, KeyError) for result in results)
+
+    # No és una cache: la següent crida torna a executar el càlcul
+    assert flights.do('a', lambda: 42) == (42, False)
+    assert flights.executed == 2
+    with pytest.raises(ValueError):
+        flights.do('a', int, 'x')
+    assert flights.in_flight() == 0
@@ -0,0 +1,64 @@
+"""
+Catàleg en streaming (NDJSON) comparat amb la resposta JSON
+"""
+
+import json
+
+import pytest
+
+import app as webapp
+
+
+@pytest.fixture
+def client(rec_system, monkeypatch):
+    monkeypatch.setattr(webapp, 'rec_system', rec_system)
+    return webapp.app.test_client()
+
+
+def _ndjson_records(response):
+    text = response.get_data(as_text=True)
+    assert text.endswith('\n')
+    return [json.loads(line) for line in text.splitlines()]
+
+
+@pytest.mark.parametrize('query, headers', [
+    ('?stream=1', {}),
+    ('?stream=true', {}),
+    ('', {'Accept': 'application/x-ndjson'}),
+    ('', {'Accept': 'application/jsonl, */*'}),
+])
+def test_ndjson_matches_json_catalog(client, query, headers):
+    expected = client.get('/api/animes').get_json()
+    assert expected['count'] == len(expected['animes']) > 0
+
+    response = client.get(f'/api/animes{query}', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    # Un anime per línia, en el mateix ordre que la llista JSON
+    assert _ndjson_records(response) == expected['animes']
+
+
+def test_json_is_the_default(client):
+    for query, headers in [('', {}), ('?stream=0', {}), ('', {'Accept': 'application/json'})]:
+        response = client.get(f'/api/animes{query}', headers=headers)
+        assert response.mimetype == 'application/json'
+        assert 'animes' in response.get_json()
+
+
+def test_stream_is_generated_lazily(client, rec_system, monkeypatch):
+    produced = []
+
+    def iter_all_animes():
+        for record in ({'anime_id': 1, 'name': 'Àlfa'}, {'anime_id': 2, 'name': 'Beta'}):
+            produced.append(record['anime_id'])
+            yield record
+
+    monkeypatch.setattr(rec_system, 'iter_all_animes', iter_all_animes)
+    # El client de proves avança el generador fins al primer tros, no més
+    response = client.get('/api/animes?stream=1', buffered=False)
+    assert produced == [1]
+
+    chunks = iter(response.response)
+    assert json.loads(next(chunks)) == {'anime_id': 1, 'name': 'Àlfa'}
+    assert [json.loads(chunk) for chunk in chunks] == [{'anime_id': 2, 'name': 'Beta'}]
+    response.close()
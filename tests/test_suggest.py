@@ -0,0 +1,70 @@
+"""
+Suggeriments de l'autocompletat comparats amb una cerca lineal sobre els noms
+"""
+
+import pytest
+
+from src.recommendation_system import PARTIAL_MATCH_LIMIT
+
+
+def _reference_suggestions(rec_system, query, limit):
+    """
+    Primer els noms que comencen per la query i després els que la contenen;
+    dins de cada grup, per nombre de valoracions (empats: per nom i per ordre
+    de la pivot)
+    """
+    query = query.strip().lower()
+    if not query:
+        return []
+    ids = list(rec_system.userRatings_pivot.columns)
+    support = rec_system.animeStats['rating'].reindex(ids).fillna(0).to_numpy()
+    names = [rec_system.anime_name(anime_id) for anime_id in ids]
+    lower_names = [name.lower() for name in names]
+
+    prefix = sorted(
+        (position for position, name in enumerate(lower_names) if name.startswith(query)),
+        key=lambda position: (-support[position], lower_names[position], position)
+    )
+    contains = sorted(
+        (position for position, name in enumerate(lower_names) if query in name and not name.startswith(query)),
+        key=lambda position: (-support[position], position)
+    )
+    return [{'anime_id': int(ids[position]), 'name': names[position]} for position in (prefix + contains)[:limit]]
+
+
+def _queries(rec_system):
+    names = [rec_system.anime_name(anime_id) for anime_id in rec_system.userRatings_pivot.columns]
+    queries = {'a', 'the', 'no', 'ON', '  shi ', 'zzzz', '', ':'}
+    for name in names[::9]:
+        queries.update({name[:1], name[:3], name[2:5], name.upper()})
+    return sorted(queries)
+
+
+@pytest.mark.parametrize('limit', [1, 8, 20])
+def test_suggestions_match_linear_scan(rec_system, limit):
+    for query in _queries(rec_system):
+        assert rec_system.suggest_animes(query, limit) == _reference_suggestions(rec_system, query, limit), query
+
+
+def test_prefix_matches_come_first(rec_system):
+    suggestions = rec_system.suggest_animes('s', 20)
+    starts = [suggestion['name'].lower().startswith('s') for suggestion in suggestions]
+    assert any(starts) and not all(starts)
+    # Cap coincidència parcial abans d'un prefix
+    assert starts == sorted(starts, reverse=True)
+
+
+def test_partial_name_matches_use_suggestion_order(rec_system):
+    for query in _queries(rec_system):
+        expected = _reference_suggestions(rec_system, query, PARTIAL_MATCH_LIMIT)
+        assert [match['anime_id'] for match in rec_system.search_anime(query)] == \
+            [suggestion['anime_id'] for suggestion in expected], query
+
+        exact = rec_system.resolve_anime(query)
+        matches = rec_system.search_anime_exact(query) if query.strip() else []
+        if exact is None and query.strip():
+            assert [match['anime_id'] for match in matches] == [s['anime_id'] for s in expected], query
+            assert all(match['match_type'] == 'partial' for match in matches)
+            assert rec_system.find_anime_id(query) == (expected[0]['anime_id'] if expected else None)
+        elif exact is not None:
+            assert rec_system.find_anime_id(query) == exact
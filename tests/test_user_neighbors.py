@@ -0,0 +1,141 @@
+"""
+Índex de veïns d'usuari i recomanacions per usuari del dataset (modes 'user' i
+'item') comparats amb un càlcul directe amb pandas
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.similarity import user_neighbor_index
+
+
+def _random_pivot(num_users=60, num_animes=30, density=0.4, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(1, 11, (num_users, num_animes)).astype(float)
+    values[rng.random((num_users, num_animes)) > density] = np.nan
+    return pd.DataFrame(values, index=np.arange(1, num_users + 1), columns=np.arange(100, 100 + num_animes))
+
+
+def _reference_similarities(pivot):
+    """Cosinus entre les valoracions centrades de cada usuari (un mateix exclòs)"""
+    centered = pivot.sub(pivot.mean(axis=1), axis=0).fillna(0).to_numpy()
+    norms = np.linalg.norm(centered, axis=1)
+    norms[norms == 0] = np.inf
+    sims = (centered @ centered.T) / np.outer(norms, norms)
+    np.fill_diagonal(sims, -np.inf)
+    return sims
+
+
+def test_neighbor_index_matches_brute_force():
+    pivot = _random_pivot()
+    k = 5
+    # Blocs petits perquè la partició per blocs entri en joc
+    index = user_neighbor_index(pivot, k=k, block_size=7)
+    sims = _reference_similarities(pivot)
+
+    np.testing.assert_allclose(index['user_means'], pivot.mean(axis=1).to_numpy(), rtol=1e-5)
+    assert list(index['user_ids']) == list(pivot.index)
+    for row in range(len(pivot)):
+        expected = np.argsort(-sims[row], kind='stable')[:k]
+        np.testing.assert_array_equal(index['neighbors'][row], expected)
+        np.testing.assert_allclose(index['similarities'][row], sims[row, expected], rtol=1e-4, atol=1e-6)
+
+
+def test_neighbor_index_caps_k_to_other_users():
+    pivot = _random_pivot(num_users=4)
+    index = user_neighbor_index(pivot, k=10)
+    assert index['neighbors'].shape == (4, 3)
+    for row, neighbors in enumerate(index['neighbors']):
+        assert row not in neighbors
+
+
+def _reference_user_predictions(rec_system, user_id):
+    """Predicció per veïns d'usuari de cada anime candidat, calculada amb pandas"""
+    pivot = rec_system.userRatings_pivot
+    neighbors = rec_system.userNeighbors
+    position = pivot.index.get_loc(user_id)
+    user_row = pivot.iloc[position]
+
+    neighbor_sims = pd.Series(neighbors['similarities'][position], index=neighbors['neighbors'][position])
+    neighbor_sims = neighbor_sims[neighbor_sims > 0]
+    neighbor_rows = pivot.iloc[neighbor_sims.index]
+    neighbor_means = pd.Series(neighbors['user_means'][neighbor_sims.index], index=neighbor_rows.index)
+    deviations = neighbor_rows.sub(neighbor_means, axis=0)
+
+    sims = pd.Series(neighbor_sims.to_numpy(), index=neighbor_rows.index)
+    weights = neighbor_rows.notna().mul(sims, axis=0).sum()
+    predicted = user_row.mean() + deviations.mul(sims, axis=0).sum() / weights
+
+    support = rec_system.animeStats['rating'].reindex(pivot.columns).fillna(0)
+    candidates = user_row.isna() & (weights > 0) & (support >= 50)
+    return predicted[candidates]
+
+
+def test_known_user_mode_user_matches_reference(rec_system):
+    for user_id in rec_system.userRatings_pivot.index[:5]:
+        recommendations = rec_system.get_recommendations_for_known_user(user_id, 10, mode='user')
+        reference = _reference_user_predictions(rec_system, user_id)
+
+        expected = reference.sort_values(ascending=False).head(10)
+        assert recommendations
+        assert len(recommendations) == len(expected)
+        np.testing.assert_allclose(
+            [rec['predicted_rating'] for rec in recommendations], expected.round(2).to_numpy(), atol=0.011
+        )
+        for rec in recommendations:
+            assert rec['predicted_rating'] == round(float(reference[rec['anime_id']]), 2)
+            assert rec['title'] == rec_system.anime_name(rec['anime_id'])
+
+
+def test_known_user_unknown_returns_none(rec_system):
+    assert rec_system.get_recommendations_for_known_user(-1, mode='user') is None
+
+
+def test_known_user_mode_user_ignores_negative_neighbors(load_system):
+    rec_system = load_system()
+    user_id = rec_system.userRatings_pivot.index[0]
+    # Amb les dades sintètiques tots els veïns són positius: se'n giren la meitat
+    rec_system.userNeighbors['similarities'][0, 25:] *= -1
+
+    recommendations = rec_system.get_recommendations_for_known_user(user_id, 10, mode='user')
+    reference = _reference_user_predictions(rec_system, user_id)
+    assert recommendations
+    for rec in recommendations:
+        assert rec['predicted_rating'] == round(float(reference[rec['anime_id']]), 2)
+
+
+def _reference_item_predictions(rec_system, user_id, similarity_matrix):
+    """Mitjana ponderada de les valoracions centrades amb la similitud entre animes (pandas)"""
+    pivot = rec_system.userRatings_pivot
+    user_row = pivot.loc[user_id]
+    rated = user_row.dropna()
+    sims = similarity_matrix.loc[rated.index].fillna(0)
+
+    weights = sims.abs().sum()
+    predicted = rated.mean() + sims.mul(rated - rated.mean(), axis=0).sum() / weights
+
+    support = rec_system.animeStats['rating'].reindex(pivot.columns).fillna(0)
+    candidates = user_row.isna() & (weights > 0) & (support >= 50)
+    return predicted[candidates]
+
+
+@pytest.mark.parametrize('similarity', ['pearson', 'cosine'])
+def test_known_user_mode_item_matches_reference(rec_system, similarity):
+    similarity_matrix = rec_system._similarity_matrix(similarity)
+    before = similarity_matrix.to_numpy().copy()
+    for user_id in rec_system.userRatings_pivot.index[:5]:
+        recommendations = rec_system.get_recommendations_for_known_user(user_id, 10, mode='item',
+                                                                        similarity=similarity)
+        reference = _reference_item_predictions(rec_system, user_id, similarity_matrix)
+
+        expected = reference.sort_values(ascending=False).head(10)
+        assert recommendations
+        assert len(recommendations) == len(expected)
+        for rec in recommendations:
+            assert rec['predicted_rating'] == pytest.approx(float(reference[rec['anime_id']]), abs=0.011)
+        np.testing.assert_allclose(
+            [rec['predicted_rating'] for rec in recommendations], expected.to_numpy(), atol=0.011
+        )
+    # La matriu del model no es modifica (els NaN i el valor absolut es fan sobre la còpia)
+    np.testing.assert_array_equal(similarity_matrix.to_numpy(), before)